@@ -4,7 +4,10 @@ from dotenv import load_dotenv
 from src.utils.helper import *
 from src.generator.question_generator import QuestionGenerator
 from src.models.auth import AuthManager
-from src.models.simple_session import SimpleSessionManager
+from src.models.simple_session import SimpleSessionManager, start_blob_reencoding
+from src.admin.backup import start_periodic_snapshots
+from src.storage.base import reset_round_trips, round_trips
+from src.config.settings import settings
 from src.components.quiz_history_sidebar import show_quiz_history_right_sidebar, render_history_content, show_revision_view
 
 load_dotenv()
@@ -63,45 +66,54 @@ def check_auto_suggestions():
         
         user_id = st.session_state.user['id']
         
-        # Get last 10 questions from recent sessions
-        recent_questions = quiz_manager.question_logger.get_recent_questions(user_id, 10)
-        
-        if len(recent_questions) >= 5:  # Need at least 5 questions to analyze
-            # Group by topic + subtopic
-            topic_performance = {}
-            
-            for q in recent_questions:
-                topic_key = q['topic']
-                if q.get('sub_topic'):
-                    topic_key = f"{q['topic']} - {q['sub_topic']}"
-                
-                if topic_key not in topic_performance:
-                    topic_performance[topic_key] = {'correct': 0, 'total': 0}
-                
-                topic_performance[topic_key]['total'] += 1
-                if q['is_correct']:
-                    topic_performance[topic_key]['correct'] += 1
-            
-            # Check for topics with < 50% accuracy and at least 3 attempts
-            weak_topics = []
-            for topic, perf in topic_performance.items():
-                if perf['total'] >= 3:  # At least 3 attempts
-                    accuracy = (perf['correct'] / perf['total']) * 100
-                    if accuracy < 50:
-                        weak_topics.append({
-                            'topic': topic,
-                            'accuracy': accuracy,
-                            'attempts': perf['total']
-                        })
-            
-            if weak_topics:
-                return weak_topics[0]  # Return the weakest topic
+        # Recomputed only after the user logs more answers
+        question_logger = quiz_manager.question_logger
+        return question_logger.memoized(user_id, 'auto_suggestion',
+                                        lambda: find_auto_suggestion(question_logger, user_id))
     
     except Exception as e:
         print(f"Auto suggestion check error: {e}")
     
     return None
 
+def find_auto_suggestion(question_logger, user_id):
+    """The first topic under 50% accuracy in the user's last 10 answers, if any"""
+    # Get last 10 questions from recent sessions
+    recent_questions = question_logger.get_recent_questions(user_id, 10)
+    
+    if len(recent_questions) >= 5:  # Need at least 5 questions to analyze
+        # Group by topic + subtopic
+        topic_performance = {}
+        
+        for q in recent_questions:
+            topic_key = q['topic']
+            if q.get('sub_topic'):
+                topic_key = f"{q['topic']} - {q['sub_topic']}"
+            
+            if topic_key not in topic_performance:
+                topic_performance[topic_key] = {'correct': 0, 'total': 0}
+            
+            topic_performance[topic_key]['total'] += 1
+            if q['is_correct']:
+                topic_performance[topic_key]['correct'] += 1
+        
+        # Check for topics with < 50% accuracy and at least 3 attempts
+        weak_topics = []
+        for topic, perf in topic_performance.items():
+            if perf['total'] >= 3:  # At least 3 attempts
+                accuracy = (perf['correct'] / perf['total']) * 100
+                if accuracy < 50:
+                    weak_topics.append({
+                        'topic': topic,
+                        'accuracy': accuracy,
+                        'attempts': perf['total']
+                    })
+        
+        if weak_topics:
+            return weak_topics[0]  # Return the weakest topic
+    
+    return None
+
 def show_auto_suggestion_popup(weak_topic_info):
     """Show automatic suggestion popup when user is struggling"""
     topic = weak_topic_info['topic']
@@ -205,6 +217,7 @@ def show_smart_recommendations():
                         if suggested.get('sub_topic'):
                             st.write(f"**Sub-topic:** {suggested['sub_topic']}")
                         st.write(f"**Difficulty:** {suggested['difficulty']}")
+                        st.write(f"**Type:** {suggested.get('question_type', 'Multiple Choice')}")
                         st.write(f"**Questions:** {suggested['num_questions']}")
                         st.caption(f"💡 {suggested['reason']}")
                     
@@ -226,6 +239,45 @@ def show_smart_recommendations():
     
     return None, None, None, None, None
 
+def show_review_due():
+    """Offer a quiz of previously missed questions that are due for review"""
+    if 'user' not in st.session_state or not st.session_state.user:
+        return None
+    
+    quiz_manager = st.session_state.quiz_manager
+    if not getattr(quiz_manager, 'has_ai_features', False):
+        return None
+    
+    try:
+        review_queue = quiz_manager.question_logger.review_queue
+        due_count = review_queue.due_count(st.session_state.user['id'])
+    except Exception as e:
+        print(f"Review queue error: {e}")
+        return None
+    
+    if due_count:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.info(f"🔁 **{due_count} question{'s' if due_count != 1 else ''} due for review** - questions you missed, spaced out so they stick")
+        with col2:
+            if st.button("🔁 Start Review", use_container_width=True):
+                return "START_REVIEW"
+    
+    return None
+
+def start_review_quiz(num_questions=10):
+    """Load the most overdue review questions as a quiz; nothing is generated"""
+    quiz_manager = st.session_state.quiz_manager
+    items = quiz_manager.question_logger.review_queue.due_questions(st.session_state.user['id'], num_questions)
+    
+    clear_quiz_states()
+    if quiz_manager.load_review_questions(items):
+        st.session_state.quiz_generated = True
+        return True
+    
+    st.info("Nothing is due for review right now.")
+    return False
+
 def show_dashboard():
     """Show user dashboard with simple analytics"""
     user = st.session_state.user
@@ -234,49 +286,34 @@ def show_dashboard():
     
     st.header(f"Welcome back, {user['username']}! 👋")
     
-    user_sessions = session_manager.get_user_sessions(user['id'], 100)
-    
-    total_quizzes = len(user_sessions)
-    avg_score = sum([s['score'] for s in user_sessions]) / len(user_sessions) if user_sessions else 0
-    max_score = max([s['score'] for s in user_sessions]) if user_sessions else 0
-    
-    from datetime import datetime, timedelta
-    seven_days_ago = datetime.now() - timedelta(days=7)
-    recent_sessions = [s for s in user_sessions if s['created_at'] >= seven_days_ago.strftime('%Y-%m-%d')]
+    # Headline totals come from the user's counters (UserStats.get_stats), weak topics from one
+    # columnar read of their sessions, and the recent list from get_user_sessions below
+    summary = session_manager.dashboard.summary(user['id'], days=14)
+    total_quizzes = summary.total_quizzes
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("Total Quizzes", total_quizzes)
     with col2:
-        st.metric("Average Score", f"{avg_score:.1f}%")
+        st.metric("Average Score", f"{summary.avg_score:.1f}%")
     with col3:
-        st.metric("Best Score", f"{max_score:.1f}%")
+        st.metric("Best Score", f"{summary.best_score:.1f}%")
     with col4:
-        st.metric("Quizzes This Week", len(recent_sessions))
+        st.metric("Quizzes This Week", summary.quizzes_this_week)
     
-    # Show AI-powered performance insights with error handling
+    # Show AI-powered performance insights
     if total_quizzes > 0:
         st.subheader("🤖 AI Performance Insights")
-        try:
-            quiz_manager = st.session_state.quiz_manager
-            if hasattr(quiz_manager, 'question_logger') and quiz_manager.question_logger:
-                analysis = quiz_manager.question_logger.analyze_weak_topics(user['id'], days=14)
-                
-                if analysis['weak_topics']:
-                    st.warning("**Areas for Improvement:**")
-                    for topic, data in list(analysis['weak_topics'].items())[:3]:
-                        col1, col2 = st.columns([3, 1])
-                        with col1:
-                            st.write(f"• **{topic}**: {data['accuracy']:.0f}% accuracy")
-                        with col2:
-                            st.write(f"({data['total_questions']} questions)")
-                else:
-                    st.success("🎉 **Great job!** You're performing well across all topics!")
-            else:
-                st.info("📊 AI insights will appear after you take more quizzes!")
-        except Exception as e:
-            print(f"Dashboard AI insights error: {e}")
-            st.info("📊 AI insights will appear after you take more quizzes!")
+        if summary.weak_topics:
+            st.warning("**Areas for Improvement:**")
+            for topic, data in list(summary.weak_topics.items())[:3]:
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    st.write(f"• **{topic}**: {data['accuracy']:.0f}% accuracy")
+                with col2:
+                    st.write(f"({data['total_questions']} questions)")
+        else:
+            st.success("🎉 **Great job!** You're performing well across all topics!")
     
     st.subheader("Recent Quiz Sessions")
     recent_sessions_display = session_manager.get_user_sessions(user['id'], 5)
@@ -305,27 +342,79 @@ def show_dashboard():
     else:
         st.info("No previous sessions found. Start your first quiz!")
     
-    if len(user_sessions) > 1:
+    if total_quizzes > 1:
         st.subheader("Performance by Topic")
         
-        topic_stats = {}
-        for session in user_sessions:
-            topic = session['topic']
-            if topic not in topic_stats:
-                topic_stats[topic] = {'scores': [], 'count': 0}
-            topic_stats[topic]['scores'].append(session['score'])
-            topic_stats[topic]['count'] += 1
-        
-        for topic, stats in topic_stats.items():
-            avg_topic_score = sum(stats['scores']) / len(stats['scores'])
+        for stats in summary.topics:
+            topic, avg_topic_score = stats['topic'], stats['avg_score']
             
             # Color code based on performance
             if avg_topic_score >= 80:
-                st.success(f"**{topic}**: {stats['count']} quizzes, {avg_topic_score:.1f}% average ✨")
+                st.success(f"**{topic}**: {stats['quizzes']} quizzes, {avg_topic_score:.1f}% average ✨")
             elif avg_topic_score >= 60:
-                st.info(f"**{topic}**: {stats['count']} quizzes, {avg_topic_score:.1f}% average 📈")
+                st.info(f"**{topic}**: {stats['quizzes']} quizzes, {avg_topic_score:.1f}% average 📈")
             else:
-                st.warning(f"**{topic}**: {stats['count']} quizzes, {avg_topic_score:.1f}% average 🎯")
+                st.warning(f"**{topic}**: {stats['quizzes']} quizzes, {avg_topic_score:.1f}% average 🎯")
+        
+        show_progress_chart(user['id'])
+    
+    if total_quizzes > 0:
+        show_history_export(user['id'])
+
+def show_progress_chart(user_id: int):
+    """Per-topic accuracy over time; the server sends a fixed number of points per topic"""
+    import pandas as pd
+    from src.models.progress import DEFAULT_WINDOW_DAYS
+    
+    question_logger = getattr(st.session_state.quiz_manager, 'question_logger', None)
+    if not question_logger:
+        return
+    
+    series = question_logger.progress.accuracy_series(user_id)
+    if not any(len(points) > 1 for points in series.values()):
+        return
+    
+    st.subheader("Progress Over Time")
+    frame = pd.DataFrame([
+        {'day': pd.Timestamp(point['day']), 'topic': topic, 'accuracy': point['accuracy']}
+        for topic, points in series.items() for point in points
+    ])
+    st.line_chart(frame, x='day', y='accuracy', color='topic')
+    st.caption(f"Accuracy (%) over the {DEFAULT_WINDOW_DAYS} days up to each day you practised")
+
+def show_history_export(user_id: int):
+    """Download the user's full quiz history, streamed from the database in parts"""
+    from src.config.settings import settings
+    from src.utils.export import (EXPORT_FORMATS, available_formats, export_to_tempfile,
+                                  iter_user_history, plan_export_parts)
+    
+    st.subheader("📥 Export History")
+    export_format = st.selectbox("Format", available_formats(), key="export_format")
+    
+    if st.button("Prepare Export", key="prepare_export"):
+        st.session_state.export_parts = plan_export_parts(user_id)
+    
+    parts = st.session_state.get('export_parts')
+    if not parts:
+        return
+    
+    _, mime, extension = EXPORT_FORMATS[export_format]
+    for i, session_range in enumerate(parts):
+        # Each part is generated only when its button is clicked
+        def build_part(session_range=session_range):
+            rows = iter_user_history(user_id, session_range=session_range,
+                                     archive_path=settings.QUESTION_LOG_ARCHIVE_PATH)
+            return export_to_tempfile(rows, export_format)
+        
+        label = "⬇️ Download" if len(parts) == 1 else f"⬇️ Download part {i+1} of {len(parts)}"
+        suffix = "" if len(parts) == 1 else f"_part{i+1}"
+        st.download_button(
+            label,
+            data=build_part,
+            file_name=f"quiz_history{suffix}.{extension}",
+            mime=mime,
+            key=f"export_part_{i}"
+        )
 
 def clear_quiz_states():
     """Clear all quiz-related states for fresh start"""
@@ -335,10 +424,17 @@ def clear_quiz_states():
         st.session_state.quiz_manager.questions = []
         st.session_state.quiz_manager.user_answers = []
         st.session_state.quiz_manager.results = []
+        st.session_state.quiz_manager.review_meta = []
 
 def main():
     st.set_page_config(page_title="StudyBuddyAI", layout="wide")
     
+    # Convert quiz sessions saved as plain JSON to the compact blob format
+    start_blob_reencoding()
+    
+    # Off unless BACKUP_INTERVAL_MINUTES is set
+    start_periodic_snapshots()
+    
     auth = AuthManager()
     
     # Initialize session states ONLY if user is authenticated
@@ -437,6 +533,11 @@ def main():
             # Show AI recommendations (if no auto-suggestion is active)
             if not weak_topic or st.session_state.get('disable_auto_suggestions', False):
                 if not st.session_state.get('quiz_generated', False) or st.session_state.get('quiz_submitted', False):
+                    # Due reviews need no question generation, so offer them first
+                    if show_review_due() == "START_REVIEW":
+                        start_review_quiz()
+                        st.rerun()
+                    
                     ai_result = show_smart_recommendations()
                     
                     # Handle direct AI quiz generation
@@ -542,7 +643,9 @@ def main():
                     st.header("📝 Quiz Time!")
                     
                     # Show if it's an AI-generated quiz
-                    if hasattr(st.session_state, 'current_topic'):
+                    if getattr(st.session_state.quiz_manager, 'is_review', False):
+                        st.write(f"**🔁 Review:** questions you missed before | **Questions:** {len(st.session_state.quiz_manager.questions)}")
+                    elif hasattr(st.session_state, 'current_topic'):
                         topic_display = st.session_state.current_topic
                         if st.session_state.get('current_sub_topic'):
                             topic_display += f" - {st.session_state.current_sub_topic}"
@@ -696,4 +799,10 @@ def main():
             render_history_content()
 
 if __name__ == "__main__":
-    main()
+    # Each rerun runs on its own script thread, so the counter covers exactly this run
+    reset_round_trips()
+    try:
+        main()
+    finally:
+        if settings.LOG_DB_ROUND_TRIPS:
+            print(f"DB round-trips this run: {round_trips()}")
@@ -0,0 +1,146 @@
+"""Size and speed of the quiz session blob codecs against plain JSON.
+
+Builds realistic 20-question sessions and reports, for every available codec,
+the stored size of the session blobs and the encode/decode time per session.
+
+    python benchmarks/bench_blob_codec.py --sessions 200 --repeat 5
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.blob_codec import CODECS, encode_blob, decode_blob, is_available
+
+TOPICS = {
+    "Operating Systems": ["deadlock", "paging", "scheduling", "semaphores", "virtual memory"],
+    "DBMS": ["normalization", "indexing", "transactions", "joins", "B+ trees"],
+    "Computer Networks": ["TCP congestion control", "subnetting", "DNS", "routing", "HTTP"],
+    "DSA": ["binary search", "heaps", "dynamic programming", "graphs", "hashing"],
+}
+
+WORDS = ("the process thread memory page frame lock mutex table index query key "
+         "packet router latency throughput cache array tree node edge complexity "
+         "algorithm buffer state transaction commit rollback schedule priority").split()
+
+def sentence(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize()
+
+def make_session(rng: random.Random, num_questions: int = 20) -> dict:
+    """One session in the shape QuizManager saves"""
+    topic = rng.choice(list(TOPICS))
+    sub_topic = rng.choice(TOPICS[topic])
+    questions, answers, results = [], [], []
+
+    for i in range(num_questions):
+        options = [sentence(rng, rng.randint(3, 8)) for _ in range(4)]
+        correct = rng.choice(options)
+        question = {
+            'type': 'MCQ',
+            'question': f"In {sub_topic}, {sentence(rng, rng.randint(12, 25))}?",
+            'options': options,
+            'correct_answer': correct,
+            'explanation': sentence(rng, rng.randint(30, 60)) + "."
+        }
+        user_answer = correct if rng.random() < 0.65 else rng.choice(options)
+        questions.append(question)
+        answers.append(user_answer)
+        results.append({
+            'question_number': i + 1,
+            'question': question['question'],
+            'question_type': 'MCQ',
+            'user_answer': user_answer,
+            'correct_answer': correct,
+            'explanation': question['explanation'],
+            'time_taken': rng.randint(5, 90),
+            'is_correct': user_answer == correct,
+            'options': options
+        })
+
+    return {
+        # Blobs as saved before the question store
+        'legacy': [questions, answers, results],
+        # Blobs as saved now: question ids, answers and compact outcomes
+        'normalised': [
+            [rng.randint(1, 10_000_000) for _ in range(num_questions)],
+            answers,
+            [{'is_correct': r['is_correct'], 'time_taken': r['time_taken']} for r in results]
+        ]
+    }
+
+def bench_layout(sessions, layout: str, repeat: int) -> dict:
+    report = {}
+    payloads = [s[layout] for s in sessions]
+
+    baseline = sum(len(json.dumps(blob).encode('utf-8')) for blobs in payloads for blob in blobs)
+    report['plain-json'] = {'bytes_per_session': round(baseline / len(payloads), 1), 'ratio': 1.0}
+
+    for codec_name in CODECS:
+        if not is_available(codec_name):
+            continue
+
+        encoded = [[encode_blob(blob, codec_name) for blob in blobs] for blobs in payloads]
+        size = sum(len(blob) for blobs in encoded for blob in blobs)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for blobs in payloads:
+                for blob in blobs:
+                    encode_blob(blob, codec_name)
+        encode_us = (time.perf_counter() - start) / (repeat * len(payloads)) * 1e6
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for blobs in encoded:
+                for blob in blobs:
+                    decode_blob(blob)
+        decode_us = (time.perf_counter() - start) / (repeat * len(payloads)) * 1e6
+
+        report[codec_name] = {
+            'bytes_per_session': round(size / len(payloads), 1),
+            'ratio': round(size / baseline, 3),
+            'encode_us_per_session': round(encode_us, 1),
+            'decode_us_per_session': round(decode_us, 1)
+        }
+
+    # Plain JSON text the way rows were stored before codecs
+    texts = [[json.dumps(blob) for blob in blobs] for blobs in payloads]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for blobs in payloads:
+            for blob in blobs:
+                json.dumps(blob)
+    report['plain-json']['encode_us_per_session'] = round((time.perf_counter() - start) / (repeat * len(payloads)) * 1e6, 1)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for blobs in texts:
+            for blob in blobs:
+                json.loads(blob)
+    report['plain-json']['decode_us_per_session'] = round((time.perf_counter() - start) / (repeat * len(payloads)) * 1e6, 1)
+
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=200)
+    parser.add_argument('--questions', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sessions = [make_session(rng, args.questions) for _ in range(args.sessions)]
+
+    print(json.dumps({
+        'benchmark': 'blob_codec',
+        'sessions': args.sessions,
+        'questions_per_session': args.questions,
+        'layouts': {layout: bench_layout(sessions, layout, args.repeat) for layout in ('legacy', 'normalised')}
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
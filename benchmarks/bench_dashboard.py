@@ -0,0 +1,118 @@
+"""Dashboard analytics latency for users with 10 to 10,000 quiz sessions.
+
+For each size a user with that many sessions is written to a temporary
+database, then DashboardAnalytics.summary is timed cold (the columnar read
+plus the vectorized passes) and warm (columns cached, as on a rerun). The
+per-session Python loops the dashboard used before are timed for
+comparison. The JSON report includes the git commit so runs can be compared.
+
+    python benchmarks/bench_dashboard.py --sizes 10,100,1000,10000 --repeat 50
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_db import git_commit, timed
+from benchmarks.seed_data import TOPICS
+from src.models.auth import AuthManager
+from src.models.simple_session import SimpleSessionManager
+from src.models.user_stats import user_state_cache
+
+def add_sessions(db_path: str, user_id: int, count: int, rng: random.Random):
+    """Session rows spread over the last year; only the columns the dashboard reads"""
+    now = datetime.utcnow()
+    rows = []
+    for _ in range(count):
+        topic = rng.choice(list(TOPICS))
+        num_questions = rng.randint(5, 10)
+        created_at = now - timedelta(seconds=rng.randint(0, 365 * 86400))
+        rows.append((user_id, topic, rng.choice(TOPICS[topic]), 'Multiple Choice',
+                     rng.choice(['Easy', 'Medium', 'Hard']), num_questions,
+                     rng.randint(0, num_questions) / num_questions * 100,
+                     created_at.strftime('%Y-%m-%d %H:%M:%S')))
+    conn = sqlite3.connect(db_path)
+    conn.executemany('''
+        INSERT INTO quiz_sessions (user_id, topic, sub_topic, question_type, difficulty,
+                                   num_questions, score, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+def python_loops(sessions: list, days: int = 14):
+    """The same numbers computed row by row, as the dashboard did before"""
+    week_ago = (datetime.utcnow() - timedelta(days=7)).strftime('%Y-%m-%d')
+    since = (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
+    topic_stats, areas, this_week = {}, {}, 0
+    for topic, sub_topic, difficulty, score, num_questions, created_at in sessions:
+        topic_stats.setdefault(topic, []).append(score)
+        if created_at[:10] >= week_ago:
+            this_week += 1
+        if created_at[:10] >= since:
+            area = areas.setdefault(f"{topic} - {sub_topic}" if sub_topic else topic, [0, 0])
+            area[0] += round(score * num_questions / 100)
+            area[1] += num_questions
+    scores = [row[3] for row in sessions]
+    return (len(scores), sum(scores) / len(scores) if scores else 0.0, max(scores, default=0.0), this_week,
+            {topic: sum(values) / len(values) for topic, values in topic_stats.items()},
+            {area: correct / total * 100 for area, (correct, total) in areas.items() if total >= 2})
+
+def bench_size(workdir: str, size: int, repeat: int, rng: random.Random) -> dict:
+    db_path = os.path.join(workdir, f'dashboard_{size}.db')
+    auth_manager = AuthManager(db_path)
+    auth_manager.register_user('bench', 'bench@example.com', 'password')
+    user_id = auth_manager.login_user('bench', 'password')['id']
+    session_manager = SimpleSessionManager(db_path)
+    add_sessions(db_path, user_id, size, rng)
+
+    def load_rows():
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute('''
+            SELECT topic, sub_topic, difficulty, score, num_questions, created_at
+            FROM quiz_sessions WHERE user_id = ? ORDER BY created_at, id
+        ''', [user_id]).fetchall()
+        conn.close()
+        return rows
+
+    def cold():
+        user_state_cache.clear()
+        return session_manager.dashboard.summary(user_id)
+
+    summary = cold()
+    return {
+        'sessions': size,
+        'topics': len(summary.topics),
+        'weak_topics': len(summary.weak_topics),
+        'summary_cold': timed(cold, repeat),
+        'summary_warm': timed(lambda: session_manager.dashboard.summary(user_id), repeat),
+        'python_loops': timed(lambda: python_loops(load_rows()), repeat)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,100,1000,10000', help="comma-separated session counts")
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    report = {'benchmark': 'dashboard', 'commit': git_commit(), 'sqlite_version': sqlite3.sqlite_version, 'runs': []}
+    rng = random.Random(args.seed)
+
+    # The managers print debug lines; keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr), tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes.split(','):
+            if size.strip():
+                report['runs'].append(bench_size(workdir, int(size), args.repeat, rng))
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Latency of the SQLite read and submit paths at increasing data sizes.
+
+For each scale (number of question_log rows) a database is seeded with
+benchmarks/seed_data.py, or reused from --workdir if already there, and the
+app's data-access calls are timed for a heavy, a median and a light user.
+Reads are timed cold, with the per-user caches cleared before every sample
+so the numbers measure SQLite, and warm, as repeated calls from one process
+see them. Process-wide caches of fitted model parameters stay warm in both.
+The JSON report includes the git commit so runs can be compared.
+
+    python benchmarks/bench_db.py --scales 10000,1000000 --repeat 20
+    python benchmarks/bench_db.py --db bench.db
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.seed_data import seed, TOPICS, sentence
+from src.models.simple_session import SimpleSessionManager, session_detail_cache, session_list_cache
+from src.models.user_stats import user_state_cache
+from src.models.question_log import QuestionLogger, SmartRecommendationEngine
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+def clear_user_caches():
+    session_list_cache.clear()
+    session_detail_cache.clear()
+    user_state_cache.clear()
+
+def timed(fn, repeat: int, before=None) -> dict:
+    """Call fn repeat times and summarise the latencies in milliseconds; ``before`` runs untimed ahead of each call"""
+    fn()  # warm the page cache and any lazy setup
+    samples = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'p50_ms': round(samples[len(samples) // 2], 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'mean_ms': round(sum(samples) / len(samples), 3)
+    }
+
+def pick_users(db_path: str) -> dict:
+    """Heaviest, median and lightest active user by quiz count"""
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute('''
+        SELECT id FROM users WHERE total_quizzes > 0 ORDER BY total_quizzes DESC
+    ''').fetchall()
+    conn.close()
+    if not rows:
+        return {}
+    return {'heavy': rows[0][0], 'median': rows[len(rows) // 2][0], 'light': rows[-1][0]}
+
+def make_submission(rng: random.Random, num_questions: int = 10):
+    """A quiz_data dict and question logs shaped like QuizManager.evaluate_quiz builds them"""
+    topic = rng.choice(list(TOPICS))
+    sub_topic = rng.choice(TOPICS[topic])
+    questions, results, logs = [], [], []
+    for _ in range(num_questions):
+        options = [sentence(rng, 4) for _ in range(4)]
+        question = {
+            'type': 'MCQ',
+            'question': f"{sentence(rng, 15)}? {rng.random()}",
+            'options': options,
+            'correct_answer': options[0],
+            'explanation': sentence(rng, 30) + "."
+        }
+        user_answer = rng.choice(options)
+        result = {'user_answer': user_answer, 'is_correct': user_answer == options[0], 'time_taken': rng.randint(5, 90)}
+        questions.append(question)
+        results.append(result)
+        logs.append({
+            'topic': topic, 'sub_topic': sub_topic, 'difficulty': 'Medium', 'question_type': 'MCQ',
+            'question_text': question['question'], 'options': options,
+            'correct_answer': options[0], 'user_answer': user_answer,
+            'is_correct': result['is_correct'], 'time_taken': result['time_taken'],
+            'explanation': question['explanation']
+        })
+
+    quiz_data = {
+        'topic': topic, 'sub_topic': sub_topic, 'question_type': 'Multiple Choice',
+        'difficulty': 'Medium', 'num_questions': num_questions,
+        'score': sum(r['is_correct'] for r in results) / num_questions * 100,
+        'questions_data': questions, 'user_answers': [r['user_answer'] for r in results],
+        'results_data': results
+    }
+    return quiz_data, logs
+
+def timed_read(fn, repeat: int) -> dict:
+    """Cold (per-user caches cleared before each call) and warm latencies of a read"""
+    return {'cold': timed(fn, repeat, clear_user_caches), 'warm': timed(fn, repeat)}
+
+def bench_database(db_path: str, repeat: int, seed_value: int = 1) -> dict:
+    """Time every data-access call for the sampled users; the submit path writes to db_path"""
+    rng = random.Random(seed_value)
+    session_manager = SimpleSessionManager(db_path)
+    question_logger = QuestionLogger(db_path)
+    recommendation_engine = SmartRecommendationEngine(question_logger)
+
+    report = {}
+    for label, user_id in pick_users(db_path).items():
+        latest = session_manager.get_user_sessions(user_id, 1)
+        session_id = latest[0]['id'] if latest else None
+
+        def submit():
+            quiz_data, logs = make_submission(rng)
+            session_manager.save_quiz_session(user_id, quiz_data, logs)
+
+        report[label] = {
+            'user_id': user_id,
+            'get_user_sessions': timed_read(lambda: session_manager.get_user_sessions(user_id, 10), repeat),
+            'get_complete_session': timed_read(lambda: session_manager.get_complete_session(session_id), repeat),
+            'get_recent_questions': timed_read(lambda: question_logger.get_recent_questions(user_id, 10), repeat),
+            'analyze_weak_topics': timed_read(lambda: question_logger.analyze_weak_topics(user_id, 14), repeat),
+            'get_personalized_recommendations': timed_read(
+                lambda: recommendation_engine.get_personalized_recommendations(user_id), repeat),
+            'submit_quiz': timed(submit, repeat)
+        }
+    return report
+
+def table_counts(db_path: str) -> dict:
+    conn = sqlite3.connect(db_path)
+    counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+              for table in ('users', 'quiz_sessions', 'question_log', 'questions')}
+    conn.close()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help="benchmark this database instead of seeding scales")
+    parser.add_argument('--scales', default='10000,1000000,10000000',
+                        help="comma-separated question_log row counts")
+    parser.add_argument('--workdir', default='bench_data', help="where seeded databases are kept")
+    parser.add_argument('--users-per-row', type=float, default=0.002,
+                        help="users seeded per question_log row (at least 10)")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    report = {'benchmark': 'db', 'commit': git_commit(), 'sqlite_version': sqlite3.sqlite_version, 'runs': []}
+
+    if args.db:
+        targets = [(None, args.db)]
+    else:
+        os.makedirs(args.workdir, exist_ok=True)
+        targets = [(int(scale), os.path.join(args.workdir, f'seed_{scale}.db'))
+                   for scale in args.scales.split(',') if scale.strip()]
+
+    # The managers print debug lines; keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        for scale, seeded_path in targets:
+            seeding = None
+            if scale is not None and not os.path.exists(seeded_path):
+                seeding = seed(seeded_path, max(10, int(scale * args.users_per_row)), scale,
+                               pool_size=min(200000, max(2000, scale // 20)), days=365, seed_value=args.seed)
+
+            # Submissions write rows, so time against a copy and keep the seed pristine
+            run_path = seeded_path + '.run'
+            shutil.copyfile(seeded_path, run_path)
+            try:
+                report['runs'].append({
+                    'scale': scale,
+                    'db_path': seeded_path,
+                    'seeding': seeding,
+                    'rows': table_counts(run_path),
+                    'users': bench_database(run_path, args.repeat)
+                })
+            finally:
+                os.remove(run_path)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""IRT fitting time and parameter recovery on simulated responses.
+
+For each size, abilities, difficulties and discriminations are drawn, the
+given number of responses is simulated from the 2PL model, and fit_irt is
+timed from a cold start. Another 5% of responses is then added and the fit
+is repeated warm-started from the first one, as the nightly calibration
+does. Recovery is the correlation between true and fitted parameters. The
+JSON report includes the git commit so runs can be compared.
+
+    python benchmarks/bench_irt.py --sizes 100000,1000000,3000000 --model 2pl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_db import git_commit
+from src.models.irt import fit_irt
+
+def simulate(rng: np.random.Generator, responses: int, users: int, items: int, truth: dict):
+    user_codes = rng.integers(0, users, responses)
+    item_codes = rng.integers(0, items, responses)
+    p = 1 / (1 + np.exp(-truth['discrimination'][item_codes]
+                        * (truth['ability'][user_codes] - truth['difficulty'][item_codes])))
+    return user_codes, item_codes, (rng.random(responses) < p).astype(np.int8)
+
+def bench_size(size: int, model: str, rng: np.random.Generator) -> dict:
+    users, items = max(10, size // 50), max(10, size // 200)
+    truth = {
+        'ability': rng.normal(0, 1, users),
+        'difficulty': rng.normal(0, 1.2, items),
+        'discrimination': np.exp(rng.normal(0, 0.3, items)) if model == '2pl' else np.ones(items)
+    }
+    user_codes, item_codes, correct = simulate(rng, size, users, items, truth)
+
+    started = time.perf_counter()
+    cold = fit_irt(user_codes, item_codes, correct, users, items, model)
+    cold_seconds = time.perf_counter() - started
+
+    more = simulate(rng, max(1, size // 20), users, items, truth)
+    user_codes = np.concatenate([user_codes, more[0]])
+    item_codes = np.concatenate([item_codes, more[1]])
+    correct = np.concatenate([correct, more[2]])
+    started = time.perf_counter()
+    warm = fit_irt(user_codes, item_codes, correct, users, items, model,
+                   cold['ability'], cold['difficulty'], cold['discrimination'])
+    warm_seconds = time.perf_counter() - started
+
+    return {
+        'responses': size, 'users': users, 'items': items,
+        'cold_seconds': round(cold_seconds, 3), 'cold_iterations': cold['iterations'],
+        'warm_seconds': round(warm_seconds, 3), 'warm_iterations': warm['iterations'],
+        'ability_correlation': round(float(np.corrcoef(truth['ability'], warm['ability'])[0, 1]), 3),
+        'difficulty_correlation': round(float(np.corrcoef(truth['difficulty'], warm['difficulty'])[0, 1]), 3),
+        'discrimination_correlation': round(float(np.corrcoef(truth['discrimination'],
+                                                              warm['discrimination'])[0, 1]), 3)
+        if model == '2pl' else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000', help="comma-separated response counts")
+    parser.add_argument('--model', choices=['1pl', '2pl'], default='2pl')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    report = {'benchmark': 'irt', 'commit': git_commit(), 'model': args.model, 'runs': []}
+    rng = np.random.default_rng(args.seed)
+    for size in args.sizes.split(','):
+        if size.strip():
+            report['runs'].append(bench_size(int(size), args.model, rng))
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
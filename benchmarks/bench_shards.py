@@ -0,0 +1,94 @@
+"""Quiz submission throughput with the database split into 1, 2, 4 and 8 shards.
+
+For each shard count a fresh database is created in a temporary directory,
+--users users register and log in, and --threads threads submit quizzes for
+random users for --seconds. The JSON report includes the git commit so runs
+can be compared.
+
+    python benchmarks/bench_shards.py --shards 1,2,4,8 --threads 16 --seconds 10
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_db import git_commit, make_submission
+from src.config.settings import settings
+from src.models.auth import AuthManager
+from src.models.simple_session import SimpleSessionManager
+
+def bench_shards(shards: int, users: int, threads: int, seconds: float, seed_value: int) -> dict:
+    """Submissions per second from concurrent threads against a fresh database split into ``shards``"""
+    settings.DATABASE_SHARDS = shards
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, 'studyai.db')
+        auth_manager = AuthManager(db_path)
+        user_ids = []
+        for index in range(users):
+            auth_manager.register_user(f"user{index}", f"user{index}@example.com", "password")
+            user_ids.append(auth_manager.login_user(f"user{index}", "password")['id'])
+
+        session_manager = SimpleSessionManager(db_path)
+        deadline = time.perf_counter() + seconds
+        counts, errors, latencies = [0] * threads, [0] * threads, [[] for _ in range(threads)]
+
+        def worker(index):
+            rng = random.Random(seed_value + index)
+            while time.perf_counter() < deadline:
+                quiz_data, logs = make_submission(rng)
+                start = time.perf_counter()
+                if session_manager.save_quiz_session(rng.choice(user_ids), quiz_data, logs):
+                    counts[index] += 1
+                    latencies[index].append((time.perf_counter() - start) * 1000)
+                else:
+                    errors[index] += 1
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    samples = sorted(latency for thread_latencies in latencies for latency in thread_latencies)
+    return {
+        'shards': shards,
+        'submissions': sum(counts),
+        'failed': sum(errors),
+        'submissions_per_second': round(sum(counts) / elapsed, 1),
+        'p50_ms': round(samples[len(samples) // 2], 3) if samples else None,
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3) if samples else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--shards', default='1,2,4,8', help="comma-separated shard counts")
+    parser.add_argument('--users', type=int, default=64)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    report = {'benchmark': 'shards', 'commit': git_commit(), 'sqlite_version': sqlite3.sqlite_version,
+              'cpus': os.cpu_count(), 'threads': args.threads, 'runs': []}
+
+    # The managers print debug lines; keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        for shards in args.shards.split(','):
+            if shards.strip():
+                report['runs'].append(bench_shards(int(shards), args.users, args.threads,
+                                                   args.seconds, args.seed))
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Bulk-load a database with realistic synthetic users, sessions and question logs.
+
+Topic popularity and user activity are Zipf-skewed, activity is weighted
+towards recent days, and questions are drawn from a shared pool so the
+content-addressed store sees realistic reuse.
+
+    python benchmarks/seed_data.py bench.db --question-logs 1000000 --users 5000
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models.auth import AuthManager
+from src.models.simple_session import SimpleSessionManager
+from src.models.question_log import QuestionLogger
+from src.models.question_store import QuestionStore
+from src.models.user_stats import UserStats
+from src.utils.blob_codec import encode_blob
+
+TOPICS = {
+    "Operating Systems": ["Deadlock", "Paging", "Scheduling", "Semaphores", "Virtual Memory"],
+    "DSA": ["Arrays", "Graphs", "Dynamic Programming", "Heaps", "Hashing"],
+    "DBMS": ["Normalization", "Indexing", "Transactions", "Joins", ""],
+    "Computer Networks": ["TCP/IP", "Subnetting", "DNS", "Routing", ""],
+    "Python": ["Generators", "Decorators", "GIL", ""],
+    "Java": ["Collections", "JVM", "Concurrency", ""],
+    "OOPs": ["Inheritance", "Polymorphism", ""],
+    "Machine Learning": ["Regression", "Overfitting", "Decision Trees", ""],
+    "C++": ["Pointers", "STL", ""],
+    "Javascript": ["Closures", "Event Loop", ""],
+    "Software Engineering": ["Testing", "Agile", ""],
+}
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+
+WORDS = ("process thread memory page frame lock mutex table index query key packet router "
+         "latency throughput cache array tree node edge complexity algorithm buffer state "
+         "transaction commit rollback schedule priority stack heap pointer class object").split()
+
+def zipf_weights(n: int, s: float = 1.1):
+    return [1.0 / (rank ** s) for rank in range(1, n + 1)]
+
+def sentence(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize()
+
+def build_question_pool(rng: random.Random, size: int):
+    """Questions grouped by (topic, sub_topic, difficulty), as quiz dicts"""
+    pool = {}
+    topic_keys = [(t, s, d) for t, subs in TOPICS.items() for s in subs for d in DIFFICULTIES]
+    for i in range(size):
+        topic, sub_topic, difficulty = topic_keys[i % len(topic_keys)]
+        options = [sentence(rng, rng.randint(2, 6)) + f" ({i}.{k})" for k in range(4)]
+        question = {
+            'type': 'MCQ',
+            'question': f"[{topic} {sub_topic}] {sentence(rng, rng.randint(10, 22))}? #{i}",
+            'options': options,
+            'correct_answer': rng.choice(options),
+            'explanation': sentence(rng, rng.randint(20, 45)) + "."
+        }
+        pool.setdefault((topic, sub_topic, difficulty), []).append(question)
+    return pool
+
+def seed(db_path: str, users: int, question_logs: int, pool_size: int, days: int, seed_value: int,
+         batch_sessions: int = 2000, with_search: bool = True):
+    rng = random.Random(seed_value)
+    started = time.perf_counter()
+
+    # Create every table the app uses
+    AuthManager(db_path)
+    SimpleSessionManager(db_path)
+    QuestionLogger(db_path)
+    question_store = QuestionStore(db_path)
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode = OFF")
+    cursor.execute("PRAGMA synchronous = OFF")
+    cursor.execute("PRAGMA cache_size = -200000")
+
+    # Users
+    password_hash = hashlib.sha256(b"password").hexdigest()
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+    first_user = cursor.fetchone()[0] + 1
+    cursor.executemany(
+        "INSERT INTO users (id, username, email, password_hash) VALUES (?, ?, ?, ?)",
+        [(uid, f"user{uid}", f"user{uid}@example.com", password_hash)
+         for uid in range(first_user, first_user + users)]
+    )
+    user_ids = list(range(first_user, first_user + users))
+    user_weights = zipf_weights(users, 1.05)
+    rng.shuffle(user_weights)
+
+    # Question pool in the content-addressed store
+    pool = build_question_pool(rng, pool_size)
+    pool_ids = {}
+    for key, questions in pool.items():
+        pool_ids[key] = [question_store.intern_question(cursor, q) for q in questions]
+    conn.commit()
+
+    topic_names = list(TOPICS)
+    topic_weights = zipf_weights(len(topic_names), 1.2)
+
+    # Session timestamps, denser towards today, in chronological order
+    avg_questions = 7.5
+    num_sessions = max(1, int(question_logs / avg_questions))
+    now = datetime.utcnow()
+    offsets = sorted((min(days, rng.expovariate(3.0 / days)) for _ in range(num_sessions)), reverse=True)
+
+    logged = 0
+    session_rows, log_rows, search_rows = [], [], []
+
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM quiz_sessions")
+    session_id = cursor.fetchone()[0]
+
+    def flush():
+        cursor.executemany('''
+            INSERT INTO quiz_sessions (
+                id, user_id, topic, sub_topic, question_type, difficulty,
+                num_questions, score, created_at, question_ids, user_answers, answer_outcomes
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', session_rows)
+        cursor.executemany('''
+            INSERT INTO question_log (
+                user_id, session_id, topic, sub_topic, difficulty, question_type,
+                question_id, correct_answer, user_answer, is_correct, time_taken, created_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', log_rows)
+        if with_search:
+            cursor.executemany('''
+                INSERT INTO quiz_search (rowid, title, questions, explanations, missed, user_key)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', search_rows)
+        conn.commit()
+        session_rows.clear()
+        log_rows.clear()
+        search_rows.clear()
+
+    for offset in offsets:
+        if logged >= question_logs:
+            break
+
+        session_id += 1
+        user_id = rng.choices(user_ids, user_weights)[0]
+        topic = rng.choices(topic_names, topic_weights)[0]
+        sub_topic = rng.choice(TOPICS[topic])
+        difficulty = rng.choices(DIFFICULTIES, [0.3, 0.5, 0.2])[0]
+        created_at = (now - timedelta(days=offset)).strftime('%Y-%m-%d %H:%M:%S')
+
+        # Harder questions and some (user, topic) pairs are answered worse
+        skill = 0.55 + 0.35 * math.sin(user_id * 7 + len(topic)) ** 2 - 0.1 * DIFFICULTIES.index(difficulty)
+        num_questions = min(question_logs - logged, rng.choices([3, 5, 5, 5, 8, 10, 10, 20])[0])
+
+        candidates = pool[(topic, sub_topic, difficulty)]
+        candidate_ids = pool_ids[(topic, sub_topic, difficulty)]
+        picks = [rng.randrange(len(candidates)) for _ in range(num_questions)]
+
+        question_ids, answers, outcomes, missed = [], [], [], []
+        for pick in picks:
+            question = candidates[pick]
+            is_correct = rng.random() < skill
+            answer = question['correct_answer'] if is_correct else rng.choice(
+                [o for o in question['options'] if o != question['correct_answer']])
+            time_taken = rng.randint(5, 120)
+
+            question_ids.append(candidate_ids[pick])
+            answers.append(answer)
+            outcomes.append({'is_correct': is_correct, 'time_taken': time_taken})
+            if not is_correct:
+                missed.append(question['question'])
+            log_rows.append((user_id, session_id, topic, sub_topic, difficulty, 'MCQ',
+                             candidate_ids[pick], question['correct_answer'], answer,
+                             is_correct, time_taken, created_at))
+
+        score = sum(o['is_correct'] for o in outcomes) / num_questions * 100
+        session_rows.append((session_id, user_id, topic, sub_topic, 'MCQ', difficulty,
+                             num_questions, score, created_at, encode_blob(question_ids),
+                             encode_blob(answers), encode_blob(outcomes)))
+        if with_search:
+            title = f"{topic} - {sub_topic}" if sub_topic else topic
+            search_rows.append((session_id, title,
+                                '\n'.join(candidates[p]['question'] for p in picks),
+                                '\n'.join(candidates[p]['explanation'] for p in picks),
+                                '\n'.join(missed), f"u{user_id}"))
+
+        logged += num_questions
+        if len(session_rows) >= batch_sessions:
+            flush()
+
+    flush()
+    conn.close()
+
+    # Derived tables, built the same way the app maintains them
+    UserStats(db_path).rebuild()
+    question_logger = QuestionLogger(db_path)
+    question_logger.rebuild_topic_stats()
+    question_logger.mastery.rebuild()
+
+    conn = sqlite3.connect(db_path)
+    if with_search:
+        conn.execute("INSERT INTO quiz_search (quiz_search) VALUES ('optimize')")
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+    return {
+        'db_path': db_path,
+        'users': users,
+        'sessions': session_id,
+        'question_logs': logged,
+        'question_pool': pool_size,
+        'seconds': round(time.perf_counter() - started, 1),
+        'db_bytes': os.path.getsize(db_path)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('db_path')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--question-logs', type=int, default=10000)
+    parser.add_argument('--pool-size', type=int, default=20000, help="distinct questions")
+    parser.add_argument('--days', type=int, default=365, help="history span")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--no-search', action='store_true', help="skip the full-text index")
+    args = parser.parse_args()
+
+    print(json.dumps(seed(args.db_path, args.users, args.question_logs, args.pool_size,
+                          args.days, args.seed, with_search=not args.no_search), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -10,4 +10,9 @@ setup(
     packages=find_packages(),
     install_requires = requirements,
     python_requires=">=3.11",
+    entry_points={
+        "console_scripts": [
+            "smartprep-admin=src.admin.cli:main",
+        ],
+    },
 )
\ No newline at end of file
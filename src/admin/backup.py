@@ -0,0 +1,225 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SNAPSHOT_PREFIX = "studyai-"
+
+# Tables whose row counts are reported when a copy is verified
+CORE_TABLES = ['users', 'quiz_sessions', 'question_log', 'questions', 'topic_stats']
+
+_snapshot_threads = {}
+
+class BackupRestarted(Exception):
+    """The source database was written by another connection too often for a stepped copy"""
+
+class DatabaseBackup:
+    """Consistent copies of the SQLite database taken while the app keeps serving.
+
+    Copies use SQLite's online backup API a few pages at a time, releasing
+    the database between steps, so writers are never blocked for more than one
+    step. If another connection writes mid-copy SQLite restarts the copy; after
+    ``max_restarts`` restarts the rest is copied in a single step instead.
+    Every copy is written to a temporary file and checked with
+    ``PRAGMA integrity_check`` before it replaces anything.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, backup_dir: Optional[str] = None,
+                 keep: Optional[int] = None, pages_per_step: Optional[int] = None,
+                 step_pause: Optional[float] = None, max_restarts: int = 20):
+        from src.config.settings import settings
+        from src.storage.base import is_postgres_url
+
+        self.db_path = db_path or settings.DATABASE_URL
+        if is_postgres_url(self.db_path):
+            raise ValueError("PostgreSQL databases are backed up with pg_dump, not DatabaseBackup")
+
+        from src.storage.sharding import shard_index_of
+        shard = shard_index_of(self.db_path)
+        # Shards keep their snapshots apart so pruning one never removes another's
+        self.backup_dir = backup_dir or (
+            os.path.join(settings.BACKUP_DIR, f"shard{shard}") if shard is not None else settings.BACKUP_DIR
+        )
+        self.keep = int(keep if keep is not None else settings.BACKUP_KEEP)
+        self.pages_per_step = int(pages_per_step or settings.BACKUP_PAGES_PER_STEP)
+        self.step_pause = float(step_pause if step_pause is not None else settings.BACKUP_STEP_PAUSE_SECONDS)
+        self.max_restarts = max_restarts
+
+    def copy_database(self, source_path: str, target_path: str) -> Dict:
+        """Copy one SQLite database into another with the online backup API"""
+        started = time.perf_counter()
+        partial_path = target_path + ".partial"
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+        source = sqlite3.connect(source_path, timeout=30)
+        target = sqlite3.connect(partial_path)
+        progress = {'remaining': None, 'restarts': 0, 'total': 0}
+
+        def on_step(status, remaining, total):
+            # remaining only grows when SQLite started the copy over
+            if progress['remaining'] is not None and remaining > progress['remaining']:
+                progress['restarts'] += 1
+                if progress['restarts'] > self.max_restarts:
+                    raise BackupRestarted()
+            progress['remaining'] = remaining
+            progress['total'] = total
+
+        try:
+            try:
+                source.backup(target, pages=self.pages_per_step, progress=on_step, sleep=self.step_pause)
+                stepped = True
+            except BackupRestarted:
+                # Under constant writes, hold the read lock once for the whole copy
+                source.backup(target, pages=-1)
+                stepped = False
+        finally:
+            target.close()
+            source.close()
+
+        check = self.verify(partial_path)
+        if not check['ok']:
+            os.remove(partial_path)
+            raise sqlite3.DatabaseError(f"Backup of {source_path} failed verification: {check['integrity']}")
+
+        os.replace(partial_path, target_path)
+        return {
+            'path': target_path,
+            'bytes': os.path.getsize(target_path),
+            'pages': progress['total'],
+            'restarts': progress['restarts'],
+            'stepped': stepped,
+            'seconds': round(time.perf_counter() - started, 3),
+            'tables': check['tables']
+        }
+
+    def verify(self, path: Optional[str] = None, quick: bool = False) -> Dict:
+        """Integrity check of a copy (or the live database) opened read-only, with row counts"""
+        path = path or self.db_path
+        if not os.path.exists(path):
+            return {'path': path, 'ok': False, 'integrity': 'missing', 'tables': {}}
+
+        conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True, timeout=30)
+        try:
+            pragma = 'quick_check' if quick else 'integrity_check'
+            problems = [row[0] for row in conn.execute(f"PRAGMA {pragma}").fetchall()]
+            integrity = 'ok' if problems == ['ok'] else '; '.join(problems[:10])
+
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            tables = {
+                table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in CORE_TABLES if table in existing
+            }
+        except sqlite3.DatabaseError as e:
+            integrity, tables = str(e), {}
+        finally:
+            conn.close()
+
+        return {'path': path, 'ok': integrity == 'ok', 'integrity': integrity, 'tables': tables}
+
+    def snapshot(self, label: Optional[str] = None, prune: bool = True) -> Dict:
+        """Write a timestamped copy to the backup directory and prune old snapshots"""
+        os.makedirs(self.backup_dir, exist_ok=True)
+        name = SNAPSHOT_PREFIX + datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+        if label:
+            name = f"{name}-{label}"
+        result = self.copy_database(self.db_path, os.path.join(self.backup_dir, name + ".db"))
+        result['pruned'] = self.prune() if prune else []
+        return result
+
+    def list_snapshots(self) -> List[Dict]:
+        """Snapshots in the backup directory, newest first"""
+        if not os.path.isdir(self.backup_dir):
+            return []
+
+        snapshots = []
+        for name in os.listdir(self.backup_dir):
+            if name.startswith(SNAPSHOT_PREFIX) and name.endswith(".db"):
+                path = os.path.join(self.backup_dir, name)
+                snapshots.append({'name': name, 'path': path, 'bytes': os.path.getsize(path)})
+        # The timestamp in the name sorts in time order
+        snapshots.sort(key=lambda snapshot: snapshot['name'], reverse=True)
+        return snapshots
+
+    def prune(self) -> List[str]:
+        """Delete all but the newest ``keep`` snapshots; labelled pre-restore copies count too"""
+        if self.keep <= 0:
+            return []
+        removed = []
+        for snapshot in self.list_snapshots()[self.keep:]:
+            os.remove(snapshot['path'])
+            removed.append(snapshot['name'])
+        return removed
+
+    def restore(self, snapshot_path: str) -> Dict:
+        """Replace the live database's contents with a verified snapshot.
+
+        The current contents are snapshotted first (labelled ``pre-restore``).
+        The copy goes through the backup API, so app connections stay valid;
+        app processes still serve cached reads until their cache TTLs expire.
+        """
+        check = self.verify(snapshot_path)
+        if not check['ok']:
+            raise sqlite3.DatabaseError(f"Refusing to restore {snapshot_path}: {check['integrity']}")
+
+        # Not pruned here, which could delete the snapshot being restored
+        safety = self.snapshot(label='pre-restore', prune=False) if os.path.exists(self.db_path) else None
+
+        source = sqlite3.connect(f"file:{os.path.abspath(snapshot_path)}?mode=ro", uri=True)
+        target = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            # One step: a half-restored database must never be visible
+            source.backup(target, pages=-1)
+        finally:
+            target.close()
+            source.close()
+
+        return {
+            'restored_from': snapshot_path,
+            'pre_restore_snapshot': safety['path'] if safety else None,
+            'verify': self.verify()
+        }
+
+def start_periodic_snapshots(db_path: Optional[str] = None, interval_minutes: Optional[float] = None) -> Optional[threading.Thread]:
+    """Snapshot the database (and its shards) every ``interval_minutes`` in a background thread, once per process"""
+    from src.config.settings import settings
+    from src.storage.sharding import shard_count, shard_location
+
+    interval_minutes = settings.BACKUP_INTERVAL_MINUTES if interval_minutes is None else interval_minutes
+    db_path = db_path or settings.DATABASE_URL
+    if interval_minutes <= 0:
+        return None
+    if db_path in _snapshot_threads:
+        return _snapshot_threads[db_path]
+
+    def run():
+        try:
+            backups = [DatabaseBackup(db_path)]
+        except ValueError as e:
+            print(f"Periodic snapshots disabled: {e}")
+            return
+        shards = shard_count(db_path)
+        if shards > 1:
+            backups += [DatabaseBackup(shard_location(db_path, index)) for index in range(shards)]
+        while True:
+            time.sleep(interval_minutes * 60)
+            for backup in backups:
+                try:
+                    result = backup.snapshot()
+                    print(f"Snapshot written to {result['path']} ({result['bytes']} bytes, {result['seconds']}s)")
+                except Exception as e:
+                    print(f"Snapshot error: {e}")
+
+    thread = threading.Thread(target=run, name="db-snapshots", daemon=True)
+    _snapshot_threads[db_path] = thread
+    thread.start()
+    return thread
+
+if __name__ == "__main__":
+    import sys
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else None
+    print(json.dumps(DatabaseBackup(db_path).snapshot()))
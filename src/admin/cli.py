@@ -0,0 +1,541 @@
+"""Operational tasks against the app database.
+
+    smartprep-admin check
+    smartprep-admin vacuum --pages 2000
+    smartprep-admin analyze --full
+    smartprep-admin rebuild --only topic_stats
+    smartprep-admin sizes
+    smartprep-admin prune-orphans --dry-run
+    smartprep-admin snapshot
+    smartprep-admin rollup
+    smartprep-admin calibrate --model 2pl
+    smartprep-admin refit-bkt --iterations 20
+    smartprep-admin replay-bandit --policy thompson --policy rule
+    smartprep-admin recommend --workers 4
+
+Work is done in short transactions with pauses in between, so the app keeps
+serving while a task runs. With DATABASE_SHARDS > 1 every task runs on the
+main database and all shard files, in parallel where it is safe to. Results
+are printed as JSON; the exit status is non-zero when a check fails or a task
+does not apply to the backend.
+"""
+import argparse
+import contextlib
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+from src.storage.base import get_storage
+from src.storage.sharding import shard_count, shard_index_of, shard_location
+
+# In dependency order: topic_mastery is recomputed from topic_stats
+DERIVED_TABLES = ['user_stats', 'topic_stats', 'topic_mastery', 'bkt_state', 'bandit_arms', 'item_stats', 'quiz_search']
+
+class NotSupported(Exception):
+    """The task does not apply to this storage backend"""
+
+def require_sqlite(storage):
+    if storage.dialect != 'sqlite':
+        raise NotSupported(f"only SQLite databases are supported, not {storage.dialect}")
+
+def vacuum(storage, pages: int, pause: float, enable_incremental: bool = False) -> Dict:
+    """Hand free pages back to the filesystem a few at a time with incremental VACUUM"""
+    require_sqlite(storage)
+    conn = storage.connect()
+    conn.isolation_level = None  # PRAGMAs and VACUUM cannot run inside a transaction
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        size_before = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            if not enable_incremental:
+                raise NotSupported("auto_vacuum is not INCREMENTAL; run once with --enable-incremental "
+                                   "(a full VACUUM that blocks writers while it runs)")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+
+        steps = 0
+        while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+            # Each call holds the write lock only while it frees ``pages`` pages
+            conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+            steps += 1
+            time.sleep(pause)
+
+        size_after = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+    finally:
+        conn.close()
+
+    return {'bytes_before': size_before, 'bytes_after': size_after,
+            'bytes_freed': size_before - size_after, 'steps': steps}
+
+def analyze(storage, full: bool = False, fts: bool = False) -> Dict:
+    """Refresh query planner statistics; by default only where SQLite thinks they are stale"""
+    conn = storage.connect()
+    started = time.perf_counter()
+    try:
+        cursor = conn.cursor()
+        if storage.dialect != 'sqlite':
+            cursor.execute("ANALYZE")
+        elif full:
+            cursor.execute("ANALYZE")
+        else:
+            cursor.execute("PRAGMA analysis_limit = 1000")
+            cursor.execute("PRAGMA optimize")
+
+        if fts and storage.supports_full_text_search and storage.table_exists(cursor, 'quiz_search'):
+            # Merge the full-text index segments written by single-session inserts
+            cursor.execute("INSERT INTO quiz_search (quiz_search) VALUES ('optimize')")
+        conn.commit()
+    finally:
+        conn.close()
+
+    return {'mode': 'analyze' if full or storage.dialect != 'sqlite' else 'optimize',
+            'fts_optimized': bool(fts and storage.supports_full_text_search),
+            'seconds': round(time.perf_counter() - started, 3)}
+
+def rebuild(storage, tables: List[str], since_day: str = None) -> Dict:
+    """Recompute derived tables from the tables they summarise"""
+    from src.models.user_stats import UserStats
+    from src.models.question_log import QuestionLogger
+    from src.models.quiz_search import QuizSearchIndex
+
+    report = {}
+    for table in tables:
+        started = time.perf_counter()
+        if table == 'user_stats':
+            UserStats(storage.location).rebuild()
+        elif table == 'topic_stats':
+            QuestionLogger(storage.location).rebuild_topic_stats(since_day)
+        elif table == 'topic_mastery':
+            QuestionLogger(storage.location).mastery.rebuild()
+        elif table == 'bkt_state':
+            QuestionLogger(storage.location).knowledge.rebuild()
+        elif table == 'bandit_arms':
+            QuestionLogger(storage.location).bandit.rebuild()
+        elif table == 'item_stats':
+            from src.models.item_stats import ItemStats
+            report['item_stats_rows'] = ItemStats(storage.location).rebuild()['folded_rows']
+        elif table == 'quiz_search':
+            report['quiz_search_sessions'] = QuizSearchIndex(storage.location).rebuild()
+        report[table] = round(time.perf_counter() - started, 3)
+    return report
+
+def orphan_counts(storage) -> Dict:
+    """Rows that point at a session or user that no longer exists"""
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor()
+        counts = {}
+        cursor.execute('''
+            SELECT COUNT(*) FROM question_log ql
+            WHERE ql.session_id IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM quiz_sessions s WHERE s.id = ql.session_id)
+        ''')
+        counts['question_log_without_session'] = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT COUNT(*) FROM quiz_sessions s
+            WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.id = s.user_id)
+        ''')
+        counts['quiz_sessions_without_user'] = cursor.fetchone()[0]
+        if storage.supports_full_text_search and storage.table_exists(cursor, 'quiz_search'):
+            cursor.execute('''
+                SELECT COUNT(*) FROM quiz_search
+                WHERE rowid NOT IN (SELECT id FROM quiz_sessions)
+            ''')
+            counts['quiz_search_without_session'] = cursor.fetchone()[0]
+        return counts
+    finally:
+        conn.close()
+
+def check(storage, quick: bool = False) -> Dict:
+    """Integrity check plus dangling references"""
+    report = {'orphans': orphan_counts(storage)}
+    if storage.dialect == 'sqlite':
+        from src.admin.backup import DatabaseBackup
+        report['integrity'] = DatabaseBackup(storage.location).verify(quick=quick)
+        report['ok'] = report['integrity']['ok']
+    else:
+        report['ok'] = True  # PostgreSQL checks its own pages
+    return report
+
+def sizes(storage) -> List[Dict]:
+    """On-disk size of every table and index, largest first"""
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor()
+        if storage.dialect == 'sqlite':
+            cursor.execute('''
+                SELECT d.name, COALESCE(m.type, 'internal'), COALESCE(m.tbl_name, d.name),
+                       SUM(d.pgsize), COUNT(*)
+                FROM dbstat d
+                LEFT JOIN sqlite_master m ON m.name = d.name
+                GROUP BY d.name
+                ORDER BY SUM(d.pgsize) DESC
+            ''')
+        else:
+            cursor.execute('''
+                SELECT c.relname, CASE c.relkind WHEN 'i' THEN 'index' ELSE 'table' END,
+                       COALESCE(t.relname, c.relname), pg_relation_size(c.oid),
+                       pg_relation_size(c.oid) / current_setting('block_size')::int
+                FROM pg_class c
+                LEFT JOIN pg_index i ON i.indexrelid = c.oid
+                LEFT JOIN pg_class t ON t.oid = i.indrelid
+                WHERE c.relnamespace = 'public'::regnamespace AND c.relkind IN ('r', 'i')
+                ORDER BY pg_relation_size(c.oid) DESC
+            ''')
+        return [
+            {'name': row[0], 'type': row[1], 'table': row[2], 'bytes': row[3], 'pages': row[4]}
+            for row in cursor.fetchall()
+        ]
+    finally:
+        conn.close()
+
+def _forget_answers(storage, cursor, ids: List[int]):
+    """Take question_log rows out of the counters that were built from them, before they are deleted"""
+    from src.models.bandit import question_type_label
+    from src.models.item_stats import WATERMARK
+
+    placeholders = ','.join('?' * len(ids))
+    cursor.execute(f'''
+        SELECT ql.id, ql.user_id, substr(ql.created_at, 1, 10), ql.topic, COALESCE(ql.sub_topic, ''),
+               COALESCE(ql.difficulty, ''), COALESCE(ql.question_type, ''),
+               CASE WHEN ql.is_correct THEN 1 ELSE 0 END, COALESCE(ql.time_taken, 0), q.question_hash
+        FROM question_log ql
+        LEFT JOIN questions q ON q.id = ql.question_id
+        WHERE ql.id IN ({placeholders}) AND ql.topic IS NOT NULL
+    ''', ids)
+    rows = cursor.fetchall()
+
+    rolled_up_to = 0
+    if storage.table_exists(cursor, 'rollup_watermarks'):
+        cursor.execute('SELECT last_id FROM rollup_watermarks WHERE name = ?', [WATERMARK])
+        row = cursor.fetchone()
+        rolled_up_to = row[0] if row else 0
+
+    topic_stats, arms, question_stats, labels = {}, {}, {}, {}
+    for row_id, user_id, day, topic, sub_topic, difficulty, question_type, correct, time_taken, question_hash in rows:
+        if user_id is not None:
+            counts = topic_stats.setdefault((user_id, day, topic, sub_topic, difficulty), [0, 0, 0])
+            counts[0] += correct
+            counts[1] += 1
+            counts[2] += time_taken
+            counts = arms.setdefault((user_id, topic, sub_topic, difficulty, question_type_label(question_type)), [0, 0])
+            counts[0 if correct else 1] += 1
+        if row_id <= rolled_up_to:
+            if question_hash is not None:
+                counts = question_stats.setdefault(question_hash, [0, 0, 0])
+                counts[0] += 1
+                counts[1] += correct
+                counts[2] += time_taken
+            counts = labels.setdefault((topic, sub_topic, difficulty), [0, 0])
+            counts[0] += 1
+            counts[1] += correct
+
+    updates = [
+        ('topic_stats', 'correct = correct - ?, total = total - ?, time_taken = time_taken - ?',
+         'user_id = ? AND day = ? AND topic = ? AND sub_topic = ? AND difficulty = ?', 'total <= 0', topic_stats),
+        ('bandit_arms', 'correct = correct - ?, wrong = wrong - ?',
+         'user_id = ? AND topic = ? AND sub_topic = ? AND difficulty = ? AND question_type = ?',
+         'correct + wrong <= 0', arms),
+        ('question_stats', 'answered = answered - ?, correct = correct - ?, time_taken = time_taken - ?',
+         'question_hash = ?', 'answered <= 0', {(key,): value for key, value in question_stats.items()}),
+        ('topic_difficulty_stats', 'answered = answered - ?, correct = correct - ?',
+         'topic = ? AND sub_topic = ? AND difficulty = ?', 'answered <= 0', labels)
+    ]
+    for table, assignments, key, empty, counts in updates:
+        if counts and storage.table_exists(cursor, table):
+            cursor.executemany(f"UPDATE {table} SET {assignments} WHERE {key}",
+                               [[*value, *key_values] for key_values, value in counts.items()])
+            cursor.executemany(f"DELETE FROM {table} WHERE {key} AND {empty}", [list(key_values) for key_values in counts])
+
+def prune_orphans(storage, batch_size: int, pause: float, dry_run: bool = False) -> Dict:
+    """Delete question_log rows whose session no longer exists, one short transaction per batch.
+
+    Each batch also takes its answers out of topic_stats, bandit_arms and the
+    item rollups, and drops review items left with no logged answer. Mastery
+    and knowledge states are recomputed once at the end.
+    """
+    from src.models.question_log import QuestionLogger
+
+    if dry_run:
+        return {'would_delete': orphan_counts(storage)['question_log_without_session']}
+
+    conn = storage.connect()
+    deleted = 0
+    last_id = 0
+    try:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute('''
+                SELECT ql.id FROM question_log ql
+                WHERE ql.id > ? AND ql.session_id IS NOT NULL
+                  AND NOT EXISTS (SELECT 1 FROM quiz_sessions s WHERE s.id = ql.session_id)
+                ORDER BY ql.id
+                LIMIT ?
+            ''', [last_id, int(batch_size)])
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+
+            placeholders = ','.join('?' * len(ids))
+            cursor.execute(f'''
+                SELECT DISTINCT user_id, question_id FROM question_log
+                WHERE id IN ({placeholders}) AND user_id IS NOT NULL AND question_id IS NOT NULL
+            ''', ids)
+            reviewed = cursor.fetchall()
+            _forget_answers(storage, cursor, ids)
+
+            cursor.execute(f"DELETE FROM question_log WHERE id IN ({placeholders})", ids)
+            if reviewed and storage.table_exists(cursor, 'review_items'):
+                cursor.executemany('''
+                    DELETE FROM review_items WHERE user_id = ? AND question_id = ? AND NOT EXISTS (
+                        SELECT 1 FROM question_log WHERE user_id = ? AND question_id = ?
+                    )
+                ''', [[user_id, question_id, user_id, question_id] for user_id, question_id in reviewed])
+            conn.commit()
+
+            deleted += len(ids)
+            last_id = ids[-1]
+            time.sleep(pause)  # let live writers in between batches
+    finally:
+        conn.close()
+
+    if deleted:
+        # Both are derived from what is left: topic_stats and the hot question_log
+        question_logger = QuestionLogger(storage.location)
+        question_logger.mastery.rebuild()
+        question_logger.knowledge.rebuild()
+    return {'deleted': deleted}
+
+def stats(storage) -> Dict:
+    """Row counts and score totals of one database"""
+    since = (datetime.utcnow() - timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S')
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor()
+        result = {'users': 0, 'sessions': 0, 'score_total': 0.0, 'sessions_last_day': 0, 'logged_questions': 0}
+        if storage.table_exists(cursor, 'users'):
+            cursor.execute("SELECT COUNT(*) FROM users")
+            result['users'] = cursor.fetchone()[0]
+        if storage.table_exists(cursor, 'quiz_sessions'):
+            cursor.execute('''
+                SELECT COUNT(*), COALESCE(SUM(score), 0),
+                       SUM(CASE WHEN created_at >= ? THEN 1 ELSE 0 END)
+                FROM quiz_sessions
+            ''', [since])
+            result['sessions'], result['score_total'], last_day = cursor.fetchone()
+            result['sessions_last_day'] = last_day or 0
+        if storage.table_exists(cursor, 'question_log'):
+            cursor.execute("SELECT COUNT(*) FROM question_log")
+            result['logged_questions'] = cursor.fetchone()[0]
+        return result
+    finally:
+        conn.close()
+
+def all_databases(storage) -> List:
+    """The given database and, when it is a sharded main database, every shard"""
+    shards = shard_count(storage.location)
+    if shards <= 1 or shard_index_of(storage.location) is not None:
+        return [storage]
+    return [storage] + [get_storage(shard_location(storage.location, index)) for index in range(shards)]
+
+def on_each(databases: List, task: Callable, parallel: bool = True):
+    """Run a task on every database; one database gives its result unwrapped"""
+    if len(databases) == 1:
+        return task(databases[0])
+    if parallel:
+        with ThreadPoolExecutor(max_workers=len(databases), thread_name_prefix='admin') as pool:
+            results = list(pool.map(task, databases))
+    else:
+        results = [task(database) for database in databases]
+    return {database.location: result for database, result in zip(databases, results)}
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='smartprep-admin', description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help="SQLite path or postgresql:// URL (default: DATABASE_URL)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('check', help="integrity check and dangling references")
+    command.add_argument('--quick', action='store_true', help="PRAGMA quick_check instead of integrity_check")
+
+    command = commands.add_parser('vacuum', help="incremental VACUUM (SQLite)")
+    command.add_argument('--pages', type=int, default=1000, help="pages freed per step")
+    command.add_argument('--pause', type=float, default=0.05, help="seconds between steps")
+    command.add_argument('--enable-incremental', action='store_true',
+                         help="switch auto_vacuum to INCREMENTAL first (one full, blocking VACUUM)")
+
+    command = commands.add_parser('analyze', help="refresh planner statistics")
+    command.add_argument('--full', action='store_true', help="full ANALYZE instead of PRAGMA optimize")
+    command.add_argument('--fts', action='store_true', help="also merge the full-text index segments")
+
+    command = commands.add_parser('rebuild', help="recompute derived tables")
+    command.add_argument('--only', action='append', choices=DERIVED_TABLES,
+                         help="table to rebuild; repeat for several (default: all)")
+    command.add_argument('--since', help="topic_stats: rebuild from this YYYY-MM-DD day on")
+
+    commands.add_parser('sizes', help="table and index sizes")
+
+    command = commands.add_parser('prune-orphans', help="delete question_log rows whose session is gone, "
+                                                         "and their answers from the derived tables")
+    command.add_argument('--batch-size', type=int, default=1000)
+    command.add_argument('--pause', type=float, default=0.05)
+    command.add_argument('--dry-run', action='store_true', help="only count them")
+
+    commands.add_parser('snapshot', help="online backup to BACKUP_DIR (SQLite)")
+    commands.add_parser('snapshots', help="list snapshots, newest first")
+    command = commands.add_parser('restore', help="restore a snapshot over the database (SQLite)")
+    command.add_argument('snapshot_path')
+
+    commands.add_parser('archive', help="move old question_log rows to the archive database (SQLite)")
+
+    command = commands.add_parser('reencode', help="convert legacy JSON session blobs (SQLite)")
+    command.add_argument('--batch-size', type=int, default=200)
+    command.add_argument('--pause', type=float, default=0.5)
+
+    commands.add_parser('backfill', help="move pre-question-store rows onto the questions table")
+
+    command = commands.add_parser('rollup', help="fold new question_log rows into the cross-user item stats")
+    command.add_argument('--batch-size', type=int, default=50000)
+
+    command = commands.add_parser('calibrate', help="fit IRT item difficulties and user abilities")
+    command.add_argument('--model', choices=['1pl', '2pl'], default='2pl')
+    command.add_argument('--max-iterations', type=int, default=100)
+    command.add_argument('--tolerance', type=float, default=1e-2, help="stop once no estimate moves by more (logits)")
+    command.add_argument('--cold', action='store_true', help="start from zero instead of the stored estimates")
+
+    command = commands.add_parser('refit-bkt', help="fit knowledge tracing parameters and replay user states")
+    command.add_argument('--iterations', type=int, default=20, help="EM iterations at most")
+
+    command = commands.add_parser('replay-bandit', help="replay question_log to compare recommendation policies")
+    command.add_argument('--policy', action='append', choices=['thompson', 'rule', 'random'],
+                         help="policy to evaluate; repeat for several (default: all)")
+    command.add_argument('--seed', type=int, default=7)
+
+    command = commands.add_parser('recommend', help="precompute recommendations for recently active users")
+    command.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+    command.add_argument('--days', type=int, default=30, help="users who answered questions in this many days")
+    command.add_argument('--chunk-size', type=int, default=200, help="users per worker task")
+
+    commands.add_parser('stats', help="users, sessions and scores summed over all shards")
+    commands.add_parser('migrate-shards', help="move quiz data written before sharding to the users' shards")
+    return parser
+
+def run(args) -> object:
+    storage = get_storage(args.db)
+    databases = all_databases(storage)
+
+    if args.command == 'check':
+        result = on_each(databases, lambda database: check(database, args.quick))
+        if len(databases) > 1:
+            result = {'ok': all(part['ok'] for part in result.values()), 'databases': result}
+        return result
+    if args.command == 'vacuum':
+        return on_each(databases, lambda database: vacuum(database, args.pages, args.pause, args.enable_incremental))
+    if args.command == 'analyze':
+        return on_each(databases, lambda database: analyze(database, args.full, args.fts))
+    if args.command == 'rebuild':
+        return rebuild(storage, args.only or DERIVED_TABLES, args.since)  # the managers cover the shards
+    if args.command == 'sizes':
+        return on_each(databases, sizes)
+    if args.command == 'prune-orphans':
+        return on_each(databases, lambda database: prune_orphans(database, args.batch_size, args.pause, args.dry_run))
+
+    if args.command == 'stats':
+        per_database = on_each(databases, stats)
+        if len(databases) == 1:
+            per_database = {storage.location: per_database}
+        totals = {key: sum(part[key] for part in per_database.values())
+                  for key in ('sessions', 'score_total', 'sessions_last_day', 'logged_questions')}
+        totals['users'] = per_database[storage.location]['users']  # shards hold copies
+        totals['avg_score'] = round(totals['score_total'] / totals['sessions'], 2) if totals['sessions'] else 0.0
+        return {'totals': totals, 'databases': per_database}
+
+    if args.command == 'rollup':
+        from src.models.item_stats import ItemStats
+        return ItemStats(storage.location).refresh(args.batch_size)  # covers the shards
+
+    if args.command == 'calibrate':
+        from src.models.irt import IRTCalibration
+        # Reads every shard and stores the estimates in the main database
+        return IRTCalibration(storage.location).calibrate(args.model, args.max_iterations, args.tolerance,
+                                                           warm_start=not args.cold)
+
+    if args.command == 'refit-bkt':
+        from src.models.knowledge_tracing import TopicKnowledge
+        # Fits over every shard, stores the parameters in the main database and replays each shard's states
+        return TopicKnowledge(storage.location).refit(args.iterations)
+
+    if args.command == 'replay-bandit':
+        from src.models.bandit import replay_evaluate
+        return replay_evaluate(storage.location, args.policy, args.seed)  # replays every shard
+
+    if args.command == 'recommend':
+        from src.models.recommendations import generate_recommendations
+        # Quiz data is read from the users' shards, so the main database has nothing to add
+        shards = databases[1:] or databases
+        # Each run already uses every CPU, so the databases take turns
+        return on_each(shards, lambda database: generate_recommendations(
+            database.location, args.workers, args.days, args.chunk_size), parallel=False)
+
+    if args.command == 'migrate-shards':
+        from src.storage.sharding import migrate_to_shards
+        require_sqlite(storage)
+        if len(databases) == 1:
+            raise NotSupported("DATABASE_SHARDS is 1; set it before migrating")
+        return migrate_to_shards(storage.location)
+
+    if args.command in ('snapshot', 'snapshots', 'restore'):
+        from src.admin.backup import DatabaseBackup
+        require_sqlite(storage)
+        if args.command == 'snapshot':
+            return on_each(databases, lambda database: DatabaseBackup(database.location).snapshot())
+        if args.command == 'snapshots':
+            return on_each(databases, lambda database: DatabaseBackup(database.location).list_snapshots())
+        # Restores one file; pass a shard file as --db to restore a shard
+        return DatabaseBackup(storage.location).restore(args.snapshot_path)
+
+    if args.command == 'archive':
+        from src.models.retention import QuestionLogRetention
+        require_sqlite(storage)
+        # One archive file is shared, so the databases take turns
+        return on_each(databases, lambda database: QuestionLogRetention(database.location).archive_old_rows(),
+                       parallel=False)
+
+    if args.command == 'reencode':
+        from src.models.simple_session import SimpleSessionManager
+        require_sqlite(storage)
+        session_manager = SimpleSessionManager(storage.location)
+        total = 0
+        while True:
+            converted = session_manager.reencode_blobs(args.batch_size)
+            if not converted:
+                break
+            total += converted
+            time.sleep(args.pause)
+        return {'reencoded_sessions': total}
+
+    if args.command == 'backfill':
+        from src.models.question_store import QuestionStore
+        return on_each(databases, lambda database: QuestionStore(database.location).backfill_existing_rows())
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    # The managers print progress lines; keep stdout for the JSON result
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            result = run(args)
+        except NotSupported as e:
+            print(f"{args.command}: {e}", file=sys.stderr)
+            return 2
+
+    print(json.dumps(result, indent=2))
+    if args.command == 'check' and not result['ok']:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
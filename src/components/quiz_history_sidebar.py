@@ -1,5 +1,6 @@
 import streamlit as st
 from src.models.simple_session import SimpleSessionManager
+from src.models.quiz_search import is_date_term
 import urllib.parse
 
 def show_quiz_history_right_sidebar():
@@ -13,31 +14,53 @@ def show_quiz_history_right_sidebar():
     
     return st.session_state.get('show_history', False)
 
+HISTORY_PAGE_SIZE = 15
+SEARCH_RESULT_LIMIT = 30
+
 def render_history_content():
     """Render the actual history content"""
     session_manager = SimpleSessionManager()
-    user_sessions = session_manager.get_user_sessions(st.session_state.user['id'], 15)
+    user_id = st.session_state.user['id']
     
     st.markdown("### 📚 Quiz History")
     
-    if not user_sessions:
-        st.write("No previous quizzes")
-        return
-    
     # Search/filter functionality
-    search_term = st.text_input("🔍 Search quizzes...", placeholder="Search by topic or date", key="history_search")
+    search_term = st.text_input("🔍 Search quizzes...", placeholder="Search topics, questions, explanations or a date", key="history_search")
+    search_term = search_term.strip()
+    only_missed = False
+    if search_term and not is_date_term(search_term):
+        only_missed = st.checkbox("Only questions I got wrong", key="history_only_missed")
+    
+    # Loaded results are kept across reruns; a new search starts over
+    history = st.session_state.get('history_pages')
+    if not history or history['search_term'] != search_term or history['only_missed'] != only_missed:
+        if search_term:
+            sessions = session_manager.search_sessions(user_id, search_term, SEARCH_RESULT_LIMIT, only_missed)
+            next_cursor = None
+        else:
+            page = session_manager.get_user_sessions_page(user_id, HISTORY_PAGE_SIZE)
+            sessions, next_cursor = page['sessions'], page['next_cursor']
+        history = {
+            'search_term': search_term,
+            'only_missed': only_missed,
+            'sessions': sessions,
+            'next_cursor': next_cursor
+        }
+        st.session_state.history_pages = history
+    
+    filtered_sessions = history['sessions']
     
-    # Filter sessions based on search
+    if not filtered_sessions:
+        st.write("No matching quizzes" if search_term else "No previous quizzes")
+        return
+    
+    # Search results are shown best match first
     if search_term:
-        filtered_sessions = [
-            session for session in user_sessions 
-            if search_term.lower() in session['display_title'].lower() or 
-               search_term.lower() in session['created_at'].lower()
-        ]
-    else:
-        filtered_sessions = user_sessions
+        for session in filtered_sessions:
+            _render_session_entry(session, show_date=True)
+        return
     
-    # Group by date
+    # Sessions arrive newest first, so each date forms one contiguous group
     grouped_sessions = {}
     for session in filtered_sessions:
         date_key = session['short_date'] if session['short_date'] else "Unknown"
@@ -46,45 +69,64 @@ def render_history_content():
         grouped_sessions[date_key].append(session)
     
     # Display grouped sessions
-    for date, sessions in sorted(grouped_sessions.items(), reverse=True):
+    for date, sessions in grouped_sessions.items():
         if date != "Unknown":
             st.markdown(f"**{date}**")
         
         for session in sessions:
-            # Score indicator
-            score = session.get('score', 0)
-            if score >= 80:
-                score_icon = "🟢"
-            elif score >= 60:
-                score_icon = "🟡" 
-            else:
-                score_icon = "🔴"
+            _render_session_entry(session)
+    
+    # Next page on demand, one keyset query per click
+    if history['next_cursor']:
+        if st.button("Load older quizzes", key="history_load_more", use_container_width=True):
+            page = session_manager.get_user_sessions_page(
+                user_id, HISTORY_PAGE_SIZE, cursor_key=history['next_cursor']
+            )
+            history['sessions'] = history['sessions'] + page['sessions']
+            history['next_cursor'] = page['next_cursor']
+            st.rerun()
+
+def _render_session_entry(session: dict, show_date: bool = False):
+    """Render one quiz in the history list"""
+    # Score indicator
+    score = session.get('score', 0)
+    if score >= 80:
+        score_icon = "🟢"
+    elif score >= 60:
+        score_icon = "🟡" 
+    else:
+        score_icon = "🔴"
+    
+    # Create a container for each quiz
+    with st.container():
+        col1, col2 = st.columns([3, 1])
+        
+        with col1:
+            # Quiz title and info
+            title = session['display_title']
+            if len(title) > 25:
+                title = title[:25] + "..."
             
-            # Create a container for each quiz
-            with st.container():
-                col1, col2 = st.columns([3, 1])
-                
-                with col1:
-                    # Quiz title and info
-                    title = session['display_title']
-                    if len(title) > 25:
-                        title = title[:25] + "..."
-                    
-                    st.markdown(f"**{score_icon} {title}**")
-                    st.caption(f"{score:.0f}% • {session['difficulty']} • {session['num_questions']}Q")
-                
-                with col2:
-                    if st.button("👁️", key=f"view_{session['id']}", help="Review quiz"):
-                        st.session_state.viewing_quiz_id = session['id']
-                        st.session_state.view_mode = 'revision'
-                        st.rerun()
-                
-                st.markdown("---")
+            st.markdown(f"**{score_icon} {title}**")
+            details = f"{score:.0f}% • {session['difficulty']} • {session['num_questions']}Q"
+            if show_date and session.get('short_date'):
+                details += f" • {session['short_date']}"
+            st.caption(details)
+            if session.get('snippet'):
+                st.caption(session['snippet'])
+        
+        with col2:
+            if st.button("👁️", key=f"view_{session['id']}", help="Review quiz"):
+                st.session_state.viewing_quiz_id = session['id']
+                st.session_state.view_mode = 'revision'
+                st.rerun()
+        
+        st.markdown("---")
 
 def show_revision_view(session_id: int):
     """Display quiz in read-only revision mode with backward compatibility"""
     session_manager = SimpleSessionManager()
-    session_data = session_manager.get_complete_session(session_id)
+    session_data = session_manager.get_complete_session(session_id, st.session_state.user['id'])
     
     if not session_data:
         st.error("Quiz session not found!")
@@ -13,5 +13,63 @@ class Settings():
 
     MAX_RETRIES = 3
 
+    # SQLite file path, or a postgresql:// URL so every replica shares one database
+    DATABASE_URL = os.getenv("DATABASE_URL", "studyai.db")
+    
+    DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "10"))
+    
+    # SQLite only: spread users' quiz data over this many shard files (src/storage/sharding.py)
+    DATABASE_SHARDS = int(os.getenv("DATABASE_SHARDS", "1"))
+    
+    # Encoding for quiz session blobs: json, zlib-json, zstd-json,
+    # msgpack, zlib-msgpack or zstd-msgpack (see src/utils/blob_codec.py)
+    BLOB_CODEC = os.getenv("BLOB_CODEC", "zlib-json")
+
+    # Raw question_log rows older than this many days are moved to the archive
+    # database; their daily rollups stay in topic_stats
+    QUESTION_LOG_RETENTION_DAYS = int(os.getenv("QUESTION_LOG_RETENTION_DAYS", "180"))
+
+    QUESTION_LOG_ARCHIVE_PATH = os.getenv("QUESTION_LOG_ARCHIVE_PATH", "studyai_archive.db")
+
+    QUESTION_LOG_ARCHIVE_COMPRESS = os.getenv("QUESTION_LOG_ARCHIVE_COMPRESS", "true").lower() == "true"
+
+    # Answers count half as much towards topic mastery after this many days (src/models/mastery.py)
+    MASTERY_HALF_LIFE_DAYS = float(os.getenv("MASTERY_HALF_LIFE_DAYS", "14"))
+
+    # Batch recommendations older than this are recomputed on demand (src/models/recommendations.py)
+    RECOMMENDATIONS_MAX_AGE_HOURS = float(os.getenv("RECOMMENDATIONS_MAX_AGE_HOURS", "26"))
+
+    # "thompson" samples the suggested quiz's topic, difficulty and type; "rule" keeps the
+    # weakest topic at a fixed difficulty (src/models/bandit.py)
+    RECOMMENDATION_POLICY = os.getenv("RECOMMENDATION_POLICY", "thompson")
+
+    # In-process cache of quiz history lists and full sessions (src/utils/cache.py)
+    SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "300"))
+    
+    SESSION_LIST_CACHE_ENTRIES = int(os.getenv("SESSION_LIST_CACHE_ENTRIES", "2048"))
+    
+    SESSION_DETAIL_CACHE_ENTRIES = int(os.getenv("SESSION_DETAIL_CACHE_ENTRIES", "256"))
+    
+    # Per-user dashboard state (counters, topic buckets, recent answers), written through on submit
+    USER_STATE_CACHE_USERS = int(os.getenv("USER_STATE_CACHE_USERS", "1000"))
+    
+    USER_STATE_IDLE_SECONDS = float(os.getenv("USER_STATE_IDLE_SECONDS", "900"))
+    
+    USER_STATE_MAX_AGE_SECONDS = float(os.getenv("USER_STATE_MAX_AGE_SECONDS", "300"))
+    
+    # Print the number of database statements each Streamlit run made
+    LOG_DB_ROUND_TRIPS = os.getenv("LOG_DB_ROUND_TRIPS", "false").lower() == "true"
+    
+    # Online SQLite snapshots (src/admin/backup.py); 0 minutes turns periodic snapshots off
+    BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+    
+    BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "14"))
+    
+    BACKUP_INTERVAL_MINUTES = float(os.getenv("BACKUP_INTERVAL_MINUTES", "0"))
+    
+    BACKUP_PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+    
+    BACKUP_STEP_PAUSE_SECONDS = float(os.getenv("BACKUP_STEP_PAUSE_SECONDS", "0.05"))
+
 
 settings = Settings() 
\ No newline at end of file
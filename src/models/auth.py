@@ -1,16 +1,21 @@
 import streamlit as st
-import sqlite3
 import hashlib
 from typing import Optional, Dict
+from src.storage.base import get_storage
+from src.storage.sharding import location_for_user
 
 class AuthManager:
-    def __init__(self, db_path: str = "studyai.db"):
-        self.db_path = db_path
-        self.init_database()
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.storage.init_once('users', self.init_database)
     
     def init_database(self):
         """Initialize the database"""
-        conn = sqlite3.connect(self.db_path)
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+        
+        conn = self.storage.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -40,7 +45,7 @@ class AuthManager:
     def register_user(self, username: str, email: str, password: str) -> bool:
         """Register a new user"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self.storage.connect()
             cursor = conn.cursor()
             
             password_hash = self.hash_password(password)
@@ -59,11 +64,8 @@ class AuthManager:
     def login_user(self, username: str, password: str) -> Optional[Dict]:
         """Login user and return user data"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Use row factory to get dictionary-like access
-            conn.row_factory = sqlite3.Row
+            # Rows with dictionary-like access
+            conn = self.storage.connect(named_rows=True)
             cursor = conn.cursor()
             
             cursor.execute(
@@ -87,6 +89,7 @@ class AuthManager:
                     }
                     
                     conn.close()
+                    self.copy_to_shard(user_row)
                     return user_data
             
             conn.close()
@@ -96,6 +99,21 @@ class AuthManager:
             print(f"Login error: {e}")
             return None
     
+    def copy_to_shard(self, user_row):
+        """Make sure the user's shard has their row, which holds their quiz counters"""
+        shard_path = location_for_user(user_row['id'], self.db_path)
+        if shard_path == self.db_path:
+            return
+        
+        shard = AuthManager(shard_path)
+        conn = shard.storage.connect()
+        conn.execute(
+            "INSERT OR IGNORE INTO users (id, username, email, password_hash) VALUES (?, ?, ?, ?)",
+            (user_row['id'], user_row['username'], user_row['email'], user_row['password_hash'])
+        )
+        conn.commit()
+        conn.close()
+    
     def is_authenticated(self) -> bool:
         """Check if user is authenticated"""
         return 'user' in st.session_state and st.session_state.user is not None
@@ -127,7 +145,9 @@ class AuthManager:
             'retake_difficulty', 
             'retake_type',
             'retake_questions',
-            'rerun_trigger'
+            'rerun_trigger',
+            'history_pages',
+            'export_parts'
         ]
         
         for key in quiz_keys_to_clear:
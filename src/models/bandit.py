@@ -0,0 +1,374 @@
+"""Thompson sampling over topic, difficulty and question type for quiz recommendations.
+
+Every (topic, sub_topic, difficulty, question_type) a user can be offered
+is an arm with a Beta posterior over the chance they answer its questions
+correctly. Only the answer counts are stored per user; the prior comes from
+how all users do on that topic and difficulty (``ItemStats``), so changing
+it never needs a migration. Recording answers is one upsert per arm touched.
+A harder difficulty's prior is capped at what the user gets right at the
+next easier one and carries that evidence (``difficulty_priors``), so a
+user struggling on Easy is not sent to Hard on a flat guess.
+
+A quiz is worth most when the user is likely to get about
+``TARGET_P_CORRECT`` of it right (hard enough to learn from, easy enough
+not to discourage) and the topic is not yet known. To choose, one chance
+is drawn from each candidate arm's posterior and the arm maximising
+``(1 - P(known)) * (1 - |draw - TARGET_P_CORRECT|)`` wins. Arms with few
+answers have wide posteriors, so they are tried now and then instead of
+always repeating the current best guess.
+
+``replay_evaluate`` estimates how a policy would have done on the logged
+quiz history with the replay method: each logged quiz is shown to the
+policy, and only quizzes where it would have picked the same arm count and
+update its state. The estimate is unbiased only where users chose quizzes
+roughly at random among the candidates, so compare policies with it rather
+than reading its rewards as absolute.
+"""
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter, data_locations, main_location
+from src.models.irt import TARGET_P_CORRECT
+from src.models.knowledge_tracing import DEFAULT_PARAMS, MASTERED, MIN_ANSWERS, TopicKnowledge, update_known
+from src.models.mastery import WEAK_MASTERY
+from src.models.user_stats import user_state_cache
+
+DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+
+# Types as offered in the quiz form, keyed by how question_log stores them
+QUESTION_TYPES = {'MCQ': 'Multiple Choice', 'Fill in the blank': 'Fill in the Blank'}
+
+# P(correct) expected at each difficulty before any user has answered the topic
+DEFAULT_P_CORRECT = {'Easy': 0.8, 'Medium': 0.65, 'Hard': 0.5}
+
+# Weight of the cross-user prior, in answers
+PRIOR_ANSWERS = 2.0
+# Most of the user's answers at one difficulty carried into the next one's prior
+MAX_CARRIED_ANSWERS = 10.0
+
+Arm = Tuple[str, str, str, str]  # (topic, sub_topic, difficulty, question_type)
+
+def question_type_label(logged_type: Optional[str]) -> str:
+    return QUESTION_TYPES.get(logged_type or '', logged_type or 'Multiple Choice')
+
+def quiz_reward(correct: int, answered: int) -> float:
+    """1 for a quiz answered exactly at TARGET_P_CORRECT, falling linearly to 0 at the far end"""
+    accuracy = correct / answered if answered else 0.0
+    return 1 - abs(accuracy - TARGET_P_CORRECT) / max(TARGET_P_CORRECT, 1 - TARGET_P_CORRECT)
+
+def prior_p_correct(priors: Dict, topic: str, sub_topic: str, difficulty: str) -> float:
+    """All users' smoothed P(correct) at this topic and difficulty, from ``ItemStats.topic_difficulty()``"""
+    for key in ((topic, sub_topic, difficulty), (topic, '', difficulty)):
+        if key in priors:
+            return priors[key]['p_correct']
+    return DEFAULT_P_CORRECT.get(difficulty, 0.5)
+
+def difficulty_priors(arms: Dict[Arm, Tuple[int, int]], priors: Dict,
+                      topic: str, sub_topic: str) -> Dict[str, Tuple[float, float]]:
+    """(P(correct), weight in answers) the user's arms start from at each difficulty of one topic"""
+    result = {}
+    easier, carried = None, 0.0
+    for difficulty in DIFFICULTIES:
+        p_correct = prior_p_correct(priors, topic, sub_topic, difficulty)
+        if easier is not None:
+            # How much harder the label is for everyone, applied to the user's own rate one label down
+            easier_prior, easier_rate = easier
+            p_correct = min(p_correct, easier_rate * p_correct / max(easier_prior, 1e-6))
+        weight = PRIOR_ANSWERS + carried
+        result[difficulty] = (p_correct, weight)
+
+        counts = [arms.get((topic, sub_topic, difficulty, question_type), (0, 0))
+                  for question_type in QUESTION_TYPES.values()]
+        correct = sum(count[0] for count in counts)
+        answered = correct + sum(count[1] for count in counts)
+        easier = (prior_p_correct(priors, topic, sub_topic, difficulty),
+                  (weight * p_correct + correct) / (weight + answered))
+        carried = min(MAX_CARRIED_ANSWERS, carried + answered)
+    return result
+
+def thompson_policy(arms: Dict[Arm, Tuple[int, int]], candidates: List[Tuple[str, str, float]],
+                    priors: Dict, rng: np.random.Generator) -> Optional[Arm]:
+    """Draw from every candidate arm's posterior and take the most useful quiz.
+
+    ``candidates`` are ``(topic, sub_topic, p_known)``; ``arms`` holds the
+    user's ``(correct, wrong)`` counts per arm.
+    """
+    keys, alpha, beta, unknown = [], [], [], []
+    for topic, sub_topic, p_known in candidates:
+        for difficulty, (prior, weight) in difficulty_priors(arms, priors, topic, sub_topic).items():
+            for question_type in QUESTION_TYPES.values():
+                arm = (topic, sub_topic, difficulty, question_type)
+                correct, wrong = arms.get(arm, (0, 0))
+                keys.append(arm)
+                alpha.append(1 + weight * prior + correct)
+                beta.append(1 + weight * (1 - prior) + wrong)
+                unknown.append(1 - p_known)
+    if not keys:
+        return None
+
+    draws = rng.beta(np.array(alpha), np.array(beta))
+    scores = np.array(unknown) * (1 - np.abs(draws - TARGET_P_CORRECT))
+    return keys[int(np.argmax(scores))]
+
+def rule_policy(arms: Dict[Arm, Tuple[int, int]], candidates: List[Tuple[str, str, float]],
+                priors: Dict, rng: np.random.Generator) -> Optional[Arm]:
+    """The fixed rule the recommendations used before: weakest topic, first difficulty under 50%, MCQ"""
+    if not candidates:
+        return None
+    topic, sub_topic, _ = min(candidates, key=lambda candidate: candidate[2])
+    for difficulty in DIFFICULTIES:
+        correct = sum(arms.get((topic, sub_topic, difficulty, question_type), (0, 0))[0]
+                      for question_type in QUESTION_TYPES.values())
+        wrong = sum(arms.get((topic, sub_topic, difficulty, question_type), (0, 0))[1]
+                    for question_type in QUESTION_TYPES.values())
+        if correct + wrong and correct / (correct + wrong) < 0.5:
+            return (topic, sub_topic, difficulty, 'Multiple Choice')
+    return (topic, sub_topic, 'Easy', 'Multiple Choice')
+
+def random_policy(arms: Dict[Arm, Tuple[int, int]], candidates: List[Tuple[str, str, float]],
+                  priors: Dict, rng: np.random.Generator) -> Optional[Arm]:
+    """Any candidate arm, uniformly"""
+    if not candidates:
+        return None
+    topic, sub_topic, _ = candidates[int(rng.integers(len(candidates)))]
+    return (topic, sub_topic, DIFFICULTIES[int(rng.integers(len(DIFFICULTIES)))],
+            list(QUESTION_TYPES.values())[int(rng.integers(len(QUESTION_TYPES)))])
+
+POLICIES: Dict[str, Callable] = {'thompson': thompson_policy, 'rule': rule_policy, 'random': random_policy}
+
+class TopicBandit:
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.shards = ShardRouter.for_manager(self.db_path, TopicBandit)
+        self.storage.init_once('bandit_arms', self.init_tables)
+
+    def init_tables(self):
+        """Create the arm counters, filling them from question_log the first time"""
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+
+        if not self.storage.table_exists(cursor, 'question_log'):
+            conn.close()
+            return False  # QuestionLogger creates question_log; try again next time
+
+        is_new = not self.storage.table_exists(cursor, 'bandit_arms')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bandit_arms (
+                user_id INTEGER NOT NULL,
+                topic TEXT NOT NULL,
+                sub_topic TEXT NOT NULL DEFAULT '',
+                difficulty TEXT NOT NULL DEFAULT '',
+                question_type TEXT NOT NULL DEFAULT '', -- as offered in the quiz form
+                correct INTEGER NOT NULL DEFAULT 0,
+                wrong INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL, -- Unix seconds
+                PRIMARY KEY (user_id, topic, sub_topic, difficulty, question_type)
+            ) WITHOUT ROWID
+        ''')
+
+        conn.commit()
+        conn.close()
+
+        if is_new:
+            self.rebuild()
+
+    @staticmethod
+    def _count(answers: List[Tuple[str, str, str, str, bool]]) -> Dict[Arm, List[int]]:
+        counts = {}
+        for topic, sub_topic, difficulty, question_type, correct in answers:
+            arm = (topic or '', sub_topic or '', difficulty or '', question_type_label(question_type))
+            count = counts.setdefault(arm, [0, 0])
+            count[0 if correct else 1] += 1
+        return counts
+
+    def record_answers(self, cursor, user_id: int, answers: List[Tuple[str, str, str, str, bool]]):
+        """Count ``(topic, sub_topic, difficulty, logged question_type, is_correct)`` answers on the caller's transaction"""
+        now = time.time()
+        cursor.executemany('''
+            INSERT INTO bandit_arms (user_id, topic, sub_topic, difficulty, question_type, correct, wrong, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, topic, sub_topic, difficulty, question_type) DO UPDATE SET
+                correct = bandit_arms.correct + excluded.correct,
+                wrong = bandit_arms.wrong + excluded.wrong,
+                updated_at = excluded.updated_at
+        ''', [[int(user_id), *arm, correct, wrong, now] for arm, (correct, wrong) in self._count(answers).items()])
+
+    def cache_answers(self, user_id: int, answers: List[Tuple[str, str, str, str, bool]]):
+        """Apply a committed ``record_answers`` to the cached counters"""
+        counts = self._count(answers)
+
+        def apply(arms: Dict) -> Dict:
+            arms = dict(arms)
+            for arm, (correct, wrong) in counts.items():
+                old_correct, old_wrong = arms.get(arm, (0, 0))
+                arms[arm] = (old_correct + correct, old_wrong + wrong)
+            return arms
+
+        user_state_cache.update((self.db_path, int(user_id)), 'bandit_arms', apply)
+
+    def _load_arms(self, user_id: int) -> Optional[Dict]:
+        try:
+            conn = self.storage.connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT topic, sub_topic, difficulty, question_type, correct, wrong
+                FROM bandit_arms WHERE user_id = ?
+            ''', [int(user_id)])
+            arms = {tuple(row[:4]): (row[4], row[5]) for row in cursor.fetchall()}
+            conn.close()
+            return arms
+        except Exception as e:
+            print(f"Bandit arm load error: {e}")
+            return None
+
+    def get_arms(self, user_id: int) -> Dict[Arm, Tuple[int, int]]:
+        """(correct, wrong) answers per arm"""
+        if self.shards:
+            return self.shards.for_user(user_id).get_arms(user_id)
+
+        return user_state_cache.get((self.db_path, int(user_id)), 'bandit_arms',
+                                    lambda: self._load_arms(user_id)) or {}
+
+    def choose(self, user_id: int, candidates: List[Tuple[str, str, float]], priors: Dict,
+               rng: Optional[np.random.Generator] = None) -> Optional[Dict]:
+        """Sample a quiz among ``(topic, sub_topic, p_known)`` candidates; None without candidates"""
+        arms = self.get_arms(user_id)
+        arm = thompson_policy(arms, candidates, priors, rng or np.random.default_rng())
+        if arm is None:
+            return None
+
+        topic, sub_topic, difficulty, question_type = arm
+        correct, wrong = arms.get(arm, (0, 0))
+        prior, weight = difficulty_priors(arms, priors, topic, sub_topic)[difficulty]
+        return {'topic': topic, 'sub_topic': sub_topic, 'difficulty': difficulty, 'question_type': question_type,
+                'answers': correct + wrong,
+                'expected_p_correct': (1 + weight * prior + correct) / (2 + weight + correct + wrong)}
+
+    def rebuild(self):
+        """Recount every arm from question_log"""
+        if self.shards:
+            self.shards.fan_out(lambda shard: shard.rebuild())
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT user_id, topic, COALESCE(sub_topic, ''), COALESCE(difficulty, ''), COALESCE(question_type, ''),
+                   SUM(CASE WHEN is_correct THEN 1 ELSE 0 END), SUM(CASE WHEN is_correct THEN 0 ELSE 1 END)
+            FROM question_log
+            WHERE user_id IS NOT NULL AND topic IS NOT NULL
+            GROUP BY user_id, topic, COALESCE(sub_topic, ''), COALESCE(difficulty, ''), COALESCE(question_type, '')
+        ''')
+        counts = {}
+        for user_id, topic, sub_topic, difficulty, question_type, correct, wrong in cursor.fetchall():
+            # Several logged types can map to one label
+            count = counts.setdefault((user_id, topic, sub_topic, difficulty, question_type_label(question_type)), [0, 0])
+            count[0] += correct
+            count[1] += wrong
+
+        now = time.time()
+        cursor.execute('DELETE FROM bandit_arms')
+        self.storage.bulk_insert(cursor, 'bandit_arms', [
+            'user_id', 'topic', 'sub_topic', 'difficulty', 'question_type', 'correct', 'wrong', 'updated_at'
+        ], [[*key, correct, wrong, now] for key, (correct, wrong) in counts.items()])
+        conn.commit()
+        conn.close()
+        user_state_cache.clear()
+
+def _logged_quizzes(location: str):
+    """Each database's logged quizzes in answer order: (user_id, arm or None when mixed, answers)"""
+    storage = get_storage(location)
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor()
+        if not storage.table_exists(cursor, 'question_log'):
+            return []
+        cursor.execute('''
+            SELECT user_id, session_id, topic, COALESCE(sub_topic, ''), COALESCE(difficulty, ''),
+                   COALESCE(question_type, ''), CASE WHEN is_correct THEN 1 ELSE 0 END
+            FROM question_log
+            WHERE user_id IS NOT NULL AND topic IS NOT NULL
+            ORDER BY id
+        ''')
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    quizzes = {}
+    for user_id, session_id, topic, sub_topic, difficulty, question_type, correct in rows:
+        quiz = quizzes.setdefault((user_id, session_id), {'user_id': user_id, 'arms': set(), 'answers': []})
+        arm = (topic, sub_topic, difficulty, question_type_label(question_type))
+        quiz['arms'].add(arm)
+        quiz['answers'].append((arm, correct))
+    return [(quiz['user_id'], next(iter(quiz['arms'])) if len(quiz['arms']) == 1 else None, quiz['answers'])
+            for quiz in quizzes.values()]
+
+def replay_evaluate(location: Optional[str] = None, policies: Optional[List[str]] = None,
+                    seed: int = 7, priors: Optional[Dict] = None) -> Dict:
+    """Replay estimate of each policy's mean quiz reward (see ``quiz_reward``) over question_log.
+
+    Candidates at each logged quiz are the skills the user had answered at
+    least MIN_ANSWERS times and either not mastered or answered under the 70%
+    accuracy cutoff, as in ``SmartRecommendationEngine.rank_weak_topics``
+    (undecayed here), with P(known) traced from all earlier answers using the
+    fitted BKT parameters. Mixed quizzes (reviews)
+    and quizzes on a topic outside the candidates cannot be matched and are
+    only counted. ``priors`` defaults to none, since today's cross-user
+    rollups would leak later answers into earlier decisions.
+    """
+    storage = get_storage(location)
+    main = main_location(storage.location)
+    params = TopicKnowledge(main).params()
+    policies = policies or list(POLICIES)
+    rng = np.random.default_rng(seed)
+    started = time.perf_counter()
+
+    results = {name: {'matched': 0, 'reward': 0.0} for name in policies}
+    logged = {'quizzes': 0, 'evaluable': 0, 'reward': 0.0}
+    for database in data_locations(main):
+        # Users live on one shard, so each database replays whole histories
+        knowledge = {}  # user -> skill -> [p_known, answers, correct]
+        policy_arms = {name: {} for name in policies}  # policy -> user -> arm -> [correct, wrong]
+        for user_id, arm, answers in _logged_quizzes(database):
+            logged['quizzes'] += 1
+            skills = knowledge.setdefault(user_id, {})
+            candidates = [(topic, sub_topic, state[0]) for (topic, sub_topic), state in sorted(skills.items())
+                          if state[1] >= MIN_ANSWERS
+                          and (state[0] < MASTERED or state[2] < WEAK_MASTERY * state[1])]
+
+            if arm is not None and any(candidate[:2] == arm[:2] for candidate in candidates):
+                correct = sum(answer[1] for answer in answers)
+                reward = quiz_reward(correct, len(answers))
+                logged['evaluable'] += 1
+                logged['reward'] += reward
+                for name in policies:
+                    arms = policy_arms[name].setdefault(user_id, {})
+                    if POLICIES[name](arms, candidates, priors or {}, rng) == arm:
+                        results[name]['matched'] += 1
+                        results[name]['reward'] += reward
+                        arms[arm] = (arms.get(arm, (0, 0))[0] + correct,
+                                     arms.get(arm, (0, 0))[1] + len(answers) - correct)
+
+            for (topic, sub_topic, _, _), correct in answers:
+                skill_params = params.get((topic, sub_topic), DEFAULT_PARAMS)
+                state = skills.setdefault((topic, sub_topic), [skill_params[0], 0, 0])
+                state[0] = update_known(state[0], bool(correct), skill_params)
+                state[1] += 1
+                state[2] += correct
+
+    report = {'quizzes': logged['quizzes'], 'evaluable': logged['evaluable'],
+              'logged_mean_reward': round(logged['reward'] / logged['evaluable'], 4) if logged['evaluable'] else None,
+              'policies': {}}
+    for name, result in results.items():
+        report['policies'][name] = {
+            'matched': result['matched'],
+            'mean_reward': round(result['reward'] / result['matched'], 4) if result['matched'] else None
+        }
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
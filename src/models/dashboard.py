@@ -0,0 +1,224 @@
+"""Dashboard analytics computed from one columnar read of a user's quiz sessions.
+
+The headline numbers come from the counters ``UserStats`` keeps on the user
+row. For the per-topic parts, ``DashboardAnalytics.summary`` loads the
+user's sessions once into NumPy arrays (topic codes, scores, question
+counts and days) and derives them with vectorized passes. The arrays are
+held in ``user_state_cache`` and appended to after each submit, so dashboard
+reruns only repeat the vectorized passes, which cost about the same for ten
+sessions as for ten thousand. Review quizzes mix topics and are left out of
+the per-topic parts.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter
+from src.models.user_stats import UserStats, user_state_cache
+from src.models.review_queue import REVIEW_DIFFICULTY, REVIEW_TOPIC
+
+# Same rule as QuestionLogger.analyze_weak_topics
+WEAK_ACCURACY = 70
+WEAK_MIN_QUESTIONS = 2
+
+LABELLED_COLUMNS = ('topic', 'area', 'difficulty')
+
+def _factorize(values):
+    """Integer codes for the values and the distinct values in first-seen order"""
+    codes, labels = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    return codes.astype(np.int32), list(labels)
+
+class DashboardSummary:
+    """Everything the dashboard shows, without the per-session rows it came from"""
+
+    __slots__ = ('total_quizzes', 'avg_score', 'best_score', 'quizzes_this_week',
+                 'topics', 'weak_topics', 'analysis_period_days')
+
+    def __init__(self, total_quizzes: int = 0, avg_score: float = 0.0, best_score: float = 0.0,
+                 quizzes_this_week: int = 0, topics: Optional[List[Dict]] = None,
+                 weak_topics: Optional[Dict[str, Dict]] = None, analysis_period_days: int = 14):
+        self.total_quizzes = total_quizzes
+        self.avg_score = avg_score
+        self.best_score = best_score
+        self.quizzes_this_week = quizzes_this_week
+        self.topics = topics or []  # [{'topic', 'quizzes', 'avg_score'}], most recently practised first
+        self.weak_topics = weak_topics or {}  # shaped like analyze_weak_topics()['weak_topics']
+        self.analysis_period_days = analysis_period_days
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class DashboardAnalytics:
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.shards = ShardRouter.for_manager(self.db_path, DashboardAnalytics)
+        self.user_stats = UserStats(self.db_path)
+
+    def summary(self, user_id: int, days: int = 14) -> DashboardSummary:
+        """Headline stats, per-topic averages and weak topics over the last ``days`` days"""
+        if self.shards:
+            return self.shards.for_user(user_id).summary(user_id, days)
+
+        stats = self.user_stats.get_stats(user_id)
+        summary = DashboardSummary(
+            total_quizzes=stats['total_quizzes'],
+            avg_score=stats['avg_score'],
+            best_score=stats['best_score'],
+            quizzes_this_week=stats['quizzes_this_week'],
+            analysis_period_days=days
+        )
+        if not stats['total_quizzes']:
+            return summary
+
+        columns = user_state_cache.get((self.db_path, int(user_id)), 'session_columns',
+                                       lambda: self._load_columns(user_id))
+        if columns is None or not len(columns['score']):
+            return summary
+
+        today = np.datetime64(datetime.utcnow().date(), 'D')
+        topical = self._topical(columns)
+        summary.topics = self._topic_averages(columns, topical)
+        summary.weak_topics = self._weak_topics(columns, topical & (columns['day'] >= today - int(days)))
+        return summary
+
+    @staticmethod
+    def _topical(columns: Dict) -> np.ndarray:
+        """Mask of the sessions that were not review quizzes"""
+        labels = columns['labels']
+        review = np.ones(columns['topic'].size, dtype=bool)
+        for name, value in (('topic', REVIEW_TOPIC), ('difficulty', REVIEW_DIFFICULTY)):
+            code = labels[name].index(value) if value in labels[name] else -1
+            review &= columns[name] == code
+        return ~review
+
+    def _load_columns(self, user_id: int) -> Optional[Dict]:
+        """The user's sessions, oldest first, as parallel arrays; None if the read failed"""
+        try:
+            conn = self.storage.connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT topic, sub_topic, difficulty, substr(CAST(created_at AS TEXT), 1, 10),
+                           score, num_questions
+                    FROM quiz_sessions
+                    WHERE user_id = ?
+                    ORDER BY created_at, id
+                ''', [int(user_id)])
+                rows = cursor.fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Dashboard load error: {e}")
+            return None
+
+        topics, sub_topics, difficulties, days, scores, num_questions = zip(*rows) if rows else ((),) * 6
+
+        topic_codes, topic_labels = _factorize(topics)
+        sub_topic_codes, sub_topic_labels = _factorize(sub_topics)
+        difficulty_codes, difficulty_labels = _factorize(difficulties)
+        day_codes, day_labels = _factorize(days)
+
+        # Areas are "topic - sub_topic"; each distinct pair is formatted once
+        sub_topic_count = max(1, len(sub_topic_labels))
+        pair_codes, pairs = _factorize(topic_codes.astype(np.int64) * sub_topic_count + sub_topic_codes)
+        areas = []
+        for pair in pairs:
+            topic, sub_topic = topic_labels[pair // sub_topic_count], sub_topic_labels[pair % sub_topic_count]
+            areas.append(f"{topic} - {sub_topic}" if sub_topic else topic)
+        pair_area_codes, area_labels = _factorize(areas)
+
+        return {
+            'score': np.array(scores, dtype=np.float64),
+            'questions': np.array(num_questions, dtype=np.int32),
+            'day': np.array(day_labels, dtype='datetime64[D]')[day_codes],
+            'topic': topic_codes,
+            'area': pair_area_codes[pair_codes],
+            'difficulty': difficulty_codes,
+            'labels': {'topic': topic_labels, 'area': area_labels, 'difficulty': difficulty_labels}
+        }
+
+    def cache_session(self, user_id: int, quiz_data: Dict):
+        """Append a committed session to the cached columns"""
+        topic = str(quiz_data.get('topic', ''))
+        sub_topic = str(quiz_data.get('sub_topic', ''))
+        values = {
+            'topic': topic,
+            'area': f"{topic} - {sub_topic}" if sub_topic else topic,
+            'difficulty': str(quiz_data.get('difficulty', ''))
+        }
+
+        def apply(columns: Dict) -> Dict:
+            # Cached values are shared with readers, so build new arrays and label lists
+            updated = {
+                'score': np.append(columns['score'], float(quiz_data.get('score', 0.0))),
+                'questions': np.append(columns['questions'], np.int32(quiz_data.get('num_questions', 0))),
+                'day': np.append(columns['day'], np.datetime64(datetime.utcnow().date(), 'D')),
+                'labels': dict(columns['labels'])
+            }
+            for name in LABELLED_COLUMNS:
+                labels = columns['labels'][name]
+                if values[name] in labels:
+                    code = labels.index(values[name])
+                else:
+                    code = len(labels)
+                    updated['labels'][name] = labels + [values[name]]
+                updated[name] = np.append(columns[name], np.int32(code))
+            return updated
+
+        user_state_cache.update((self.db_path, int(user_id)), 'session_columns', apply)
+
+    @staticmethod
+    def _topic_averages(columns: Dict, selected: np.ndarray) -> List[Dict]:
+        labels = columns['labels']['topic']
+        codes = columns['topic'][selected]
+        counts = np.bincount(codes, minlength=len(labels))
+        sums = np.bincount(codes, weights=columns['score'][selected], minlength=len(labels))
+        # Rows are oldest first, so the highest row number is the latest session per topic
+        latest = np.full(len(labels), -1)
+        np.maximum.at(latest, codes, np.flatnonzero(selected))
+
+        return [
+            {'topic': labels[i], 'quizzes': int(counts[i]), 'avg_score': float(sums[i] / counts[i])}
+            for i in np.argsort(-latest, kind='stable') if counts[i]
+        ]
+
+    @staticmethod
+    def _weak_topics(columns: Dict, recent: np.ndarray) -> Dict[str, Dict]:
+        """Per topic/sub-topic accuracy from the ``recent`` sessions, weak ones only"""
+        if not recent.any():
+            return {}
+
+        areas = columns['labels']['area']
+        difficulties = columns['labels']['difficulty']
+        questions = columns['questions'][recent].astype(np.float64)
+        # Scores are correct / asked * 100, so this recovers the correct count exactly
+        correct = np.rint(columns['score'][recent] * questions / 100)
+
+        # One bincount over (area, difficulty) pairs, then fold difficulties away
+        cells = columns['area'][recent] * len(difficulties) + columns['difficulty'][recent]
+        shape = (len(areas), len(difficulties))
+        total_cells = np.bincount(cells, weights=questions, minlength=shape[0] * shape[1]).reshape(shape)
+        correct_cells = np.bincount(cells, weights=correct, minlength=shape[0] * shape[1]).reshape(shape)
+        totals = total_cells.sum(axis=1)
+        corrects = correct_cells.sum(axis=1)
+        accuracy = np.divide(corrects * 100, totals, out=np.zeros_like(totals), where=totals > 0)
+
+        weak = np.flatnonzero((totals >= WEAK_MIN_QUESTIONS) & (accuracy < WEAK_ACCURACY))
+        weak_topics = {}
+        for i in sorted(weak, key=lambda i: areas[i]):
+            weak_topics[areas[i]] = {
+                'total_questions': int(totals[i]),
+                'correct_answers': int(corrects[i]),
+                'wrong_answers': int(totals[i] - corrects[i]),
+                'accuracy': float(accuracy[i]),
+                'difficulty_breakdown': {
+                    difficulties[j]: {'correct': int(correct_cells[i, j]), 'total': int(total_cells[i, j])}
+                    for j in np.flatnonzero(total_cells[i])
+                },
+                'needs_practice': True
+            }
+        return weak_topics
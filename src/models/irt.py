@@ -0,0 +1,319 @@
+"""Item Response Theory calibration over every logged answer.
+
+The 2PL model gives the chance that user ``u`` answers item ``i`` correctly
+as ``sigmoid(a_i * (theta_u - b_i))``, with ability ``theta``, difficulty
+``b`` and discrimination ``a`` (1PL fixes ``a = 1``). ``fit_irt`` finds the
+MAP estimates by alternating damped Newton steps on the three parameter
+groups. Every step is a few vectorized passes over the response arrays plus
+``np.bincount`` sums, so one iteration over a million responses takes tens
+of milliseconds. ``IRTCalibration.calibrate`` starts from the estimates
+stored by the previous run, which roughly halves the iterations a nightly
+run needs.
+
+Items are questions, identified by their content hash so they line up
+across shards. Results are kept in the main database.
+"""
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.storage.base import get_storage
+from src.storage.sharding import data_locations, main_location
+from src.models.user_stats import user_state_cache
+from src.utils.cache import ReadThroughCache
+from src.config.settings import settings
+
+# Gaussian priors: they keep users and items with a handful of answers finite
+ABILITY_VARIANCE = 1.0
+DIFFICULTY_VARIANCE = 4.0
+LOG_DISCRIMINATION_VARIANCE = 0.25
+
+# Recommended quizzes aim at this chance of a correct answer
+TARGET_P_CORRECT = 0.7
+
+# Process-wide; label difficulties only change when a calibration runs
+calibration_cache = ReadThroughCache('irt', 256, settings.SESSION_CACHE_TTL_SECONDS)
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30.0, 30.0)))
+
+def fit_irt(users: np.ndarray, items: np.ndarray, correct: np.ndarray, n_users: int, n_items: int,
+            model: str = '2pl', ability: Optional[np.ndarray] = None, difficulty: Optional[np.ndarray] = None,
+            discrimination: Optional[np.ndarray] = None, max_iterations: int = 100,
+            tolerance: float = 1e-2) -> Dict:
+    """MAP fit of a 1PL or 2PL model to responses given as parallel arrays.
+
+    ``users`` and ``items`` are integer codes below ``n_users``/``n_items``
+    and ``correct`` is 0/1. Starting values default to 0 (and ``a = 1``).
+    Stops once no parameter moves by more than ``tolerance``.
+    """
+    if model not in ('1pl', '2pl'):
+        raise ValueError(f"unknown IRT model {model!r}")
+
+    y = np.asarray(correct, dtype=np.float64)
+    theta = np.zeros(n_users) if ability is None else np.array(ability, dtype=np.float64)
+    b = np.zeros(n_items) if difficulty is None else np.array(difficulty, dtype=np.float64)
+    log_a = np.zeros(n_items) if discrimination is None or model == '1pl' \
+        else np.log(np.clip(np.asarray(discrimination, dtype=np.float64), 0.05, 20.0))
+
+    def residuals(a_r):
+        p = _sigmoid(a_r * (theta[users] - b[items]))
+        return y - p, p * (1.0 - p)
+
+    iterations = 0
+    for iterations in range(1, int(max_iterations) + 1):
+        a_r = np.exp(log_a)[items]
+
+        r, w = residuals(a_r)
+        gradient = np.bincount(users, a_r * r, n_users) - theta / ABILITY_VARIANCE
+        information = np.bincount(users, a_r * a_r * w, n_users) + 1.0 / ABILITY_VARIANCE
+        theta_step = np.clip(gradient / information, -1.0, 1.0)
+        theta += theta_step
+
+        r, w = residuals(a_r)
+        gradient = -np.bincount(items, a_r * r, n_items) - b / DIFFICULTY_VARIANCE
+        information = np.bincount(items, a_r * a_r * w, n_items) + 1.0 / DIFFICULTY_VARIANCE
+        b_step = np.clip(gradient / information, -1.0, 1.0)
+        b += b_step
+
+        largest = max(np.abs(theta_step).max(initial=0.0), np.abs(b_step).max(initial=0.0))
+        if model == '2pl':
+            r, w = residuals(a_r)
+            scaled = (theta[users] - b[items]) * a_r
+            gradient = np.bincount(items, r * scaled, n_items) - log_a / LOG_DISCRIMINATION_VARIANCE
+            information = np.bincount(items, w * scaled * scaled, n_items) + 1.0 / LOG_DISCRIMINATION_VARIANCE
+            log_a_step = np.clip(gradient / information, -0.5, 0.5)
+            log_a += log_a_step
+            largest = max(largest, np.abs(log_a_step).max(initial=0.0))
+
+        if largest < tolerance:
+            break
+
+    p = _sigmoid(np.exp(log_a)[items] * (theta[users] - b[items]))
+    log_likelihood = float(np.mean(y * np.log(np.maximum(p, 1e-12)) + (1 - y) * np.log(np.maximum(1 - p, 1e-12)))) \
+        if y.size else 0.0
+    return {'ability': theta, 'difficulty': b, 'discrimination': np.exp(log_a),
+            'iterations': iterations, 'mean_log_likelihood': log_likelihood}
+
+class IRTCalibration:
+    def __init__(self, db_path: Optional[str] = None):
+        # One calibration covers every shard, so a shard's manager uses the main database's
+        self.storage = get_storage(main_location(get_storage(db_path).location))
+        self.db_path = self.storage.location
+        self.storage.init_once('irt', self.init_tables)
+
+    def init_tables(self):
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS irt_items (
+                question_hash TEXT PRIMARY KEY, -- questions.question_hash
+                topic TEXT NOT NULL,
+                sub_topic TEXT NOT NULL DEFAULT '',
+                difficulty_label TEXT NOT NULL DEFAULT '', -- the Easy/Medium/Hard it was generated at
+                difficulty REAL NOT NULL, -- b, on the ability scale
+                discrimination REAL NOT NULL, -- a; 1 under the 1PL model
+                responses INTEGER NOT NULL,
+                updated_at REAL NOT NULL -- Unix seconds
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS irt_abilities (
+                user_id INTEGER PRIMARY KEY,
+                ability REAL NOT NULL, -- theta
+                responses INTEGER NOT NULL,
+                updated_at REAL NOT NULL -- Unix seconds
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _load_location(location: str) -> Optional[Tuple]:
+        """(user ids, question hashes per response, correct, labels by hash) from one database"""
+        storage = get_storage(location)
+        conn = storage.connect()
+        try:
+            cursor = conn.cursor()
+            if not storage.table_exists(cursor, 'question_log'):
+                return None
+            cursor.execute('''
+                SELECT user_id, question_id, CASE WHEN is_correct THEN 1 ELSE 0 END
+                FROM question_log
+                WHERE question_id IS NOT NULL AND user_id IS NOT NULL
+            ''')
+            rows = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 3)
+
+            # Question ids are local to the database; hashes line up across shards
+            cursor.execute('''
+                SELECT q.id, q.question_hash, MIN(ql.topic), MIN(COALESCE(ql.sub_topic, '')),
+                       MIN(COALESCE(ql.difficulty, ''))
+                FROM questions q
+                JOIN question_log ql ON ql.question_id = q.id
+                GROUP BY q.id, q.question_hash
+            ''')
+            questions = cursor.fetchall()
+        finally:
+            conn.close()
+
+        question_ids = np.array([row[0] for row in questions], dtype=np.int64)
+        hashes = np.array([row[1] for row in questions], dtype=object)
+        labels = {row[1]: (row[2] or '', row[3], row[4]) for row in questions}
+        order = np.argsort(question_ids)
+        positions = np.searchsorted(question_ids[order], rows[:, 1])
+        return rows[:, 0], hashes[order][positions], rows[:, 2], labels
+
+    def _load_previous(self, cursor) -> Tuple[Dict, Dict]:
+        cursor.execute('SELECT user_id, ability FROM irt_abilities')
+        abilities = dict(cursor.fetchall())
+        cursor.execute('SELECT question_hash, difficulty, discrimination FROM irt_items')
+        items = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+        return abilities, items
+
+    def calibrate(self, model: str = '2pl', max_iterations: int = 100, tolerance: float = 1e-2,
+                  warm_start: bool = True) -> Dict:
+        """Fit the model to every logged answer and replace the stored estimates"""
+        started = time.perf_counter()
+        user_parts, hash_parts, correct_parts, labels = [], [], [], {}
+        for location in data_locations(self.db_path):
+            loaded = self._load_location(location)
+            if loaded is None:
+                continue
+            user_parts.append(loaded[0])
+            hash_parts.append(loaded[1])
+            correct_parts.append(loaded[2])
+            labels.update(loaded[3])
+
+        if not user_parts or not sum(part.size for part in user_parts):
+            return {'responses': 0, 'users': 0, 'items': 0, 'iterations': 0}
+
+        user_codes, user_ids = pd.factorize(np.concatenate(user_parts))
+        item_codes, item_hashes = pd.factorize(np.concatenate(hash_parts))
+        correct = np.concatenate(correct_parts)
+        loaded_at = time.perf_counter()
+
+        conn = self.storage.connect()
+        try:
+            cursor = conn.cursor()
+            ability = difficulty = discrimination = None
+            if warm_start:
+                previous_abilities, previous_items = self._load_previous(cursor)
+                ability = np.array([previous_abilities.get(int(user_id), 0.0) for user_id in user_ids])
+                previous = [previous_items.get(item_hash, (0.0, 1.0)) for item_hash in item_hashes]
+                difficulty = np.array([item[0] for item in previous])
+                discrimination = np.array([item[1] for item in previous])
+
+            fit = fit_irt(user_codes, item_codes, correct, len(user_ids), len(item_hashes), model,
+                          ability, difficulty, discrimination, max_iterations, tolerance)
+            fitted_at = time.perf_counter()
+
+            now = time.time()
+            user_responses = np.bincount(user_codes, minlength=len(user_ids))
+            item_responses = np.bincount(item_codes, minlength=len(item_hashes))
+            # Replaced in one transaction so readers never see half a calibration
+            cursor.execute('DELETE FROM irt_abilities')
+            cursor.execute('DELETE FROM irt_items')
+            self.storage.bulk_insert(cursor, 'irt_abilities', ['user_id', 'ability', 'responses', 'updated_at'], (
+                (int(user_id), float(theta), int(count), now)
+                for user_id, theta, count in zip(user_ids, fit['ability'], user_responses)
+            ))
+            self.storage.bulk_insert(cursor, 'irt_items', [
+                'question_hash', 'topic', 'sub_topic', 'difficulty_label', 'difficulty', 'discrimination',
+                'responses', 'updated_at'
+            ], (
+                (item_hash, *labels[item_hash], float(b), float(a), int(count), now)
+                for item_hash, b, a, count in zip(item_hashes, fit['difficulty'], fit['discrimination'],
+                                                   item_responses)
+            ))
+            conn.commit()
+        finally:
+            conn.close()
+
+        calibration_cache.clear()
+        user_state_cache.clear()
+        return {
+            'model': model, 'responses': int(correct.size), 'users': len(user_ids), 'items': len(item_hashes),
+            'iterations': fit['iterations'], 'warm_start': warm_start,
+            'mean_log_likelihood': round(fit['mean_log_likelihood'], 5),
+            'load_seconds': round(loaded_at - started, 3), 'fit_seconds': round(fitted_at - loaded_at, 3),
+            'seconds': round(time.perf_counter() - started, 3)
+        }
+
+    def _query_ability(self, user_id: int) -> Optional[Dict]:
+        try:
+            conn = self.storage.connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT ability, responses FROM irt_abilities WHERE user_id = ?', [int(user_id)])
+            row = cursor.fetchone()
+            conn.close()
+        except Exception as e:
+            print(f"Ability lookup error: {e}")
+            return None
+        return {'ability': row[0], 'responses': row[1]} if row else {}
+
+    def ability(self, user_id: int) -> Optional[float]:
+        """The user's stored ability estimate, or None before their first calibration"""
+        estimate = user_state_cache.get((self.db_path, int(user_id)), 'irt_ability',
+                                        lambda: self._query_ability(user_id))
+        return estimate.get('ability') if estimate else None
+
+    def label_difficulties(self, topic: str, sub_topic: str = '') -> Dict[str, Tuple[float, float]]:
+        """Mean (difficulty, discrimination) of the calibrated items per difficulty label of a topic"""
+        def load():
+            try:
+                conn = self.storage.connect()
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT difficulty_label, AVG(difficulty), AVG(discrimination)
+                    FROM irt_items
+                    WHERE topic = ? AND (? = '' OR sub_topic = ?) AND difficulty_label != ''
+                    GROUP BY difficulty_label
+                ''', [topic, sub_topic, sub_topic])
+                result = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+                conn.close()
+                return result
+            except Exception as e:
+                print(f"Label difficulty error: {e}")
+                return None
+
+        return calibration_cache.get_or_load(('labels', self.db_path, topic, sub_topic), load) or {}
+
+    def recommended_label(self, user_id: int, topic: str, sub_topic: str = '',
+                          labels: Iterable[str] = ('Easy', 'Medium', 'Hard')) -> Optional[str]:
+        """The label whose calibrated items the user is expected to get right closest to TARGET_P_CORRECT"""
+        theta = self.ability(user_id)
+        if theta is None:
+            return None
+        difficulties = self.label_difficulties(topic, sub_topic) or self.label_difficulties(topic)
+        expected = {
+            label: float(_sigmoid(np.float64(a * (theta - b))))
+            for label, (b, a) in difficulties.items() if label in labels
+        }
+        if not expected:
+            return None
+        return min(expected, key=lambda label: abs(expected[label] - TARGET_P_CORRECT))
+
+    def item_parameters(self, question_hashes: Iterable[str]) -> Dict[str, Dict]:
+        """Stored difficulty and discrimination of individual questions"""
+        question_hashes = list(dict.fromkeys(question_hashes))
+        result = {}
+        conn = self.storage.connect()
+        try:
+            cursor = conn.cursor()
+            for start in range(0, len(question_hashes), 500):
+                chunk = question_hashes[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT question_hash, difficulty, discrimination, responses
+                    FROM irt_items WHERE question_hash IN ({placeholders})
+                ''', chunk)
+                for question_hash, b, a, responses in cursor.fetchall():
+                    result[question_hash] = {'difficulty': b, 'discrimination': a, 'responses': responses}
+        finally:
+            conn.close()
+        return result
@@ -0,0 +1,279 @@
+"""Cross-user answer rollups per question and per (topic, sub-topic, difficulty).
+
+``ItemStats.refresh`` folds the question_log rows written since a stored
+watermark into ``question_stats`` (keyed by question hash, so the same
+question counts once across shards) and ``topic_difficulty_stats``, one
+grouped INSERT ... SELECT per table and batch, in the same transaction that
+moves the watermark. Reads turn the counters into an empirical difficulty
+(the smoothed share of wrong answers) without touching question_log.
+
+QuestionLogRetention only archives rows at or below the watermark, so every
+answer is folded in before it leaves question_log.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter
+from src.utils.cache import ReadThroughCache
+from src.config.settings import settings
+
+WATERMARK = 'item_stats'
+
+# Pseudo-answers pulling sparse counters towards the level above them
+# (question -> its topic/difficulty label -> all answers)
+PRIOR_ANSWERS = 10.0
+
+# Rows younger than this are left for the next run, so a transaction that
+# took a lower id but commits late is not skipped by the watermark
+SETTLE_SECONDS = 60
+
+# Process-wide; the topic table is small and changes only when a refresh runs
+item_stats_cache = ReadThroughCache('item_stats', 64, settings.SESSION_CACHE_TTL_SECONDS)
+
+def smoothed_rate(correct: float, answered: float, prior_rate: float, prior_answers: float = PRIOR_ANSWERS) -> float:
+    return (correct + prior_rate * prior_answers) / (answered + prior_answers)
+
+class ItemStats:
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.shards = ShardRouter.for_manager(self.db_path, ItemStats)
+        self.storage.init_once('item_stats', self.init_tables)
+
+    def init_tables(self):
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS rollup_watermarks (
+                name TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL, -- highest question_log id folded in
+                updated_at REAL NOT NULL -- Unix seconds
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS question_stats (
+                question_hash TEXT PRIMARY KEY, -- questions.question_hash
+                topic TEXT NOT NULL, -- labels of the first answers folded in
+                sub_topic TEXT NOT NULL DEFAULT '',
+                difficulty TEXT NOT NULL DEFAULT '',
+                answered INTEGER NOT NULL DEFAULT 0,
+                correct INTEGER NOT NULL DEFAULT 0,
+                time_taken INTEGER NOT NULL DEFAULT 0 -- seconds, summed
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS topic_difficulty_stats (
+                topic TEXT NOT NULL,
+                sub_topic TEXT NOT NULL DEFAULT '',
+                difficulty TEXT NOT NULL DEFAULT '',
+                answered INTEGER NOT NULL DEFAULT 0,
+                correct INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (topic, sub_topic, difficulty)
+            ) WITHOUT ROWID
+        ''')
+        conn.commit()
+        conn.close()
+
+    def refresh(self, batch_size: int = 50000) -> Dict:
+        """Fold question_log rows past the watermark into the rollups, one transaction per batch"""
+        if self.shards:
+            reports = self.shards.fan_out(lambda shard: shard.refresh(batch_size))
+            return {'folded_rows': sum(report['folded_rows'] for report in reports),
+                    'watermarks': [report['watermark'] for report in reports]}
+
+        settled = (datetime.utcnow() - timedelta(seconds=SETTLE_SECONDS)).strftime('%Y-%m-%d %H:%M:%S')
+        conn = self.storage.connect()
+        folded = 0
+        try:
+            cursor = conn.cursor()
+            if not self.storage.table_exists(cursor, 'question_log'):
+                return {'folded_rows': 0, 'watermark': 0}
+
+            cursor.execute('SELECT last_id FROM rollup_watermarks WHERE name = ?', [WATERMARK])
+            row = cursor.fetchone()
+            watermark = row[0] if row else 0
+
+            while True:
+                cursor.execute('''
+                    SELECT id, created_at FROM question_log
+                    WHERE id > ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', [watermark, int(batch_size)])
+                upper, rows = watermark, 0
+                for row_id, created_at in cursor.fetchall():
+                    if created_at is not None and str(created_at) >= settled:
+                        break
+                    upper, rows = row_id, rows + 1
+                if not rows:
+                    break
+
+                self._fold(cursor, watermark, upper)
+                cursor.execute('''
+                    INSERT INTO rollup_watermarks (name, last_id, updated_at) VALUES (?, ?, ?)
+                    ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id, updated_at = excluded.updated_at
+                ''', [WATERMARK, upper, time.time()])
+                conn.commit()
+
+                folded += rows
+                watermark = upper
+        finally:
+            conn.close()
+
+        if folded:
+            item_stats_cache.clear()
+        return {'folded_rows': folded, 'watermark': watermark}
+
+    @staticmethod
+    def _fold(cursor, after_id: int, upto_id: int):
+        """Add the answers with ids in (after_id, upto_id] to both rollups on the caller's transaction"""
+        cursor.execute('''
+            INSERT INTO question_stats (question_hash, topic, sub_topic, difficulty, answered, correct, time_taken)
+            SELECT q.question_hash, MIN(ql.topic), MIN(COALESCE(ql.sub_topic, '')), MIN(COALESCE(ql.difficulty, '')),
+                   COUNT(*), SUM(CASE WHEN ql.is_correct THEN 1 ELSE 0 END), SUM(COALESCE(ql.time_taken, 0))
+            FROM question_log ql
+            JOIN questions q ON q.id = ql.question_id
+            WHERE ql.id > ? AND ql.id <= ? AND ql.topic IS NOT NULL
+            GROUP BY q.question_hash
+            ON CONFLICT (question_hash) DO UPDATE SET
+                answered = question_stats.answered + excluded.answered,
+                correct = question_stats.correct + excluded.correct,
+                time_taken = question_stats.time_taken + excluded.time_taken
+        ''', [after_id, upto_id])
+        cursor.execute('''
+            INSERT INTO topic_difficulty_stats (topic, sub_topic, difficulty, answered, correct)
+            SELECT topic, COALESCE(sub_topic, ''), COALESCE(difficulty, ''),
+                   COUNT(*), SUM(CASE WHEN is_correct THEN 1 ELSE 0 END)
+            FROM question_log
+            WHERE id > ? AND id <= ? AND topic IS NOT NULL
+            GROUP BY topic, COALESCE(sub_topic, ''), COALESCE(difficulty, '')
+            ON CONFLICT (topic, sub_topic, difficulty) DO UPDATE SET
+                answered = topic_difficulty_stats.answered + excluded.answered,
+                correct = topic_difficulty_stats.correct + excluded.correct
+        ''', [after_id, upto_id])
+
+    def rebuild(self) -> Dict:
+        """Empty the rollups and fold every question_log row in again"""
+        if self.shards:
+            reports = self.shards.fan_out(lambda shard: shard.rebuild())
+            return {'folded_rows': sum(report['folded_rows'] for report in reports),
+                    'watermarks': [report['watermark'] for report in reports]}
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM question_stats')
+        cursor.execute('DELETE FROM topic_difficulty_stats')
+        cursor.execute('DELETE FROM rollup_watermarks WHERE name = ?', [WATERMARK])
+        conn.commit()
+        conn.close()
+        item_stats_cache.clear()
+        return self.refresh()
+
+    def _topic_counters(self) -> Dict[Tuple[str, str, str], List[int]]:
+        if self.shards:
+            merged = {}
+            for counters in self.shards.fan_out(lambda shard: shard._topic_counters()):
+                for key, (answered, correct) in counters.items():
+                    total = merged.setdefault(key, [0, 0])
+                    total[0] += answered
+                    total[1] += correct
+            return merged
+
+        conn = self.storage.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT topic, sub_topic, difficulty, answered, correct FROM topic_difficulty_stats')
+            return {tuple(row[:3]): [row[3], row[4]] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
+    def topic_difficulty(self) -> Dict[Tuple[str, str, str], Dict]:
+        """Empirical difficulty per (topic, sub_topic, difficulty label) across all users.
+
+        ``p_correct`` is smoothed towards the share of correct answers over
+        every topic; ``empirical_difficulty`` is ``1 - p_correct``.
+        """
+        def load():
+            try:
+                counters = self._topic_counters()
+            except Exception as e:
+                print(f"Topic difficulty load error: {e}")
+                return None
+            answered = sum(counter[0] for counter in counters.values())
+            overall = sum(counter[1] for counter in counters.values()) / answered if answered else 0.5
+            result = {}
+            for key, (key_answered, key_correct) in counters.items():
+                p_correct = smoothed_rate(key_correct, key_answered, overall)
+                result[key] = {'answered': key_answered, 'correct': key_correct,
+                               'p_correct': p_correct, 'empirical_difficulty': 1 - p_correct}
+            return result
+
+        return item_stats_cache.get_or_load(('topic_difficulty', self.db_path), load) or {}
+
+    def easiest_label(self, topic: str, sub_topic: str = '') -> Optional[str]:
+        """The difficulty label most answered correctly for a topic, preferring the sub-topic's own counters"""
+        difficulties = self.topic_difficulty()
+        for wanted_sub_topic in ([sub_topic, ''] if sub_topic else ['']):
+            labels = {key[2]: value['p_correct'] for key, value in difficulties.items()
+                      if key[0] == topic and key[1] == wanted_sub_topic and key[2]}
+            if labels:
+                return max(labels, key=labels.get)
+        return None
+
+    def _question_counters(self, question_hashes: List[str]) -> Dict[str, Tuple]:
+        if self.shards:
+            merged = {}
+            for counters in self.shards.fan_out(lambda shard: shard._question_counters(question_hashes)):
+                for question_hash, (topic, sub_topic, difficulty, answered, correct, time_taken) in counters.items():
+                    if question_hash in merged:
+                        total = merged[question_hash]
+                        merged[question_hash] = (*total[:3], total[3] + answered, total[4] + correct,
+                                                 total[5] + time_taken)
+                    else:
+                        merged[question_hash] = (topic, sub_topic, difficulty, answered, correct, time_taken)
+            return merged
+
+        conn = self.storage.connect()
+        try:
+            cursor = conn.cursor()
+            counters = {}
+            for start in range(0, len(question_hashes), 500):
+                chunk = question_hashes[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                cursor.execute(f'''
+                    SELECT question_hash, topic, sub_topic, difficulty, answered, correct, time_taken
+                    FROM question_stats WHERE question_hash IN ({placeholders})
+                ''', chunk)
+                counters.update({row[0]: tuple(row[1:]) for row in cursor.fetchall()})
+            return counters
+        finally:
+            conn.close()
+
+    def question_difficulty(self, question_hashes: Iterable[str]) -> Dict[str, Dict]:
+        """Empirical difficulty of individual questions, smoothed towards their topic and label"""
+        question_hashes = list(dict.fromkeys(question_hashes))
+        if not question_hashes:
+            return {}
+        try:
+            counters = self._question_counters(question_hashes)
+        except Exception as e:
+            print(f"Question difficulty load error: {e}")
+            return {}
+
+        topics = self.topic_difficulty()
+        result = {}
+        for question_hash, (topic, sub_topic, difficulty, answered, correct, time_taken) in counters.items():
+            label = topics.get((topic, sub_topic, difficulty))
+            p_correct = smoothed_rate(correct, answered, label['p_correct'] if label else 0.5)
+            result[question_hash] = {
+                'topic': topic, 'sub_topic': sub_topic, 'difficulty': difficulty,
+                'answered': answered, 'correct': correct,
+                'avg_time_taken': time_taken / answered if answered else 0.0,
+                'p_correct': p_correct, 'empirical_difficulty': 1 - p_correct
+            }
+        return result
@@ -0,0 +1,428 @@
+"""Bayesian knowledge tracing per user and topic.
+
+Each (topic, sub-topic) is a skill the user either knows or does not. A
+known skill is answered wrong with probability ``slip`` and an unknown one
+right with probability ``guess``; after every answer an unknown skill
+becomes known with probability ``transit``, and ``init`` is the chance it is
+known before the first answer. The only state kept per user and skill is
+the probability that it is known now, which ``record_answers`` updates
+inside the submit transaction.
+
+``fit_bkt`` re-estimates the four parameters per skill with EM over the
+whole answer history. The forward and backward passes run one answer
+position at a time over every sequence that is that long, so each step is a
+handful of NumPy operations on arrays of sequences. States are replayed
+from the hot question_log, so archived answers only count through the
+parameters fitted before they were archived; a skill whose answers are all
+archived keeps its last state.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter, data_locations, main_location
+from src.models.user_stats import user_state_cache
+from src.utils.cache import ReadThroughCache
+from src.config.settings import settings
+
+# (init, transit, slip, guess) for skills without fitted parameters. A low slip
+# and transit keep a few lucky answers from marking a skill known: with these,
+# about two in three users answering 60% right are still below MASTERED after
+# 24 answers, against one in three with (0.3, 0.1, 0.1, 0.25)
+DEFAULT_PARAMS = (0.2, 0.03, 0.05, 0.25)
+
+# Fitted parameters are pulled towards the defaults by this many pseudo-answers,
+# and kept where the model stays identifiable (a guess above 0.5 would mean
+# unknown skills are answered better than chance)
+PRIOR_ANSWERS = 5.0
+MAX_SLIP = 0.3
+MAX_GUESS = 0.4
+
+# Skills count as mastered from this probability on, the usual BKT threshold
+MASTERED = 0.95
+MIN_ANSWERS = 2
+
+# Process-wide; parameters only change when a refit runs
+bkt_params_cache = ReadThroughCache('bkt_params', 4, settings.SESSION_CACHE_TTL_SECONDS)
+
+def update_known(p_known: float, correct: bool, params: Tuple[float, float, float, float]) -> float:
+    """Probability the skill is known after one more answer, before the next"""
+    _, transit, slip, guess = params
+    if correct:
+        posterior = p_known * (1 - slip) / (p_known * (1 - slip) + (1 - p_known) * guess)
+    else:
+        posterior = p_known * slip / (p_known * slip + (1 - p_known) * (1 - guess))
+    return posterior + (1 - posterior) * transit
+
+class AnswerSequences:
+    """Answers grouped into per-(user, skill) sequences for step-wise vectorized passes.
+
+    ``sequence`` gives each answer's sequence code, with answers already in
+    the order they were given. Sequences are ranked longest first, so the
+    ones still running at position ``t`` are a prefix of that ranking and
+    ``steps[t]`` lists the answers at position ``t`` in ranking order.
+    """
+
+    def __init__(self, sequence: np.ndarray, correct: np.ndarray, n_sequences: int):
+        self.correct = np.asarray(correct, dtype=bool)
+        order = np.argsort(sequence, kind='stable')
+        lengths = np.bincount(sequence, minlength=n_sequences)
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        self.ranking = np.argsort(-lengths, kind='stable')
+        ranked_lengths = lengths[self.ranking]
+        self.steps = []
+        for t in range(int(ranked_lengths[0]) if n_sequences else 0):
+            running = int(np.searchsorted(-ranked_lengths, -t, side='left'))  # lengths > t
+            self.steps.append(order[starts[self.ranking[:running]] + t])
+
+    def forward(self, params: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+        """Filtered passes with per-sequence (init, transit, slip, guess) rows in ranking order.
+
+        Returns P(known) before and after each answer, P(known) after each
+        sequence's last answer (before the next one), and the log-likelihood.
+        """
+        size = self.correct.size
+        prior, posterior = np.empty(size), np.empty(size)
+        p_known = params[:, 0].copy()
+        log_likelihood = 0.0
+        for idx in self.steps:
+            k = idx.size
+            correct = self.correct[idx]
+            transit, slip, guess = params[:k, 1], params[:k, 2], params[:k, 3]
+            known = p_known[:k] * np.where(correct, 1 - slip, slip)
+            evidence = known + (1 - p_known[:k]) * np.where(correct, guess, 1 - guess)
+            prior[idx] = p_known[:k]
+            posterior[idx] = known / evidence
+            log_likelihood += float(np.log(evidence).sum())
+            p_known[:k] = posterior[idx] + (1 - posterior[idx]) * transit
+        return prior, posterior, p_known, log_likelihood
+
+    def smooth(self, params: np.ndarray, prior: np.ndarray, posterior: np.ndarray):
+        """P(known | whole sequence) per answer, expected unknown-to-known transitions after
+        each answer, and P(unknown) at each answer that has a successor"""
+        size = self.correct.size
+        known = np.empty(size)
+        learned = np.zeros(size)
+        unknown_before_next = np.zeros(size)
+        for t in range(len(self.steps) - 1, -1, -1):
+            idx = self.steps[t]
+            smoothed = posterior[idx].copy()
+            if t + 1 < len(self.steps):
+                following = self.steps[t + 1]
+                k = following.size
+                # Known is absorbing: unknown at t+1 means unknown at t
+                transitions = known[following] * (1 - posterior[idx[:k]]) * params[:k, 1] / prior[following]
+                unknown = (1 - known[following]) + transitions
+                smoothed[:k] = 1 - unknown
+                learned[idx[:k]] = transitions
+                unknown_before_next[idx[:k]] = unknown
+            known[idx] = smoothed
+        return known, learned, unknown_before_next
+
+def fit_bkt(skill: np.ndarray, sequence: np.ndarray, correct: np.ndarray, n_skills: int, n_sequences: int,
+            initial: Optional[np.ndarray] = None, iterations: int = 20, tolerance: float = 1e-4) -> Dict:
+    """EM estimates of (init, transit, slip, guess) per skill.
+
+    ``skill`` and ``sequence`` are integer codes per answer (every answer of
+    a sequence has the same skill); ``initial`` optionally gives starting
+    rows per skill. Stops when the mean log-likelihood gains less than
+    ``tolerance`` per answer.
+    """
+    sequences = AnswerSequences(sequence, correct, n_sequences)
+    params = np.tile(DEFAULT_PARAMS, (n_skills, 1)) if initial is None else np.array(initial, dtype=np.float64)
+    default = np.array(DEFAULT_PARAMS)
+    sequence_skill = np.zeros(n_sequences, dtype=np.int64)
+    sequence_skill[sequence] = skill
+    ranked_skill = sequence_skill[sequences.ranking]
+    y = sequences.correct.astype(np.float64)
+
+    def expected(weights, mask=None):
+        return np.bincount(skill, weights if mask is None else weights * mask, n_skills)
+
+    previous = None
+    log_likelihood = 0.0
+    done = 0
+    for done in range(1, int(iterations) + 1):
+        ranked_params = params[ranked_skill]
+        prior, posterior, _, log_likelihood = sequences.forward(ranked_params)
+        known, learned, unknown_before_next = sequences.smooth(ranked_params, prior, posterior)
+
+        first = sequences.steps[0] if sequences.steps else np.array([], dtype=np.int64)
+        init = (np.bincount(skill[first], known[first], n_skills) + default[0] * PRIOR_ANSWERS) \
+            / (np.bincount(skill[first], minlength=n_skills) + PRIOR_ANSWERS)
+        transit = (expected(learned) + default[1] * PRIOR_ANSWERS) \
+            / (expected(unknown_before_next) + PRIOR_ANSWERS)
+        slip = (expected(known, 1 - y) + default[2] * PRIOR_ANSWERS) / (expected(known) + PRIOR_ANSWERS)
+        guess = (expected(1 - known, y) + default[3] * PRIOR_ANSWERS) / (expected(1 - known) + PRIOR_ANSWERS)
+        params = np.column_stack([
+            np.clip(init, 0.01, 0.99), np.clip(transit, 0.001, 0.5),
+            np.clip(slip, 0.01, MAX_SLIP), np.clip(guess, 0.01, MAX_GUESS)
+        ])
+
+        if previous is not None and (log_likelihood - previous) / max(1, y.size) < tolerance:
+            break
+        previous = log_likelihood
+
+    return {'params': params, 'iterations': done, 'mean_log_likelihood': log_likelihood / max(1, y.size)}
+
+class TopicKnowledge:
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        # Parameters are fitted over every shard and kept in the main database
+        self.params_storage = get_storage(main_location(self.db_path))
+        self.shards = ShardRouter.for_manager(self.db_path, TopicKnowledge)
+        self.storage.init_once('bkt_state', self.init_tables)
+
+    def init_tables(self):
+        """Create the parameter and state tables, replaying question_log into the states the first time"""
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+
+        if not self.storage.table_exists(cursor, 'question_log'):
+            conn.close()
+            return False  # QuestionLogger creates question_log; try again next time
+
+        is_new = not self.storage.table_exists(cursor, 'bkt_state')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bkt_params (
+                topic TEXT NOT NULL,
+                sub_topic TEXT NOT NULL DEFAULT '',
+                p_init REAL NOT NULL,
+                p_transit REAL NOT NULL,
+                p_slip REAL NOT NULL,
+                p_guess REAL NOT NULL,
+                answers INTEGER NOT NULL, -- answers the fit saw
+                fitted_at REAL NOT NULL, -- Unix seconds
+                PRIMARY KEY (topic, sub_topic)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS bkt_state (
+                user_id INTEGER NOT NULL,
+                topic TEXT NOT NULL,
+                sub_topic TEXT NOT NULL DEFAULT '',
+                p_known REAL NOT NULL, -- before the next answer
+                answers INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL, -- Unix seconds
+                PRIMARY KEY (user_id, topic, sub_topic)
+            ) WITHOUT ROWID
+        ''')
+
+        conn.commit()
+        conn.close()
+
+        if is_new:
+            self.rebuild()
+
+    def params(self) -> Dict[Tuple[str, str], Tuple[float, float, float, float]]:
+        """Fitted (init, transit, slip, guess) per (topic, sub_topic); missing skills use DEFAULT_PARAMS"""
+        def load():
+            try:
+                conn = self.params_storage.connect()
+                cursor = conn.cursor()
+                if not self.params_storage.table_exists(cursor, 'bkt_params'):
+                    conn.close()
+                    return {}
+                cursor.execute('SELECT topic, sub_topic, p_init, p_transit, p_slip, p_guess FROM bkt_params')
+                result = {(row[0], row[1]): tuple(row[2:]) for row in cursor.fetchall()}
+                conn.close()
+                return result
+            except Exception as e:
+                print(f"BKT parameter load error: {e}")
+                return None
+
+        return bkt_params_cache.get_or_load(('params', self.params_storage.location), load) or {}
+
+    def record_answers(self, cursor, user_id: int, answers: List[Tuple[str, str, bool]]):
+        """Trace ``(topic, sub_topic, is_correct)`` answers, in the order given, on the caller's transaction"""
+        by_skill = {}
+        for topic, sub_topic, correct in answers:
+            by_skill.setdefault((topic or '', sub_topic or ''), []).append(bool(correct))
+
+        params = self.params()
+        now = time.time()
+        rows = []
+        for (topic, sub_topic), outcomes in by_skill.items():
+            skill_params = params.get((topic, sub_topic), DEFAULT_PARAMS)
+            cursor.execute(f'''
+                SELECT p_known, answers FROM bkt_state
+                WHERE user_id = ? AND topic = ? AND sub_topic = ?{self.storage.for_update}
+            ''', [int(user_id), topic, sub_topic])
+            row = cursor.fetchone()
+            p_known, count = (row[0], row[1]) if row else (skill_params[0], 0)
+            for correct in outcomes:
+                p_known = update_known(p_known, correct, skill_params)
+            rows.append([int(user_id), topic, sub_topic, p_known, count + len(outcomes), now])
+
+        cursor.executemany('''
+            INSERT INTO bkt_state (user_id, topic, sub_topic, p_known, answers, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, topic, sub_topic) DO UPDATE SET
+                p_known = excluded.p_known,
+                answers = excluded.answers,
+                updated_at = excluded.updated_at
+        ''', rows)
+
+    def forget_cached(self, user_id: int):
+        """Drop the cached states after a committed ``record_answers``; the next read reloads them"""
+        user_state_cache.discard((self.db_path, int(user_id)), 'knowledge')
+
+    def _load_states(self, user_id: int) -> Optional[Dict]:
+        try:
+            conn = self.storage.connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT topic, sub_topic, p_known, answers FROM bkt_state WHERE user_id = ?',
+                           [int(user_id)])
+            states = {(row[0], row[1]): (row[2], row[3]) for row in cursor.fetchall()}
+            conn.close()
+            return states
+        except Exception as e:
+            print(f"Knowledge state load error: {e}")
+            return None
+
+    def get_states(self, user_id: int) -> Dict[Tuple[str, str], Tuple[float, int]]:
+        """(P(known), answers) per (topic, sub_topic)"""
+        if self.shards:
+            return self.shards.for_user(user_id).get_states(user_id)
+
+        return user_state_cache.get((self.db_path, int(user_id)), 'knowledge',
+                                    lambda: self._load_states(user_id)) or {}
+
+    def area_states(self, user_id: int) -> Dict[str, Dict]:
+        """``{"topic - sub_topic": {'p_known', 'answers', 'mastered'}}`` for every traced skill"""
+        return {
+            f"{topic} - {sub_topic}" if sub_topic else topic: {
+                'p_known': p_known, 'answers': answers,
+                'mastered': answers >= MIN_ANSWERS and p_known >= MASTERED
+            }
+            for (topic, sub_topic), (p_known, answers) in self.get_states(user_id).items()
+        }
+
+    @staticmethod
+    def _read_history(storage, cursor) -> Optional[Dict]:
+        """Every logged answer of one database as coded arrays, oldest first"""
+        if not storage.table_exists(cursor, 'question_log'):
+            return None
+        cursor.execute('''
+            SELECT user_id, topic, COALESCE(sub_topic, ''), CASE WHEN is_correct THEN 1 ELSE 0 END
+            FROM question_log
+            WHERE user_id IS NOT NULL AND topic IS NOT NULL
+            ORDER BY id
+        ''')
+        rows = cursor.fetchall()
+
+        user_ids, topics, sub_topics, correct = zip(*rows) if rows else ((),) * 4
+        return {'user_id': np.array(user_ids, dtype=np.int64),
+                'skill': [f"{topic}\x1f{sub_topic}" for topic, sub_topic in zip(topics, sub_topics)],
+                'correct': np.array(correct, dtype=np.int8)}
+
+    @classmethod
+    def _load_history(cls, location: str) -> Optional[Dict]:
+        storage = get_storage(location)
+        conn = storage.connect()
+        try:
+            return cls._read_history(storage, conn.cursor())
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _sequence_codes(user_ids: np.ndarray, skill_codes: np.ndarray, n_skills: int):
+        return pd.factorize(user_ids * max(1, n_skills) + skill_codes)
+
+    def rebuild(self):
+        """Replay question_log through the current parameters into bkt_state.
+
+        Submits wait from the read until the new states commit, so none of
+        their answers miss an update. Skills with no answers left in the hot
+        question_log keep the state they have.
+        """
+        if self.shards:
+            self.shards.fan_out(lambda shard: shard.rebuild())
+
+        conn = self.storage.connect()
+        try:
+            cursor = conn.cursor()
+            self.storage.lock_for_write(cursor, 'bkt_state')
+            history = self._read_history(self.storage, cursor)
+            if history is not None:
+                self._replace_states(cursor, history)
+            conn.commit()
+        finally:
+            conn.close()
+        user_state_cache.clear()
+
+    def _replace_states(self, cursor, history: Dict):
+        """Upsert the replayed state of every (user, skill) in ``history`` on the caller's transaction"""
+        skill_codes, skills = pd.factorize(np.asarray(history['skill'], dtype=object))
+        sequence_codes, sequence_keys = self._sequence_codes(history['user_id'], skill_codes, len(skills))
+        params = self.params()
+        skill_params = np.array([params.get(tuple(skill.split('\x1f', 1)), DEFAULT_PARAMS) for skill in skills]) \
+            .reshape(-1, 4)
+
+        sequences = AnswerSequences(sequence_codes, history['correct'], len(sequence_keys))
+        sequence_skill = np.asarray(sequence_keys) % max(1, len(skills))
+        _, _, p_known, _ = sequences.forward(skill_params[sequence_skill[sequences.ranking]])
+        answers = np.bincount(sequence_codes, minlength=len(sequence_keys))[sequences.ranking]
+
+        now = time.time()
+        rows = []
+        for key, probability, count in zip(np.asarray(sequence_keys)[sequences.ranking], p_known, answers):
+            topic, sub_topic = skills[int(key % max(1, len(skills)))].split('\x1f', 1)
+            rows.append([int(key // max(1, len(skills))), topic, sub_topic, float(probability), int(count), now])
+
+        cursor.executemany('''
+            INSERT INTO bkt_state (user_id, topic, sub_topic, p_known, answers, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, topic, sub_topic) DO UPDATE SET
+                p_known = excluded.p_known,
+                answers = excluded.answers,
+                updated_at = excluded.updated_at
+        ''', rows)
+
+    def refit(self, iterations: int = 20) -> Dict:
+        """Fit the parameters per skill over every database's history, then replay the states"""
+        started = time.perf_counter()
+        histories = [history for history in map(self._load_history, data_locations(main_location(self.db_path)))
+                     if history is not None]
+        user_ids = np.concatenate([history['user_id'] for history in histories]) if histories \
+            else np.array([], dtype=np.int64)
+        if not user_ids.size:
+            return {'answers': 0, 'skills': 0, 'iterations': 0}
+
+        skill_codes, skills = pd.factorize(np.asarray(
+            [skill for history in histories for skill in history['skill']], dtype=object))
+        correct = np.concatenate([history['correct'] for history in histories])
+        # Users live on one shard each, so concatenating keeps every sequence in answer order
+        sequence_codes, sequence_keys = self._sequence_codes(user_ids, skill_codes, len(skills))
+
+        previous = self.params()
+        initial = np.array([previous.get(tuple(skill.split('\x1f', 1)), DEFAULT_PARAMS) for skill in skills])
+        fit = fit_bkt(skill_codes, sequence_codes, correct, len(skills), len(sequence_keys), initial, iterations)
+        answers = np.bincount(skill_codes, minlength=len(skills))
+        fitted_at = time.perf_counter()
+
+        now = time.time()
+        conn = self.params_storage.connect()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM bkt_params')
+        self.params_storage.bulk_insert(cursor, 'bkt_params', [
+            'topic', 'sub_topic', 'p_init', 'p_transit', 'p_slip', 'p_guess', 'answers', 'fitted_at'
+        ], [
+            [*skill.split('\x1f', 1), *map(float, row), int(count), now]
+            for skill, row, count in zip(skills, fit['params'], answers)
+        ])
+        conn.commit()
+        conn.close()
+        bkt_params_cache.clear()
+
+        self.rebuild()
+        return {'answers': int(correct.size), 'skills': len(skills), 'sequences': len(sequence_keys),
+                'iterations': fit['iterations'], 'mean_log_likelihood': round(fit['mean_log_likelihood'], 5),
+                'fit_seconds': round(fitted_at - started, 3), 'seconds': round(time.perf_counter() - started, 3)}
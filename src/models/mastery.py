@@ -0,0 +1,186 @@
+import calendar
+import time
+from typing import Dict, Optional, Tuple
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter
+from src.models.user_stats import user_state_cache
+from src.config.settings import settings
+
+# A topic counts as weak below this mastery once it has this much (decayed) evidence
+WEAK_MASTERY = 0.7
+MIN_EVIDENCE = 1.0
+
+# Beta(1, 1) prior: a topic with no recent answers sits at 50%
+PRIOR_CORRECT = 1.0
+PRIOR_TOTAL = 2.0
+
+def decay_factor(elapsed_seconds: float, half_life_days: float) -> float:
+    """Weight left on answers ``elapsed_seconds`` old"""
+    return 0.5 ** (max(0.0, elapsed_seconds) / (half_life_days * 86400))
+
+def mastery_score(correct: float, total: float) -> float:
+    """Smoothed share of correct answers"""
+    return (correct + PRIOR_CORRECT) / (total + PRIOR_TOTAL)
+
+class TopicMastery:
+    """Exponentially time-decayed correct/total counters per (user, topic, sub-topic, difficulty).
+
+    Each answer's weight halves every ``MASTERY_HALF_LIFE_DAYS``. Only the
+    decayed sums and the time they were last brought up to date are stored,
+    so logging answers is one primary-key read and write per bucket. Reads
+    decay the counters to the current time, and weak topics are ranked from
+    them without scanning ``question_log``.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, half_life_days: Optional[float] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.half_life_days = float(half_life_days or settings.MASTERY_HALF_LIFE_DAYS)
+        self.shards = ShardRouter.for_manager(self.db_path, TopicMastery)
+        self.storage.init_once('topic_mastery', self.init_tables)
+
+    def init_tables(self):
+        """Create topic_mastery, filling it from topic_stats the first time"""
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+
+        if not self.storage.table_exists(cursor, 'topic_stats'):
+            conn.close()
+            return False  # QuestionLogger creates topic_stats; try again next time
+
+        is_new = not self.storage.table_exists(cursor, 'topic_mastery')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS topic_mastery (
+                user_id INTEGER NOT NULL,
+                topic TEXT NOT NULL,
+                sub_topic TEXT NOT NULL DEFAULT '',
+                difficulty TEXT NOT NULL DEFAULT '',
+                correct REAL NOT NULL DEFAULT 0, -- decayed to updated_at
+                total REAL NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL, -- Unix seconds
+                PRIMARY KEY (user_id, topic, sub_topic, difficulty)
+            ) WITHOUT ROWID
+        ''')
+
+        conn.commit()
+        conn.close()
+
+        if is_new:
+            self.rebuild()
+
+    def _decayed(self, state: Tuple[float, float, float], now: float) -> Tuple[float, float]:
+        correct, total, updated_at = state
+        factor = decay_factor(now - updated_at, self.half_life_days)
+        return correct * factor, total * factor
+
+    def record_answers(self, cursor, user_id: int, buckets: Dict):
+        """Fold ``QuestionLogger._bucket_answers`` output into the counters on the caller's transaction"""
+        now = time.time()
+        rows = []
+        for (topic, sub_topic, difficulty), (correct, total, _) in buckets.items():
+            cursor.execute(f'''
+                SELECT correct, total, updated_at FROM topic_mastery
+                WHERE user_id = ? AND topic = ? AND sub_topic = ? AND difficulty = ?{self.storage.for_update}
+            ''', [int(user_id), topic, sub_topic, difficulty])
+            row = cursor.fetchone()
+            old_correct, old_total = self._decayed(tuple(row), now) if row else (0.0, 0.0)
+            rows.append([int(user_id), topic, sub_topic, difficulty,
+                         old_correct + correct, old_total + total, now])
+
+        cursor.executemany('''
+            INSERT INTO topic_mastery (user_id, topic, sub_topic, difficulty, correct, total, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, topic, sub_topic, difficulty) DO UPDATE SET
+                correct = excluded.correct,
+                total = excluded.total,
+                updated_at = excluded.updated_at
+        ''', rows)
+
+    def cache_answers(self, user_id: int, buckets: Dict):
+        """Apply a committed ``record_answers`` to the cached counters"""
+        now = time.time()
+
+        def apply(states: Dict) -> Dict:
+            states = dict(states)
+            for key, (correct, total, _) in buckets.items():
+                old_correct, old_total = self._decayed(states[key], now) if key in states else (0.0, 0.0)
+                states[key] = (old_correct + correct, old_total + total, now)
+            return states
+
+        user_state_cache.update((self.db_path, int(user_id)), 'mastery', apply)
+
+    def _load_states(self, user_id: int) -> Optional[Dict]:
+        try:
+            conn = self.storage.connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT topic, sub_topic, difficulty, correct, total, updated_at
+                FROM topic_mastery WHERE user_id = ?
+            ''', [int(user_id)])
+            states = {tuple(row[:3]): (row[3], row[4], row[5]) for row in cursor.fetchall()}
+            conn.close()
+            return states
+        except Exception as e:
+            print(f"Mastery load error: {e}")
+            return None
+
+    def get_scores(self, user_id: int) -> Dict[Tuple[str, str, str], Dict]:
+        """Current decayed counters and mastery per (topic, sub_topic, difficulty)"""
+        if self.shards:
+            return self.shards.for_user(user_id).get_scores(user_id)
+
+        states = user_state_cache.get((self.db_path, int(user_id)), 'mastery',
+                                      lambda: self._load_states(user_id)) or {}
+        now = time.time()
+        scores = {}
+        for key, state in states.items():
+            correct, total = self._decayed(state, now)
+            scores[key] = {'correct': correct, 'total': total, 'mastery': mastery_score(correct, total)}
+        return scores
+
+    def area_scores(self, user_id: int) -> Dict[str, Dict]:
+        """Decayed counters per ``"topic - sub_topic"`` area, with a per-difficulty breakdown"""
+        areas = {}
+        for (topic, sub_topic, difficulty), score in self.get_scores(user_id).items():
+            area_key = f"{topic} - {sub_topic}" if sub_topic else topic
+            area = areas.setdefault(area_key, {'correct': 0.0, 'total': 0.0, 'difficulty_breakdown': {}})
+            area['correct'] += score['correct']
+            area['total'] += score['total']
+            area['difficulty_breakdown'][difficulty] = {'correct': score['correct'], 'total': score['total']}
+        return areas
+
+    def rebuild(self):
+        """Recompute every counter from the daily topic_stats buckets"""
+        if self.shards:
+            self.shards.fan_out(lambda shard: shard.rebuild())
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+
+        if not self.storage.table_exists(cursor, 'topic_stats'):
+            conn.close()
+            return
+
+        now = time.time()
+        cursor.execute('SELECT user_id, topic, sub_topic, difficulty, day, correct, total FROM topic_stats')
+        counters = {}
+        for user_id, topic, sub_topic, difficulty, day, correct, total in cursor.fetchall():
+            # Buckets only know the (UTC) day; count their answers from midday, or now for today
+            answered_at = min(now, calendar.timegm(time.strptime(day, '%Y-%m-%d')) + 43200)
+            factor = decay_factor(now - answered_at, self.half_life_days)
+            counter = counters.setdefault((user_id, topic, sub_topic, difficulty), [0.0, 0.0])
+            counter[0] += correct * factor
+            counter[1] += total * factor
+
+        cursor.execute("DELETE FROM topic_mastery")
+        cursor.executemany('''
+            INSERT INTO topic_mastery (user_id, topic, sub_topic, difficulty, correct, total, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [[*key, correct, total, now] for key, (correct, total) in counters.items()])
+
+        conn.commit()
+        conn.close()
+        user_state_cache.clear()
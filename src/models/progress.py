@@ -0,0 +1,129 @@
+"""Per-topic accuracy over time for progress charts, downsampled on the server.
+
+``AccuracySeries`` reads a user's daily topic_stats buckets once (one row
+per day and topic, so archived question_log rows still count) and keeps
+them as NumPy arrays in ``user_state_cache`` until the user submits again.
+Each topic's accuracy is taken over a trailing window of days, so quiet
+days do not drop to zero and single quizzes do not dominate. The series is
+then cut down to a fixed number of points with Largest-Triangle-Three-Buckets,
+which keeps the peaks and dips a plain stride would skip. A user with years
+of history sends the same number of points as one with a month.
+"""
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter
+from src.models.user_stats import user_state_cache
+
+DEFAULT_POINTS = 60
+DEFAULT_WINDOW_DAYS = 7
+DEFAULT_TOPICS = 8
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the ``threshold`` points Largest-Triangle-Three-Buckets keeps, first and last included"""
+    n = x.size
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # The points between the first and last, split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket == threshold - 3:
+            next_x, next_y = x[-1], y[-1]
+        else:
+            next_x, next_y = x[end:edges[bucket + 2]].mean(), y[end:edges[bucket + 2]].mean()
+        # Twice the triangle area between the last kept point, each candidate and the next bucket's mean
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def trailing_accuracy(days: np.ndarray, correct: np.ndarray, total: np.ndarray, window_days: int):
+    """Accuracy in percent and answer count over the ``window_days`` days ending at each active day"""
+    correct_sums = np.concatenate([[0], np.cumsum(correct)])
+    total_sums = np.concatenate([[0], np.cumsum(total)])
+    starts = np.searchsorted(days, days - (int(window_days) - 1), side='left')
+    ends = np.arange(1, days.size + 1)
+    answers = total_sums[ends] - total_sums[starts]
+    accuracy = np.divide((correct_sums[ends] - correct_sums[starts]) * 100.0, answers,
+                         out=np.zeros(days.size), where=answers > 0)
+    return accuracy, answers
+
+class AccuracySeries:
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.shards = ShardRouter.for_manager(self.db_path, AccuracySeries)
+
+    def forget_cached(self, user_id: int):
+        """Drop the cached buckets after a committed submit; the next chart reloads them"""
+        user_state_cache.discard((self.db_path, int(user_id)), 'accuracy_series')
+
+    def _load_buckets(self, user_id: int) -> Optional[Dict]:
+        """{topic: (day numbers, correct, total)} over every day the user answered, oldest first"""
+        try:
+            conn = self.storage.connect()
+            try:
+                cursor = conn.cursor()
+                if not self.storage.table_exists(cursor, 'topic_stats'):
+                    return {}
+                cursor.execute('''
+                    SELECT topic, day, SUM(correct), SUM(total)
+                    FROM topic_stats
+                    WHERE user_id = ?
+                    GROUP BY topic, day
+                    ORDER BY topic, day
+                ''', [int(user_id)])
+                rows = cursor.fetchall()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Accuracy series load error: {e}")
+            return None
+
+        buckets = {}
+        if rows:
+            topics, days, correct, total = zip(*rows)
+            topics = np.array(topics, dtype=object)
+            day_numbers = np.array(days, dtype='datetime64[D]').astype(np.int64)
+            correct = np.array(correct, dtype=np.float64)
+            total = np.array(total, dtype=np.float64)
+            # Rows are grouped by topic, so each topic is one contiguous slice
+            boundaries = np.flatnonzero(topics[1:] != topics[:-1]) + 1
+            for start, end in zip(np.concatenate([[0], boundaries]), np.concatenate([boundaries, [topics.size]])):
+                buckets[topics[start]] = (day_numbers[start:end], correct[start:end], total[start:end])
+        return buckets
+
+    def accuracy_series(self, user_id: int, points: int = DEFAULT_POINTS, window_days: int = DEFAULT_WINDOW_DAYS,
+                        max_topics: int = DEFAULT_TOPICS) -> Dict[str, List[Dict]]:
+        """Downsampled ``[{'day', 'accuracy', 'answers'}]`` per topic, most answered topics first.
+
+        ``accuracy`` is the percentage right over the ``window_days`` days up
+        to ``day`` and ``answers`` how many answers that covers.
+        """
+        if self.shards:
+            return self.shards.for_user(user_id).accuracy_series(user_id, points, window_days, max_topics)
+
+        buckets = user_state_cache.get((self.db_path, int(user_id)), 'accuracy_series',
+                                       lambda: self._load_buckets(user_id)) or {}
+        ranked = sorted(buckets, key=lambda topic: (-buckets[topic][2].sum(), topic))[:max_topics]
+
+        series = {}
+        for topic in ranked:
+            days, correct, total = buckets[topic]
+            accuracy, answers = trailing_accuracy(days, correct, total, window_days)
+            kept = lttb(days.astype(np.float64), accuracy, int(points))
+            series[topic] = [
+                {'day': date.fromordinal(int(days[i]) + date(1970, 1, 1).toordinal()).isoformat(),
+                 'accuracy': round(float(accuracy[i]), 1), 'answers': int(answers[i])}
+                for i in kept
+            ]
+        return series
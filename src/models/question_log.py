@@ -1,16 +1,46 @@
 import sqlite3
-import json
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+from src.models.question_store import QuestionStore
+from src.models.mastery import MIN_EVIDENCE, WEAK_MASTERY, TopicMastery, mastery_score
+from src.models.review_queue import ReviewQueue
+from src.models.knowledge_tracing import DEFAULT_PARAMS, MIN_ANSWERS, TopicKnowledge
+from src.models.bandit import TopicBandit
+from src.models.progress import AccuracySeries
+from src.models.recommendations import RecommendationStore
+from src.models.item_stats import ItemStats
+from src.models.irt import IRTCalibration
+from src.models.user_stats import user_state_cache
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter, reserve_id_range
+from src.config.settings import settings
+
+# Days of topic_stats buckets held in the user state cache; longer analyses query the table
+CACHED_TOPIC_DAYS = 30
+
+# Weakest topics the suggested quiz is sampled from
+BANDIT_TOPICS = 5
 
 class QuestionLogger:
-    def __init__(self, db_path: str = "studyai.db"):
-        self.db_path = db_path
-        self.init_tables()
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.question_store = QuestionStore(self.db_path)
+        # With DATABASE_SHARDS > 1, per-user calls go to the user's shard
+        self.shards = ShardRouter.for_manager(self.db_path, QuestionLogger)
+        self.storage.init_once('question_log', self.init_tables)
+        self.mastery = TopicMastery(self.db_path)
+        self.review_queue = ReviewQueue(self.db_path)
+        self.knowledge = TopicKnowledge(self.db_path)
+        self.bandit = TopicBandit(self.db_path)
+        self.progress = AccuracySeries(self.db_path)
     
     def init_tables(self):
         """Initialize question logging table"""
-        conn = sqlite3.connect(self.db_path)
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+        
+        conn = self.storage.connect()
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -35,56 +65,236 @@ class QuestionLogger:
             )
         ''')
         
+        # Question content lives in the questions table; the text columns
+        # above are only filled for rows written before it existed
+        try:
+            cursor.execute('ALTER TABLE question_log ADD COLUMN question_id INTEGER REFERENCES questions (id)')
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+        
+        # Looks up a session's questions (exports, search index rebuilds)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_question_log_session
+            ON question_log (session_id)
+        ''')
+        
+        # Serves the per-user latest log id that versions memoized analyses
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_question_log_user
+            ON question_log (user_id, id)
+        ''')
+        
+        reserve_id_range(cursor, self.db_path, 'question_log')
+        
+        # Per-user, per-topic daily answer counts maintained as questions are
+        # logged, so topic analysis never scans question_log
+        topic_stats_is_new = not self.storage.table_exists(cursor, 'topic_stats')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS topic_stats (
+                user_id INTEGER NOT NULL,
+                day TEXT NOT NULL, -- YYYY-MM-DD (UTC) of the answers
+                topic TEXT NOT NULL,
+                sub_topic TEXT NOT NULL DEFAULT '',
+                difficulty TEXT NOT NULL DEFAULT '',
+                correct INTEGER NOT NULL DEFAULT 0,
+                total INTEGER NOT NULL DEFAULT 0,
+                time_taken INTEGER NOT NULL DEFAULT 0, -- seconds, summed
+                PRIMARY KEY (user_id, day, topic, sub_topic, difficulty)
+            ) WITHOUT ROWID
+        ''')
+        
         conn.commit()
         conn.close()
+        
+        if topic_stats_is_new:
+            self.rebuild_topic_stats()
     
     def log_question(self, user_id: int, session_id: int, question_data: Dict):
         """Log individual question with user performance"""
+        if self.shards:
+            return self.shards.for_user(user_id).log_question(user_id, session_id, question_data)
+        
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self.storage.connect()
             cursor = conn.cursor()
             
-            cursor.execute('''
-                INSERT INTO question_log (
-                    user_id, session_id, topic, sub_topic, difficulty, question_type,
-                    question_text, options, correct_answer, user_answer, is_correct,
-                    time_taken, explanation
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', [
+            self.insert_logs(cursor, user_id, session_id, [question_data])
+            
+            conn.commit()
+            conn.close()
+            return True
+            
+        except Exception as e:
+            print(f"Question logging error: {e}")
+            return False
+    
+    def insert_logs(self, cursor, user_id: int, session_id: int, questions: List[Dict]):
+        """Insert logged questions on the caller's cursor so they share its transaction"""
+        rows = []
+        for question_data in questions:
+            question_id = self.question_store.intern_question(cursor, {
+                'type': question_data.get('question_type', ''),
+                'question': question_data.get('question_text', ''),
+                'options': question_data.get('options', []),
+                'correct_answer': question_data.get('correct_answer', ''),
+                'explanation': question_data.get('explanation', '')
+            })
+            rows.append([
                 int(user_id),
                 int(session_id),
                 question_data.get('topic', ''),
                 question_data.get('sub_topic', ''),
                 question_data.get('difficulty', ''),
                 question_data.get('question_type', ''),
-                question_data.get('question_text', ''),
-                json.dumps(question_data.get('options', [])),
+                question_id,
                 question_data.get('correct_answer', ''),
                 question_data.get('user_answer', ''),
                 bool(question_data.get('is_correct', False)),
-                int(question_data.get('time_taken', 0)),
-                question_data.get('explanation', '')
+                int(question_data.get('time_taken', 0))
             ])
-            
-            conn.commit()
-            conn.close()
-            return True
-            
-        except Exception as e:
-            print(f"Question logging error: {e}")
-            return False
+        
+        self.storage.bulk_insert(cursor, 'question_log', [
+            'user_id', 'session_id', 'topic', 'sub_topic', 'difficulty', 'question_type',
+            'question_id', 'correct_answer', 'user_answer', 'is_correct', 'time_taken'
+        ], rows)
+        
+        buckets = self._bucket_answers(questions)
+        self._update_topic_stats(cursor, user_id, buckets)
+        self.mastery.record_answers(cursor, user_id, buckets)
+        self.review_queue.record_answers(cursor, user_id, [
+            {'question_id': row[6], 'is_correct': row[9], 'topic': row[2], 'sub_topic': row[3], 'difficulty': row[4]}
+            for row in rows
+        ])
+        self.knowledge.record_answers(cursor, user_id, [(row[2], row[3], row[9]) for row in rows])
+        self.bandit.record_answers(cursor, user_id, [(row[2], row[3], row[4], row[5], row[9]) for row in rows])
+    
+    @staticmethod
+    def _bucket_answers(questions: List[Dict]) -> Dict:
+        """Sum logged answers into [correct, total, time_taken] per (topic, sub_topic, difficulty)"""
+        buckets = {}
+        for question_data in questions:
+            key = (
+                question_data.get('topic', '') or '',
+                question_data.get('sub_topic', '') or '',
+                question_data.get('difficulty', '') or ''
+            )
+            bucket = buckets.setdefault(key, [0, 0, 0])
+            bucket[0] += 1 if question_data.get('is_correct', False) else 0
+            bucket[1] += 1
+            bucket[2] += int(question_data.get('time_taken', 0) or 0)
+        return buckets
+    
+    def _update_topic_stats(self, cursor, user_id: int, buckets: Dict):
+        """Add bucketed answers to today's topic_stats rows"""
+        # Same clock as question_log.created_at (CURRENT_TIMESTAMP, UTC)
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        cursor.executemany('''
+            INSERT INTO topic_stats (user_id, day, topic, sub_topic, difficulty, correct, total, time_taken)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, day, topic, sub_topic, difficulty) DO UPDATE SET
+                correct = topic_stats.correct + excluded.correct,
+                total = topic_stats.total + excluded.total,
+                time_taken = topic_stats.time_taken + excluded.time_taken
+        ''', [
+            [int(user_id), today, topic, sub_topic, difficulty, correct, total, time_taken]
+            for (topic, sub_topic, difficulty), (correct, total, time_taken) in buckets.items()
+        ])
+    
+    def rebuild_topic_stats(self, since_day: Optional[str] = None):
+        """Recompute topic_stats from question_log from ``since_day`` on.
+        
+        Defaults to the oldest day still in question_log, so rollups of days
+        whose raw rows were archived by the retention job are kept.
+        """
+        if self.shards:
+            self.shards.fan_out(lambda shard: shard.rebuild_topic_stats(since_day))
+        
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+        
+        if not since_day:
+            cursor.execute("SELECT substr(MIN(created_at), 1, 10) FROM question_log")
+            since_day = cursor.fetchone()[0]
+            if not since_day:
+                conn.close()
+                return
+        
+        cursor.execute("DELETE FROM topic_stats WHERE day >= ?", [since_day])
+        day_filter, params = "WHERE created_at >= ?", [since_day]
+        
+        cursor.execute(f'''
+            INSERT INTO topic_stats (user_id, day, topic, sub_topic, difficulty, correct, total, time_taken)
+            SELECT user_id, substr(created_at, 1, 10), topic, COALESCE(sub_topic, ''), COALESCE(difficulty, ''),
+                   SUM(CASE WHEN is_correct THEN 1 ELSE 0 END), COUNT(*), COALESCE(SUM(time_taken), 0)
+            FROM question_log
+            {day_filter}
+            GROUP BY user_id, substr(created_at, 1, 10), topic, COALESCE(sub_topic, ''), COALESCE(difficulty, '')
+        ''', params)
+        
+        conn.commit()
+        conn.close()
+        user_state_cache.clear()
+    
+    def cache_logs(self, user_id: int, questions: List[Dict]):
+        """Apply committed ``insert_logs`` to the user's cached topic buckets and recent questions"""
+        user_key = (self.db_path, int(user_id))
+        user_state_cache.discard(user_key, 'recent_questions')
+        user_state_cache.discard(user_key, 'latest_log_id')
+        self.review_queue.forget_cached(user_id)
+        self.knowledge.forget_cached(user_id)
+        self.progress.forget_cached(user_id)
+        self.bandit.cache_answers(user_id, [
+            (question_data.get('topic', ''), question_data.get('sub_topic', ''), question_data.get('difficulty', ''),
+             question_data.get('question_type', ''), bool(question_data.get('is_correct', False)))
+            for question_data in questions
+        ])
+        
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        answers = self._bucket_answers(questions)
+        
+        def apply(cached: Dict) -> Dict:
+            buckets = dict(cached['buckets'])
+            for (topic, sub_topic, difficulty), (correct, total, _) in answers.items():
+                key = (today, topic, sub_topic, difficulty)
+                old_correct, old_total = buckets.get(key, (0, 0))
+                buckets[key] = (old_correct + correct, old_total + total)
+            return {'since_day': cached['since_day'], 'buckets': buckets}
+        
+        user_state_cache.update(user_key, 'topic_rows', apply)
+        self.mastery.cache_answers(user_id, answers)
     
     def get_recent_questions(self, user_id: int, limit: int = 10) -> List[Dict]:
-        """Get user's recent questions for analysis"""
+        """Get user's recent questions for analysis, cached until the user logs more"""
+        if self.shards:
+            return self.shards.for_user(user_id).get_recent_questions(user_id, limit)
+        
+        user_key = (self.db_path, int(user_id))
+        load = lambda: self._query_recent_questions(user_id, limit)
+        cached = user_state_cache.get(user_key, 'recent_questions', load)
+        if cached is not None and cached[0] < int(limit) and len(cached[1]) == cached[0]:
+            # Cached for a shorter list and the user may have more rows
+            user_state_cache.discard(user_key, 'recent_questions')
+            cached = user_state_cache.get(user_key, 'recent_questions', load)
+        
+        if cached is None:
+            return []
+        return [dict(question) for question in cached[1][:int(limit)]]
+    
+    def _query_recent_questions(self, user_id: int, limit: int) -> Optional[Tuple[int, List[Dict]]]:
+        """The user's ``limit`` most recent questions as (limit, questions), or None on error"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
+            conn = self.storage.connect(named_rows=True)
             cursor = conn.cursor()
             
             cursor.execute('''
-                SELECT * FROM question_log 
-                WHERE user_id = ?
-                ORDER BY created_at DESC
+                SELECT ql.id, ql.topic, ql.sub_topic, ql.difficulty, ql.question_type,
+                       COALESCE(q.question_text, ql.question_text) AS question_text,
+                       ql.is_correct, ql.created_at
+                FROM question_log ql
+                LEFT JOIN questions q ON q.id = ql.question_id
+                WHERE ql.user_id = ?
+                ORDER BY ql.id DESC
                 LIMIT ?
             ''', [int(user_id), int(limit)])
             
@@ -102,31 +312,75 @@ class QuestionLogger:
                 })
             
             conn.close()
-            return questions
+            return int(limit), questions
             
         except Exception as e:
             print(f"Get recent questions error: {e}")
-            return []
+            return None
+    
+    def latest_log_id(self, user_id: int) -> Optional[int]:
+        """Id of the user's newest logged answer (0 if none), or None on error.
+        
+        Ids only grow within the user's database, so this changes exactly when
+        the user logs more answers. Cached until the user logs more; a reload
+        is one index lookup.
+        """
+        if self.shards:
+            return self.shards.for_user(user_id).latest_log_id(user_id)
+        
+        return user_state_cache.get((self.db_path, int(user_id)), 'latest_log_id',
+                                    lambda: self._query_latest_log_id(user_id))
+    
+    def _query_latest_log_id(self, user_id: int) -> Optional[int]:
+        try:
+            conn = self.storage.connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT MAX(id) FROM question_log WHERE user_id = ?', [int(user_id)])
+            row = cursor.fetchone()
+            conn.close()
+            return int(row[0] or 0)
+        except Exception as e:
+            print(f"Latest log id error: {e}")
+            return None
+    
+    def memoized(self, user_id: int, name: str, compute: Callable):
+        """``compute()``, reused until the user logs another answer.
+        
+        The result is kept in ``user_state_cache`` with the user's latest log
+        id, so a hit costs one cached ``latest_log_id`` read. Results are
+        shared: callers must treat them as read-only.
+        """
+        if self.shards:
+            return self.shards.for_user(user_id).memoized(user_id, name, compute)
+        
+        version = self.latest_log_id(user_id)
+        if version is None:
+            return compute()
+        
+        user_key = (self.db_path, int(user_id))
+        part = f'memo_{name}'
+        load = lambda: (version, compute())
+        cached = user_state_cache.get(user_key, part, load)
+        if cached[0] != version:
+            user_state_cache.discard(user_key, part)
+            cached = user_state_cache.get(user_key, part, load)
+        return cached[1]
     
     def analyze_weak_topics(self, user_id: int, days: int = 7) -> Dict[str, Dict]:
         """Analyze user's weak topics from recent performance"""
+        if self.shards:
+            return self.shards.for_user(user_id).analyze_weak_topics(user_id, days)
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            
-            # Get questions from last N days
-            cursor.execute('''
-                SELECT topic, sub_topic, difficulty, is_correct, COUNT(*) as question_count
-                FROM question_log 
-                WHERE user_id = ? AND created_at >= datetime('now', '-{} days')
-                GROUP BY topic, sub_topic, difficulty, is_correct
-                ORDER BY topic, sub_topic
-            '''.format(days), [int(user_id)])
+            # Pre-aggregated daily buckets for the last N days
+            since_day = (datetime.utcnow() - timedelta(days=int(days))).strftime('%Y-%m-%d')
+            rows = self._cached_topic_rows(user_id, since_day) if int(days) <= CACHED_TOPIC_DAYS else None
+            if rows is None:
+                rows = self._query_topic_rows(user_id, since_day)
             
             # Analyze performance by topic
             topic_analysis = {}
-            for row in cursor.fetchall():
+            for row in rows:
                 topic_key = row['topic']
                 if row['sub_topic']:
                     topic_key = f"{row['topic']} - {row['sub_topic']}"
@@ -143,10 +397,8 @@ class QuestionLogger:
                 
                 # Update counts
                 topic_analysis[topic_key]['total_questions'] += row['question_count']
-                if row['is_correct']:
-                    topic_analysis[topic_key]['correct_answers'] += row['question_count']
-                else:
-                    topic_analysis[topic_key]['wrong_answers'] += row['question_count']
+                topic_analysis[topic_key]['correct_answers'] += row['correct_count']
+                topic_analysis[topic_key]['wrong_answers'] += row['question_count'] - row['correct_count']
                 
                 # Track difficulty breakdown
                 diff = row['difficulty']
@@ -154,8 +406,7 @@ class QuestionLogger:
                     topic_analysis[topic_key]['difficulty_breakdown'][diff] = {'correct': 0, 'total': 0}
                 
                 topic_analysis[topic_key]['difficulty_breakdown'][diff]['total'] += row['question_count']
-                if row['is_correct']:
-                    topic_analysis[topic_key]['difficulty_breakdown'][diff]['correct'] += row['question_count']
+                topic_analysis[topic_key]['difficulty_breakdown'][diff]['correct'] += row['correct_count']
             
             # Calculate accuracy and identify weak topics
             weak_topics = {}
@@ -168,7 +419,6 @@ class QuestionLogger:
                         data['needs_practice'] = True
                         weak_topics[topic] = data
             
-            conn.close()
             return {
                 'all_topics': topic_analysis,
                 'weak_topics': weak_topics,
@@ -178,15 +428,96 @@ class QuestionLogger:
         except Exception as e:
             print(f"Weak topic analysis error: {e}")
             return {'all_topics': {}, 'weak_topics': {}, 'analysis_period_days': days}
+    
+    def _query_topic_rows(self, user_id: int, since_day: str) -> List[Dict]:
+        """Correct and total answers per (topic, sub_topic, difficulty) from ``since_day`` on"""
+        conn = self.storage.connect(named_rows=True)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT topic, sub_topic, difficulty,
+                       SUM(correct) AS correct_count, SUM(total) AS question_count
+                FROM topic_stats
+                WHERE user_id = ? AND day >= ?
+                GROUP BY topic, sub_topic, difficulty
+                ORDER BY topic, sub_topic, difficulty
+            ''', [int(user_id), since_day])
+            return [
+                {
+                    'topic': row['topic'],
+                    'sub_topic': row['sub_topic'],
+                    'difficulty': row['difficulty'],
+                    'correct_count': row['correct_count'],
+                    'question_count': row['question_count']
+                }
+                for row in cursor.fetchall()
+            ]
+        finally:
+            conn.close()
+    
+    def _cached_topic_rows(self, user_id: int, since_day: str) -> Optional[List[Dict]]:
+        """The same rows as ``_query_topic_rows``, summed from the cached daily buckets"""
+        cached = user_state_cache.get((self.db_path, int(user_id)), 'topic_rows',
+                                      lambda: self._load_topic_buckets(user_id))
+        if cached is None or since_day < cached['since_day']:
+            return None
+        
+        totals = {}
+        for (day, topic, sub_topic, difficulty), (correct, total) in cached['buckets'].items():
+            if day >= since_day:
+                counts = totals.setdefault((topic, sub_topic, difficulty), [0, 0])
+                counts[0] += correct
+                counts[1] += total
+        
+        return [
+            {
+                'topic': topic,
+                'sub_topic': sub_topic,
+                'difficulty': difficulty,
+                'correct_count': correct,
+                'question_count': total
+            }
+            for (topic, sub_topic, difficulty), (correct, total) in sorted(totals.items())
+        ]
+    
+    def _load_topic_buckets(self, user_id: int) -> Dict:
+        """The user's topic_stats buckets for the last ``CACHED_TOPIC_DAYS`` days"""
+        since_day = (datetime.utcnow() - timedelta(days=CACHED_TOPIC_DAYS)).strftime('%Y-%m-%d')
+        conn = self.storage.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT day, topic, sub_topic, difficulty, correct, total
+                FROM topic_stats
+                WHERE user_id = ? AND day >= ?
+            ''', [int(user_id), since_day])
+            buckets = {tuple(row[:4]): (row[4], row[5]) for row in cursor.fetchall()}
+        finally:
+            conn.close()
+        return {'since_day': since_day, 'buckets': buckets}
 
 class SmartRecommendationEngine:
     def __init__(self, question_logger: QuestionLogger):
         self.logger = question_logger
+        self.store = RecommendationStore(question_logger.db_path)
+        self.item_stats = ItemStats(question_logger.db_path)
+        self.calibration = IRTCalibration(question_logger.db_path)
+        self.bandit = question_logger.bandit
+    
+    def get_recommendations(self, user_id: int) -> Dict:
+        """Batch-computed recommendations while they are current, otherwise computed now"""
+        last_log_id = self.logger.latest_log_id(user_id)
+        if last_log_id is not None:
+            stored = self.store.get_current(user_id, last_log_id)
+            if stored is not None:
+                return stored
+        
+        return self.get_personalized_recommendations(user_id)
     
     def get_personalized_recommendations(self, user_id: int) -> Dict:
         """Generate personalized quiz recommendations based on user performance"""
-        analysis = self.logger.analyze_weak_topics(user_id, days=14)
-        weak_topics = analysis['weak_topics']
+        # Ranked by the traced probability that each skill is known; no question_log scan
+        weak_topics = self.rank_weak_topics(user_id)
         
         recommendations = {
             'has_recommendations': len(weak_topics) > 0,
@@ -197,33 +528,33 @@ class SmartRecommendationEngine:
         }
         
         if weak_topics:
-            # Find the weakest topic
-            weakest_topic = min(weak_topics.items(), key=lambda x: x[1]['accuracy'])
-            topic_name, topic_data = weakest_topic
+            # Sample topic, difficulty and question type among the weakest topics;
+            # the memoized and batch results keep one draw per log version
+            choice = None
+            if settings.RECOMMENDATION_POLICY == 'thompson':
+                choice = self.bandit.choose(user_id, [
+                    (*self._split_area(area), data['p_known'])
+                    for area, data in list(weak_topics.items())[:BANDIT_TOPICS]
+                ], self.item_stats.topic_difficulty())
             
-            # Extract main topic and sub-topic
-            if ' - ' in topic_name:
-                main_topic, sub_topic = topic_name.split(' - ', 1)
+            if choice:
+                main_topic, sub_topic = choice['topic'], choice['sub_topic']
+                topic_data = weak_topics[f"{main_topic} - {sub_topic}" if sub_topic else main_topic]
+                recommended_difficulty, question_type = choice['difficulty'], choice['question_type']
             else:
-                main_topic, sub_topic = topic_name, ""
-            
-            # Determine recommended difficulty
-            difficulty_breakdown = topic_data['difficulty_breakdown']
-            recommended_difficulty = "Easy"  # Start with easier questions for weak topics
-            
-            for diff in ['Easy', 'Medium', 'Hard']:
-                if diff in difficulty_breakdown:
-                    if difficulty_breakdown[diff]['correct'] / difficulty_breakdown[diff]['total'] < 0.5:
-                        recommended_difficulty = diff
-                        break
+                # Find the weakest topic
+                topic_name, topic_data = next(iter(weak_topics.items()))
+                main_topic, sub_topic = self._split_area(topic_name)
+                recommended_difficulty = self._rule_difficulty(user_id, main_topic, sub_topic, topic_data)
+                question_type = 'Multiple Choice'  # Default
             
             recommendations['suggested_quiz'] = {
                 'main_topic': main_topic,
                 'sub_topic': sub_topic,
                 'difficulty': recommended_difficulty,
-                'question_type': 'Multiple Choice',  # Default
+                'question_type': question_type,
                 'num_questions': min(5, max(3, topic_data['wrong_answers'])),
-                'reason': f"You have {topic_data['accuracy']:.0f}% accuracy in this topic"
+                'reason': f"Your recent accuracy on this topic is {topic_data['accuracy']:.0f}%"
             }
             
             recommendations['focus_areas'] = [
@@ -237,6 +568,67 @@ class SmartRecommendationEngine:
         
         return recommendations
     
+    @staticmethod
+    def _split_area(area: str) -> Tuple[str, str]:
+        """``"topic - sub_topic"`` -> (topic, sub_topic)"""
+        if ' - ' in area:
+            main_topic, sub_topic = area.split(' - ', 1)
+            return main_topic, sub_topic
+        return area, ""
+    
+    def _rule_difficulty(self, user_id: int, main_topic: str, sub_topic: str, topic_data: Dict) -> str:
+        """The first difficulty the user answers under half right, else where they are likely to succeed"""
+        difficulty_breakdown = topic_data['difficulty_breakdown']
+        # Start where the user's calibrated ability gives a good chance of
+        # success, or else at the label all users answer correctly most
+        # often here, which is not always "Easy"
+        easiest = (self.calibration.recommended_label(user_id, main_topic, sub_topic)
+                   or self.item_stats.easiest_label(main_topic, sub_topic))
+        recommended_difficulty = easiest if easiest in ('Easy', 'Medium', 'Hard') else "Easy"
+        
+        for diff in ['Easy', 'Medium', 'Hard']:
+            if diff in difficulty_breakdown:
+                if difficulty_breakdown[diff]['correct'] / difficulty_breakdown[diff]['total'] < 0.5:
+                    recommended_difficulty = diff
+                    break
+        return recommended_difficulty
+    
+    def rank_weak_topics(self, user_id: int) -> Dict[str, Dict]:
+        """Weak skills, least likely known first, shaped like ``analyze_weak_topics()['weak_topics']``.
+
+        A skill is weak while knowledge tracing has not marked it mastered,
+        or while its decayed accuracy is under the usual 70% cutoff, since
+        tracing can call a skill known after a lucky streak. ``accuracy`` is
+        the decayed share answered right, ``p_known`` the traced probability.
+        """
+        areas = self.logger.mastery.area_scores(user_id)
+        states = self.logger.knowledge.area_states(user_id)
+        
+        ranked = []
+        for area_key in set(areas) | set(states):
+            area = areas.get(area_key, {'correct': 0.0, 'total': 0.0, 'difficulty_breakdown': {}})
+            state = states.get(area_key, {'p_known': DEFAULT_PARAMS[0], 'answers': 0, 'mastered': False})
+            accuracy = area['correct'] / area['total'] * 100 if area['total'] > 0 else 0.0
+            low_accuracy = area['total'] >= MIN_EVIDENCE and accuracy < WEAK_MASTERY * 100
+            not_known = state['answers'] >= MIN_ANSWERS and not state['mastered']
+            if low_accuracy or not_known:
+                ranked.append((state['p_known'], accuracy, area_key, area))
+        ranked.sort(key=lambda item: item[:3])
+        
+        weak_topics = {}
+        for p_known, accuracy, area_key, area in ranked:
+            weak_topics[area_key] = {
+                'total_questions': area['total'],
+                'correct_answers': area['correct'],
+                'wrong_answers': int(round(area['total'] - area['correct'])),
+                'accuracy': accuracy,
+                'mastery': mastery_score(area['correct'], area['total']),
+                'p_known': p_known,
+                'difficulty_breakdown': area['difficulty_breakdown'],
+                'needs_practice': True
+            }
+        return weak_topics
+    
     def _generate_motivation_message(self, accuracy: float) -> str:
         """Generate motivational message based on accuracy"""
         if accuracy < 40:
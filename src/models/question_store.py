@@ -0,0 +1,237 @@
+import json
+import hashlib
+from typing import Dict, List, Optional
+from src.utils.blob_codec import encode_blob, decode_blob
+from src.storage.base import get_storage
+
+class QuestionStore:
+    """Content-addressed store for generated questions.
+
+    Every question is stored once in the ``questions`` table, keyed by a hash
+    of its content. Quiz sessions and question log rows reference questions by
+    id instead of carrying their own copies of the text, options and explanation.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.storage.init_once('questions', self.init_tables)
+
+    def init_tables(self):
+        """Initialize questions table"""
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question_hash TEXT UNIQUE NOT NULL,
+                question_type TEXT,
+                question_text TEXT NOT NULL,
+                options TEXT, -- JSON for MCQ options
+                correct_answer TEXT,
+                explanation TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def compute_hash(question_type: str, question_text: str, options: List,
+                     correct_answer: str, explanation: str) -> str:
+        """Hash the question content so identical questions share one row"""
+        canonical = json.dumps(
+            [question_type or '', question_text or '', list(options or []),
+             correct_answer or '', explanation or ''],
+            ensure_ascii=False, separators=(',', ':')
+        )
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def intern_question(self, cursor, question: Dict) -> int:
+        """Return the id of a question in quiz format, inserting it if it is new.
+
+        Runs on the caller's cursor so it takes part in the caller's transaction.
+        """
+        question_type = str(question.get('type', ''))
+        question_text = str(question.get('question', ''))
+        options = list(question.get('options') or [])
+        correct_answer = str(question.get('correct_answer', ''))
+        explanation = str(question.get('explanation', '') or '')
+
+        question_hash = self.compute_hash(question_type, question_text, options,
+                                          correct_answer, explanation)
+
+        question_id = self.storage.insert_returning_id(cursor, '''
+            INSERT INTO questions (
+                question_hash, question_type, question_text, options,
+                correct_answer, explanation
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (question_hash) DO NOTHING
+        ''', [
+            question_hash,
+            question_type,
+            question_text,
+            json.dumps(options) if options else None,
+            correct_answer,
+            explanation
+        ])
+
+        if question_id is not None:
+            return question_id
+
+        cursor.execute('SELECT id FROM questions WHERE question_hash = ?', [question_hash])
+        return cursor.fetchone()[0]
+
+    def get_questions(self, cursor, question_ids: List[int]) -> Dict[int, Dict]:
+        """Fetch questions by id, returned in the same format as quiz ``questions_data``"""
+        ids = sorted({int(qid) for qid in question_ids if qid is not None})
+        if not ids:
+            return {}
+
+        placeholders = ','.join('?' * len(ids))
+        cursor.execute(f'''
+            SELECT id, question_type, question_text, options, correct_answer, explanation
+            FROM questions WHERE id IN ({placeholders})
+        ''', ids)
+
+        questions = {}
+        for row in cursor.fetchall():
+            question = {
+                'type': row[1] or 'MCQ',
+                'question': row[2] or '',
+                'correct_answer': row[4] or '',
+                'explanation': row[5] or ''
+            }
+            if row[3]:
+                question['options'] = json.loads(row[3])
+            elif question['type'] == 'MCQ':
+                question['options'] = []
+            questions[row[0]] = question
+
+        return questions
+
+    def backfill_existing_rows(self, batch_size: int = 500) -> Dict[str, int]:
+        """One-off migration of sessions and question logs written before the question store.
+
+        Session rows get ``question_ids``/``answer_outcomes`` and drop their
+        ``questions_data``/``results_data`` blobs; question log rows get a
+        ``question_id`` and drop their copies of the question text. Run
+        ``VACUUM`` afterwards to hand the freed pages back to the filesystem.
+        """
+        # Make sure the columns the backfill writes to exist
+        from src.models.simple_session import SimpleSessionManager
+        from src.models.question_log import QuestionLogger
+        SimpleSessionManager(self.db_path)
+        QuestionLogger(self.db_path)
+
+        migrated = {'sessions': 0, 'question_logs': 0}
+
+        conn = self.storage.connect(named_rows=True)
+        cursor = conn.cursor()
+
+        last_id = 0
+        while True:
+            cursor.execute('''
+                SELECT id, questions_data, user_answers, results_data
+                FROM quiz_sessions
+                WHERE id > ? AND question_ids IS NULL AND questions_data IS NOT NULL
+                ORDER BY id
+                LIMIT ?
+            ''', [last_id, batch_size])
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            for row in rows:
+                last_id = row['id']
+                try:
+                    questions = decode_blob(row['questions_data']) or []
+                    user_answers = decode_blob(row['user_answers']) or []
+                    results = decode_blob(row['results_data']) or []
+                except ValueError:
+                    continue
+                if not questions:
+                    continue
+
+                question_ids = [self.intern_question(cursor, q) for q in questions]
+                outcomes = []
+                for i, q in enumerate(questions):
+                    if i < len(results):
+                        outcomes.append({
+                            'is_correct': bool(results[i].get('is_correct', False)),
+                            'time_taken': int(results[i].get('time_taken', 0) or 0)
+                        })
+                    else:
+                        user_ans = user_answers[i] if i < len(user_answers) else ''
+                        outcomes.append({
+                            'is_correct': answer_is_correct(q, user_ans),
+                            'time_taken': 0
+                        })
+
+                cursor.execute('''
+                    UPDATE quiz_sessions
+                    SET question_ids = ?, answer_outcomes = ?,
+                        questions_data = NULL, results_data = NULL
+                    WHERE id = ?
+                ''', [encode_blob(question_ids), encode_blob(outcomes), row['id']])
+                migrated['sessions'] += 1
+
+            conn.commit()
+
+        last_id = 0
+        while True:
+            cursor.execute('''
+                SELECT id, question_type, question_text, options, correct_answer, explanation
+                FROM question_log
+                WHERE id > ? AND question_id IS NULL AND question_text IS NOT NULL
+                ORDER BY id
+                LIMIT ?
+            ''', [last_id, batch_size])
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            for row in rows:
+                last_id = row['id']
+                try:
+                    options = json.loads(row['options']) if row['options'] else []
+                except json.JSONDecodeError:
+                    options = []
+
+                question_id = self.intern_question(cursor, {
+                    'type': row['question_type'],
+                    'question': row['question_text'],
+                    'options': options,
+                    'correct_answer': row['correct_answer'],
+                    'explanation': row['explanation']
+                })
+
+                cursor.execute('''
+                    UPDATE question_log
+                    SET question_id = ?, question_text = NULL, options = NULL, explanation = NULL
+                    WHERE id = ?
+                ''', [question_id, row['id']])
+                migrated['question_logs'] += 1
+
+            conn.commit()
+
+        conn.close()
+        return migrated
+
+def answer_is_correct(question: Dict, user_answer) -> bool:
+    """Grade an answer the same way the quiz does"""
+    if question.get('type') == 'MCQ':
+        return user_answer == question.get('correct_answer')
+    return str(user_answer or '').strip().lower() == str(question.get('correct_answer', '')).strip().lower()
+
+if __name__ == "__main__":
+    import sys
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else None
+    counts = QuestionStore(db_path).backfill_existing_rows()
+    print(f"Migrated {counts['sessions']} sessions and {counts['question_logs']} logged questions")
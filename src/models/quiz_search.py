@@ -0,0 +1,194 @@
+import sqlite3
+import re
+from typing import Dict, List, Optional
+from src.utils.blob_codec import decode_blob
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter
+
+# Dates and times as session timestamps write them, whole or in part: 2026-10-19, 10-19, 14:30
+DATE_TERM = re.compile(r'^\d{1,4}(?:[-:]\d{1,2})+$')
+
+def is_date_term(search_term: str) -> bool:
+    """Whether a search is for a quiz date rather than words in the quiz"""
+    return bool(DATE_TERM.match(search_term.strip()))
+
+class QuizSearchIndex:
+    """SQLite FTS5 index over quiz history.
+
+    One document per quiz session (rowid = session id) with the session title,
+    the text and explanations of its questions, and the questions the user got
+    wrong. Every document carries a ``u<user_id>`` token so a MATCH is scoped
+    to one user inside the index itself.
+    """
+
+    # bm25 weights for title, questions, explanations, missed, user_key
+    RANK_WEIGHTS = (8.0, 2.0, 1.0, 2.0, 0.0)
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.available = self.storage.supports_full_text_search
+        self.shards = ShardRouter.for_manager(self.db_path, QuizSearchIndex)
+        self.storage.init_once('quiz_search', self.init_tables)
+
+    def init_tables(self):
+        """Initialize the full-text index, building it once for existing sessions"""
+        if not self.available:
+            return  # callers fall back to LIKE filtering
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS quiz_search USING fts5(
+                    title, questions, explanations, missed, user_key,
+                    tokenize = 'unicode61 remove_diacritics 2',
+                    prefix = '2 3'
+                )
+            ''')
+            conn.commit()
+        except sqlite3.OperationalError as e:
+            # SQLite built without FTS5; callers fall back to LIKE filtering
+            print(f"Full-text search unavailable: {e}")
+            self.available = False
+            self.storage.supports_full_text_search = False  # for indexes built after this one
+            conn.close()
+            return
+
+        cursor.execute("SELECT 1 FROM quiz_search LIMIT 1")
+        index_empty = cursor.fetchone() is None
+        try:
+            cursor.execute("SELECT 1 FROM quiz_sessions LIMIT 1")
+            has_sessions = cursor.fetchone() is not None
+        except sqlite3.OperationalError:
+            has_sessions = False
+        conn.close()
+
+        if index_empty and has_sessions:
+            self.rebuild()
+
+    @staticmethod
+    def user_key(user_id: int) -> str:
+        return f"u{int(user_id)}"
+
+    def index_session(self, cursor, session_id: int, user_id: int, title: str,
+                      questions: List[Dict], results: List[Dict]):
+        """Add or replace one session's document on the caller's cursor/transaction"""
+        if not self.available:
+            return
+
+        missed = [
+            result.get('question', '')
+            for result in results
+            if not result.get('is_correct', False)
+        ]
+
+        cursor.execute('DELETE FROM quiz_search WHERE rowid = ?', [int(session_id)])
+        cursor.execute('''
+            INSERT INTO quiz_search (rowid, title, questions, explanations, missed, user_key)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            int(session_id),
+            title,
+            '\n'.join(q.get('question', '') for q in questions),
+            '\n'.join(q.get('explanation', '') or '' for q in questions),
+            '\n'.join(missed),
+            self.user_key(user_id)
+        ])
+
+    def match_expression(self, user_id: int, search_term: str, only_missed: bool = False) -> Optional[str]:
+        """Build an FTS5 MATCH string: every word as a prefix, scoped to the user"""
+        words = re.findall(r'\w+', search_term.lower())
+        if not words:
+            return None
+
+        terms = ' AND '.join(f'"{word}"*' for word in words)
+        columns = 'missed' if only_missed else '{title questions explanations missed}'
+        return f'user_key : "{self.user_key(user_id)}" AND {columns} : ({terms})'
+
+    def rebuild(self, batch_size: int = 500) -> int:
+        """Rebuild the whole index from quiz_sessions, questions and question_log"""
+        from src.models.question_store import QuestionStore
+
+        if not self.available:
+            return 0
+
+        shard_indexed = 0
+        if self.shards:
+            shard_indexed = sum(self.shards.fan_out(lambda shard: shard.rebuild(batch_size)))
+
+        question_store = QuestionStore(self.db_path)
+        conn = self.storage.connect(named_rows=True)
+        cursor = conn.cursor()
+
+        cursor.execute("DELETE FROM quiz_search")
+        indexed = 0
+        last_id = 0
+
+        while True:
+            cursor.execute('SELECT * FROM quiz_sessions WHERE id > ? ORDER BY id LIMIT ?', [last_id, batch_size])
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            for row in rows:
+                last_id = row['id']
+                questions, results = self._session_questions(cursor, question_store, row)
+
+                title = row['topic'] or "Quiz"
+                if row['sub_topic']:
+                    title = f"{title} - {row['sub_topic']}"
+
+                self.index_session(cursor, row['id'], row['user_id'], title, questions, results)
+                indexed += 1
+
+            conn.commit()
+
+        # Merge the b-tree segments written by the batches
+        cursor.execute("INSERT INTO quiz_search (quiz_search) VALUES ('optimize')")
+        conn.commit()
+        conn.close()
+        return indexed + shard_indexed
+
+    def _session_questions(self, cursor, question_store, row):
+        """Question texts and results for a stored session in any storage format"""
+        keys = row.keys()
+        try:
+            if 'question_ids' in keys and row['question_ids']:
+                question_ids = decode_blob(row['question_ids'])
+                outcomes = decode_blob(row['answer_outcomes']) if row['answer_outcomes'] else []
+                by_id = question_store.get_questions(cursor, question_ids)
+                questions = [by_id[qid] for qid in question_ids if qid in by_id]
+                results = [
+                    {'question': by_id[qid]['question'],
+                     'is_correct': outcomes[i].get('is_correct', False) if i < len(outcomes) else False}
+                    for i, qid in enumerate(question_ids) if qid in by_id
+                ]
+                return questions, results
+
+            if 'questions_data' in keys and row['questions_data']:
+                questions = decode_blob(row['questions_data']) or []
+                results = decode_blob(row['results_data']) if row['results_data'] else []
+                return questions, results or []
+        except (ValueError, KeyError):
+            pass
+
+        # Oldest sessions only have their questions in the question log
+        try:
+            cursor.execute('''
+                SELECT COALESCE(q.question_text, ql.question_text) AS question,
+                       COALESCE(q.explanation, ql.explanation) AS explanation,
+                       ql.is_correct
+                FROM question_log ql
+                LEFT JOIN questions q ON q.id = ql.question_id
+                WHERE ql.session_id = ?
+                ORDER BY ql.id
+            ''', [row['id']])
+            logged = cursor.fetchall()
+        except sqlite3.OperationalError:
+            return [], []  # No question log table yet
+
+        questions = [{'question': r['question'] or '', 'explanation': r['explanation'] or ''} for r in logged]
+        results = [{'question': r['question'] or '', 'is_correct': bool(r['is_correct'])} for r in logged]
+        return questions, results
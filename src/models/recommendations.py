@@ -0,0 +1,137 @@
+"""Precomputed quiz recommendations for every recently active user.
+
+``generate_recommendations`` runs ``SmartRecommendationEngine`` for the
+users who answered questions in the last few days, split across a process
+pool, and stores each result with the user's latest question_log id at the
+time. ``RecommendationStore.get_current`` hands a stored result back only
+while that id is still the user's latest, so users who have answered more
+since the batch ran get on-demand recommendations instead.
+"""
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter
+from src.config.settings import settings
+
+class RecommendationStore:
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.shards = ShardRouter.for_manager(self.db_path, RecommendationStore)
+        self.storage.init_once('recommendations', self.init_tables)
+
+    def init_tables(self):
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS recommendations (
+                user_id INTEGER PRIMARY KEY,
+                payload TEXT NOT NULL, -- JSON from get_personalized_recommendations
+                last_log_id INTEGER NOT NULL, -- the user's latest question_log id when computed
+                generated_at REAL NOT NULL -- Unix seconds
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def save(self, results: List[Tuple[int, int, Dict]]):
+        """Store ``(user_id, last_log_id, recommendations)`` results in one transaction"""
+        now = time.time()
+        conn = self.storage.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany('''
+                INSERT INTO recommendations (user_id, payload, last_log_id, generated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    payload = excluded.payload,
+                    last_log_id = excluded.last_log_id,
+                    generated_at = excluded.generated_at
+            ''', [[int(user_id), json.dumps(payload), int(last_log_id), now]
+                  for user_id, last_log_id, payload in results])
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_current(self, user_id: int, last_log_id: int) -> Optional[Dict]:
+        """The stored recommendations if computed at ``last_log_id`` and recently enough, else None"""
+        if self.shards:
+            return self.shards.for_user(user_id).get_current(user_id, last_log_id)
+
+        try:
+            conn = self.storage.connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT payload FROM recommendations
+                WHERE user_id = ? AND last_log_id = ? AND generated_at >= ?
+            ''', [int(user_id), int(last_log_id), time.time() - settings.RECOMMENDATIONS_MAX_AGE_HOURS * 3600])
+            row = cursor.fetchone()
+            conn.close()
+        except Exception as e:
+            print(f"Stored recommendations error: {e}")
+            return None
+        return json.loads(row[0]) if row else None
+
+def active_users(storage, days: int) -> List[int]:
+    """Users with answers logged in the last ``days`` days, from the topic_stats rollups"""
+    since_day = (datetime.utcnow() - timedelta(days=int(days))).strftime('%Y-%m-%d')
+    conn = storage.connect()
+    try:
+        cursor = conn.cursor()
+        if not storage.table_exists(cursor, 'topic_stats'):
+            return []
+        cursor.execute('SELECT DISTINCT user_id FROM topic_stats WHERE day >= ? ORDER BY user_id', [since_day])
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+def _compute_chunk(location: str, user_ids: List[int]) -> List[Tuple[int, int, Dict]]:
+    """Worker process: recommendations for some users of one database"""
+    from src.models.question_log import QuestionLogger, SmartRecommendationEngine
+
+    logger = QuestionLogger(location)
+    engine = SmartRecommendationEngine(logger)
+    results = []
+    for user_id in user_ids:
+        # Read the version first: answers logged while computing leave the row stale, not wrong
+        last_log_id = logger.latest_log_id(user_id)
+        if last_log_id is None:
+            continue
+        try:
+            results.append((user_id, last_log_id, engine.get_personalized_recommendations(user_id)))
+        except Exception as e:
+            print(f"Recommendation batch error for user {user_id}: {e}")
+    return results
+
+def generate_recommendations(location: Optional[str] = None, workers: Optional[int] = None,
+                             days: int = 30, chunk_size: int = 200) -> Dict:
+    """Recompute stored recommendations for one database's recently active users.
+
+    Chunks of users are computed in a process pool and written back by this
+    process as they finish, one short transaction per chunk.
+    """
+    storage = get_storage(location)
+    store = RecommendationStore(storage.location)
+    user_ids = active_users(storage, days)
+    chunks = [user_ids[start:start + chunk_size] for start in range(0, len(user_ids), chunk_size)]
+
+    started = time.perf_counter()
+    stored = 0
+    if chunks:
+        workers = max(1, min(int(workers or multiprocessing.cpu_count()), len(chunks)))
+        # Spawned workers open their own connections and start with empty caches
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            for results in pool.map(_compute_chunk, [storage.location] * len(chunks), chunks):
+                store.save(results)
+                stored += len(results)
+
+    return {'active_users': len(user_ids), 'stored': stored, 'workers': workers if chunks else 0,
+            'seconds': round(time.perf_counter() - started, 3)}
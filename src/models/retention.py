@@ -0,0 +1,136 @@
+import sqlite3
+import json
+import time
+from typing import Dict, Optional
+from src.utils.blob_codec import encode_blob, decode_blob
+
+class QuestionLogRetention:
+    """Moves old raw question_log rows into a separate archive database.
+
+    Long-term analytics read the daily rollups in ``topic_stats``, which are
+    maintained as questions are logged and are left untouched here, so the
+    hot table only has to hold the last ``max_age_days`` of raw answers.
+    Archived rows keep every column; with ``compress`` each row is stored as
+    a compressed blob (see src/utils/blob_codec.py). Rows the cross-user item
+    rollups (``ItemStats.refresh``) have not folded in yet stay until they have.
+    """
+
+    def __init__(self, db_path: str = "studyai.db", archive_path: Optional[str] = None,
+                 max_age_days: Optional[int] = None, compress: Optional[bool] = None):
+        from src.config.settings import settings
+
+        self.db_path = db_path
+        self.archive_path = archive_path or settings.QUESTION_LOG_ARCHIVE_PATH
+        self.max_age_days = int(max_age_days if max_age_days is not None else settings.QUESTION_LOG_RETENTION_DAYS)
+        self.compress = settings.QUESTION_LOG_ARCHIVE_COMPRESS if compress is None else compress
+        self.init_tables()
+
+    def init_tables(self):
+        """Initialize the archive table in the archive database"""
+        conn = sqlite3.connect(self.archive_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS question_log_archive (
+                id INTEGER PRIMARY KEY, -- question_log.id
+                user_id INTEGER,
+                session_id INTEGER,
+                day TEXT, -- YYYY-MM-DD of created_at
+                payload BLOB, -- the full question_log row
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_question_log_archive_user_day
+            ON question_log_archive (user_id, day)
+        ''')
+
+        conn.commit()
+        conn.close()
+
+    def archive_old_rows(self, batch_size: int = 1000, pause: float = 0.05) -> Dict:
+        """Archive raw rows older than the retention window, one short transaction per batch"""
+        from src.models.item_stats import WATERMARK
+
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        cursor.execute("ATTACH DATABASE ? AS archive", [self.archive_path])
+
+        # Whole days only, so a day is never split between hot and archive
+        cursor.execute("SELECT date('now', ?)", [f'-{self.max_age_days} days'])
+        cutoff_day = cursor.fetchone()[0]
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollup_watermarks'")
+        if cursor.fetchone():
+            cursor.execute('SELECT last_id FROM rollup_watermarks WHERE name = ?', [WATERMARK])
+            row = cursor.fetchone()
+            rolled_up_to = row[0] if row else 0
+        else:
+            rolled_up_to = 0
+
+        codec = 'zlib-json' if self.compress else 'json'
+        archived = 0
+
+        try:
+            while True:
+                cursor.execute('''
+                    SELECT * FROM question_log
+                    WHERE created_at < ? AND id <= ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', [cutoff_day, rolled_up_to, int(batch_size)])
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+
+                cursor.executemany('''
+                    INSERT OR REPLACE INTO archive.question_log_archive (id, user_id, session_id, day, payload)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [
+                    [row['id'], row['user_id'], row['session_id'], (row['created_at'] or '')[:10],
+                     encode_blob(dict(row), codec)]
+                    for row in rows
+                ])
+                cursor.executemany('DELETE FROM question_log WHERE id = ?', [[row['id']] for row in rows])
+                conn.commit()
+
+                archived += len(rows)
+                time.sleep(pause)  # let live writers in between batches
+        finally:
+            conn.close()
+
+        return {'archived_rows': archived, 'cutoff_day': cutoff_day, 'rolled_up_to_id': rolled_up_to,
+                'archive_path': self.archive_path}
+
+    def iter_archived_rows(self, user_id: int, since_day: Optional[str] = None):
+        """Yield archived question_log rows of one user as dicts, oldest first"""
+        conn = sqlite3.connect(self.archive_path)
+        cursor = conn.cursor()
+
+        if since_day:
+            cursor.execute('''
+                SELECT payload FROM question_log_archive
+                WHERE user_id = ? AND day >= ? ORDER BY day, id
+            ''', [int(user_id), since_day])
+        else:
+            cursor.execute('''
+                SELECT payload FROM question_log_archive
+                WHERE user_id = ? ORDER BY day, id
+            ''', [int(user_id)])
+
+        try:
+            while True:
+                batch = cursor.fetchmany(500)
+                if not batch:
+                    break
+                for (payload,) in batch:
+                    yield decode_blob(payload)
+        finally:
+            conn.close()
+
+if __name__ == "__main__":
+    import sys
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "studyai.db"
+    print(json.dumps(QuestionLogRetention(db_path).archive_old_rows()))
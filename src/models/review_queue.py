@@ -0,0 +1,222 @@
+import json
+import time
+from typing import Dict, List, Optional
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter
+from src.models.user_stats import user_state_cache
+
+DAY_SECONDS = 86400
+
+# SM-2 answer grades: a correct answer is "correct with some hesitation", a wrong one a lapse
+GRADE_CORRECT = 4
+GRADE_WRONG = 1
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+
+# Review quizzes mix topics, so their sessions are filed under these labels
+REVIEW_TOPIC = 'Review'
+REVIEW_DIFFICULTY = 'Mixed'
+
+def schedule(repetitions: int, ease: float, interval_days: float, correct: bool):
+    """SM-2: the next (repetitions, ease, interval_days) after one review"""
+    grade = GRADE_CORRECT if correct else GRADE_WRONG
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    if grade < 3:
+        return 0, ease, 1.0
+    repetitions += 1
+    if repetitions == 1:
+        interval_days = 1.0
+    elif repetitions == 2:
+        interval_days = 6.0
+    else:
+        interval_days = round(interval_days * ease)
+    return repetitions, ease, interval_days
+
+class ReviewQueue:
+    """Spaced-repetition schedule over questions the user has answered.
+
+    A question joins the user's queue the first time it is answered wrong and
+    is then rescheduled with SM-2 every time it is answered again, in a review
+    quiz or anywhere else. ``next_due`` is indexed per user, so building a
+    review quiz is one range read joined to the stored questions, and no new
+    questions have to be generated.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.shards = ShardRouter.for_manager(self.db_path, ReviewQueue)
+        self.storage.init_once('review_items', self.init_tables)
+
+    def init_tables(self):
+        """Create review_items, queueing questions already missed in question_log the first time"""
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+
+        if not self.storage.table_exists(cursor, 'question_log'):
+            conn.close()
+            return False  # QuestionLogger creates question_log; try again next time
+
+        is_new = not self.storage.table_exists(cursor, 'review_items')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS review_items (
+                user_id INTEGER NOT NULL,
+                question_id INTEGER NOT NULL REFERENCES questions (id),
+                topic TEXT NOT NULL,
+                sub_topic TEXT NOT NULL DEFAULT '',
+                difficulty TEXT NOT NULL DEFAULT '',
+                repetitions INTEGER NOT NULL DEFAULT 0,
+                ease REAL NOT NULL DEFAULT 2.5,
+                interval_days REAL NOT NULL DEFAULT 1,
+                lapses INTEGER NOT NULL DEFAULT 0,
+                next_due REAL NOT NULL, -- Unix seconds
+                last_reviewed REAL, -- Unix seconds
+                PRIMARY KEY (user_id, question_id)
+            ) WITHOUT ROWID
+        ''')
+
+        # Serves "what is due for this user" as a range scan
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_review_items_due
+            ON review_items (user_id, next_due)
+        ''')
+
+        if is_new:
+            # Every question missed on its latest attempt is due a day after that attempt
+            cursor.execute('''
+                INSERT OR IGNORE INTO review_items (
+                    user_id, question_id, topic, sub_topic, difficulty, lapses, next_due, last_reviewed
+                )
+                SELECT user_id, question_id, topic, COALESCE(sub_topic, ''), COALESCE(difficulty, ''), 1,
+                       CAST(strftime('%s', created_at) AS REAL) + ?, CAST(strftime('%s', created_at) AS REAL)
+                FROM (
+                    SELECT user_id, question_id, topic, sub_topic, difficulty, is_correct, created_at,
+                           ROW_NUMBER() OVER (PARTITION BY user_id, question_id ORDER BY created_at DESC, id DESC) AS latest
+                    FROM question_log
+                    WHERE question_id IS NOT NULL AND user_id IS NOT NULL
+                )
+                WHERE latest = 1 AND NOT is_correct
+            ''', [DAY_SECONDS])
+
+        conn.commit()
+        conn.close()
+
+    def record_answers(self, cursor, user_id: int, answers: List[Dict]):
+        """Reschedule answered questions on the caller's transaction.
+
+        ``answers`` are dicts with question_id, is_correct, topic, sub_topic
+        and difficulty. Wrong answers to questions not yet queued add them;
+        correct ones are only tracked for questions already in the queue.
+        """
+        latest = {}
+        for answer in answers:
+            if answer.get('question_id') is not None:
+                latest[int(answer['question_id'])] = answer  # a repeated question counts once
+        if not latest:
+            return
+
+        placeholders = ','.join('?' * len(latest))
+        cursor.execute(f'''
+            SELECT question_id, repetitions, ease, interval_days, lapses
+            FROM review_items
+            WHERE user_id = ? AND question_id IN ({placeholders}){self.storage.for_update}
+        ''', [int(user_id), *latest])
+        states = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+
+        now = time.time()
+        rows = []
+        for question_id, answer in latest.items():
+            correct = bool(answer.get('is_correct', False))
+            if question_id not in states and correct:
+                continue
+            repetitions, ease, interval_days, lapses = states.get(question_id, (0, INITIAL_EASE, 1.0, 0))
+            repetitions, ease, interval_days = schedule(repetitions, ease, interval_days, correct)
+            rows.append([int(user_id), question_id, answer.get('topic', '') or '', answer.get('sub_topic', '') or '',
+                         answer.get('difficulty', '') or '', repetitions, ease, interval_days,
+                         lapses + (0 if correct else 1), now + interval_days * DAY_SECONDS, now])
+
+        cursor.executemany('''
+            INSERT INTO review_items (
+                user_id, question_id, topic, sub_topic, difficulty,
+                repetitions, ease, interval_days, lapses, next_due, last_reviewed
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, question_id) DO UPDATE SET
+                repetitions = excluded.repetitions,
+                ease = excluded.ease,
+                interval_days = excluded.interval_days,
+                lapses = excluded.lapses,
+                next_due = excluded.next_due,
+                last_reviewed = excluded.last_reviewed
+        ''', rows)
+
+    def forget_cached(self, user_id: int):
+        """Drop the cached schedule after a committed ``record_answers``; the next read reloads it"""
+        user_state_cache.discard((self.db_path, int(user_id)), 'review_schedule')
+
+    def _load_schedule(self, user_id: int) -> Optional[Dict[int, float]]:
+        try:
+            conn = self.storage.connect()
+            cursor = conn.cursor()
+            cursor.execute('SELECT question_id, next_due FROM review_items WHERE user_id = ?', [int(user_id)])
+            schedule_ = {row[0]: row[1] for row in cursor.fetchall()}
+            conn.close()
+            return schedule_
+        except Exception as e:
+            print(f"Review schedule load error: {e}")
+            return None
+
+    def due_count(self, user_id: int) -> int:
+        """Questions due for review now, from the cached schedule"""
+        if self.shards:
+            return self.shards.for_user(user_id).due_count(user_id)
+
+        schedule_ = user_state_cache.get((self.db_path, int(user_id)), 'review_schedule',
+                                         lambda: self._load_schedule(user_id)) or {}
+        now = time.time()
+        return sum(1 for next_due in schedule_.values() if next_due <= now)
+
+    def due_questions(self, user_id: int, limit: int = 10) -> List[Dict]:
+        """The most overdue questions in quiz format, plus their question_id, topic, sub_topic and difficulty"""
+        if self.shards:
+            return self.shards.for_user(user_id).due_questions(user_id, limit)
+
+        try:
+            conn = self.storage.connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT r.question_id, r.topic, r.sub_topic, r.difficulty,
+                       q.question_type, q.question_text, q.options, q.correct_answer, q.explanation
+                FROM review_items r
+                JOIN questions q ON q.id = r.question_id
+                WHERE r.user_id = ? AND r.next_due <= ?
+                ORDER BY r.next_due
+                LIMIT ?
+            ''', [int(user_id), time.time(), int(limit)])
+            rows = cursor.fetchall()
+            conn.close()
+        except Exception as e:
+            print(f"Review queue error: {e}")
+            return []
+
+        questions = []
+        for row in rows:
+            question = {
+                'type': row[4] or 'MCQ',
+                'question': row[5] or '',
+                'correct_answer': row[7] or '',
+                'explanation': row[8] or '',
+                'question_id': row[0],
+                'topic': row[1],
+                'sub_topic': row[2],
+                'difficulty': row[3]
+            }
+            if row[6]:
+                question['options'] = json.loads(row[6])
+            elif question['type'] == 'MCQ':
+                question['options'] = []
+            questions.append(question)
+        return questions
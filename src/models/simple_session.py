@@ -1,15 +1,58 @@
 import sqlite3
-import json
-from typing import Dict, List, Optional
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from src.models.question_store import QuestionStore
+from src.models.quiz_search import QuizSearchIndex, is_date_term
+from src.models.user_stats import UserStats
+from src.models.dashboard import DashboardAnalytics
+from src.utils.blob_codec import encode_blob, decode_blob, is_encoded
+from src.utils.cache import ReadThroughCache
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter, reserve_id_range
+from src.config.settings import settings
+
+BLOB_COLUMNS = ['questions_data', 'user_answers', 'results_data', 'question_ids', 'answer_outcomes']
+
+# Stands in for a question id with no row in the questions table
+MISSING_QUESTION = {
+    'type': '',
+    'question': 'This question is no longer available',
+    'correct_answer': '',
+    'explanation': '',
+    'options': []
+}
+
+_reencoding_threads = {}
+
+# Shared by every SimpleSessionManager in the process, tagged by (db_path, user_id)
+session_list_cache = ReadThroughCache(
+    'session_lists', settings.SESSION_LIST_CACHE_ENTRIES, settings.SESSION_CACHE_TTL_SECONDS
+)
+session_detail_cache = ReadThroughCache(
+    'session_details', settings.SESSION_DETAIL_CACHE_ENTRIES, settings.SESSION_CACHE_TTL_SECONDS
+)
 
 class SimpleSessionManager:
-    def __init__(self, db_path: str = "studyai.db"):
-        self.db_path = db_path
-        self.init_tables()
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.question_store = QuestionStore(self.db_path)
+        self.storage.init_once('quiz_sessions', self.init_tables)
+        self.search_index = QuizSearchIndex(self.db_path)
+        self.user_stats = UserStats(self.db_path)
+        self.dashboard = DashboardAnalytics(self.db_path)
+        self._question_logger = None
+        self._reencoded_up_to = 0  # sessions at or below this id were already looked at
+        # With DATABASE_SHARDS > 1, per-user calls go to the user's shard
+        self.shards = ShardRouter.for_manager(self.db_path, SimpleSessionManager)
     
     def init_tables(self):
         """Initialize and update quiz sessions table"""
-        conn = sqlite3.connect(self.db_path)
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+        
+        conn = self.storage.connect()
         cursor = conn.cursor()
         
         # Create base table if it doesn't exist
@@ -32,6 +75,18 @@ class SimpleSessionManager:
         self._add_column_safe(cursor, 'quiz_sessions', 'user_answers', 'TEXT')
         self._add_column_safe(cursor, 'quiz_sessions', 'results_data', 'TEXT')
         
+        # Normalised format: questions live in the questions table
+        self._add_column_safe(cursor, 'quiz_sessions', 'question_ids', 'TEXT')
+        self._add_column_safe(cursor, 'quiz_sessions', 'answer_outcomes', 'TEXT')
+        
+        # Serves history pages newest first with (created_at, id) cursors
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_quiz_sessions_user_created
+            ON quiz_sessions (user_id, created_at, id)
+        ''')
+        
+        reserve_id_range(cursor, self.db_path, 'quiz_sessions')
+        
         conn.commit()
         conn.close()
     
@@ -42,18 +97,39 @@ class SimpleSessionManager:
         except sqlite3.OperationalError:
             pass  # Column already exists
     
-    def save_quiz_session(self, user_id: int, quiz_data: Dict) -> int:
-        """Save complete quiz session with all data for revision"""
+    def save_quiz_session(self, user_id: int, quiz_data: Dict,
+                          question_logs: Optional[List[Dict]] = None) -> int:
+        """Save complete quiz session with all data for revision.
+        
+        The session row, search index entry, user counters and the per-question
+        ``question_logs`` (if given) are written in one transaction.
+        """
+        if self.shards:
+            return self.shards.for_user(user_id).save_quiz_session(user_id, quiz_data, question_logs)
+        
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Use Row factory for safer access
+            # Set up the logger's tables before the transaction takes the write lock
+            question_logger = self._get_question_logger() if question_logs else None
+            
+            conn = self.storage.connect(named_rows=True)  # rows readable by column name
             cursor = conn.cursor()
             
-            # Always save with new format
-            cursor.execute('''
+            # Questions are stored once in the questions table and referenced by id
+            questions = quiz_data.get('questions_data', [])
+            results = quiz_data.get('results_data', [])
+            question_ids = [self.question_store.intern_question(cursor, q) for q in questions]
+            answer_outcomes = [
+                {
+                    'is_correct': bool(result.get('is_correct', False)),
+                    'time_taken': int(result.get('time_taken', 0) or 0)
+                }
+                for result in results
+            ]
+            
+            session_id = self.storage.insert_returning_id(cursor, '''
                 INSERT INTO quiz_sessions (
                     user_id, topic, sub_topic, question_type, difficulty, 
-                    num_questions, score, questions_data, user_answers, results_data
+                    num_questions, score, question_ids, user_answers, answer_outcomes
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', [
                 int(user_id),
@@ -63,14 +139,31 @@ class SimpleSessionManager:
                 str(quiz_data.get('difficulty', '')),
                 int(quiz_data.get('num_questions', 0)),
                 float(quiz_data.get('score', 0.0)),
-                json.dumps(quiz_data.get('questions_data', [])),
-                json.dumps(quiz_data.get('user_answers', [])),
-                json.dumps(quiz_data.get('results_data', []))
+                encode_blob(question_ids),
+                encode_blob(quiz_data.get('user_answers', [])),
+                encode_blob(answer_outcomes)
             ])
             
-            session_id = cursor.lastrowid
+            # Keep the full-text index in step within the same transaction
+            title = str(quiz_data.get('topic', '')) or "Quiz"
+            if quiz_data.get('sub_topic'):
+                title = f"{title} - {quiz_data['sub_topic']}"
+            self.search_index.index_session(cursor, session_id, user_id, title, questions, results)
+            
+            self.user_stats.record_quiz(cursor, user_id, float(quiz_data.get('score', 0.0)))
+            
+            if question_logger:
+                question_logger.insert_logs(cursor, user_id, session_id, question_logs)
+            
             conn.commit()
             conn.close()
+            
+            # Bring this process's caches up to date with the committed write
+            invalidate_user_sessions(self.db_path, user_id)
+            self.user_stats.cache_quiz(user_id, float(quiz_data.get('score', 0.0)))
+            self.dashboard.cache_session(user_id, quiz_data)
+            if question_logger:
+                question_logger.cache_logs(user_id, question_logs)
             return session_id
             
         except Exception as e:
@@ -78,10 +171,20 @@ class SimpleSessionManager:
             return None
     
     def get_user_sessions(self, user_id: int, limit: int = 10) -> List[Dict]:
+        """Get user's quiz sessions for sidebar display, cached until the user saves a quiz"""
+        if self.shards:
+            return self.shards.for_user(user_id).get_user_sessions(user_id, limit)
+        
+        return session_list_cache.get_or_load(
+            (self.db_path, 'sessions', int(user_id), int(limit)),
+            lambda: self._query_user_sessions(user_id, limit),
+            user_key=(self.db_path, int(user_id))
+        )
+    
+    def _query_user_sessions(self, user_id: int, limit: int) -> List[Dict]:
         """Get user's quiz sessions for sidebar display with safe column access"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Use Row factory for safer access
+            conn = self.storage.connect(named_rows=True)  # rows readable by column name
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -89,7 +192,7 @@ class SimpleSessionManager:
                        num_questions, score, created_at
                 FROM quiz_sessions 
                 WHERE user_id = ?
-                ORDER BY created_at DESC
+                ORDER BY created_at DESC, id DESC
                 LIMIT ?
             ''', [int(user_id), int(limit)])
             
@@ -98,34 +201,7 @@ class SimpleSessionManager:
             
             for row in rows:
                 try:
-                    # Safe access using row names
-                    topic = row['topic'] if row['topic'] else "Quiz"
-                    sub_topic = row['sub_topic'] if row['sub_topic'] else ""
-                    
-                    # Create display title
-                    display_title = topic
-                    if sub_topic:
-                        display_title = f"{topic} - {sub_topic}"
-                    
-                    # Safe date formatting
-                    created_at = row['created_at'] if row['created_at'] else ""
-                    short_date = created_at[:10] if len(created_at) >= 10 else ""
-                    
-                    session_data = {
-                        'id': row['id'],
-                        'display_title': display_title,
-                        'topic': topic,
-                        'sub_topic': sub_topic,
-                        'question_type': row['question_type'] if row['question_type'] else "Multiple Choice",
-                        'difficulty': row['difficulty'] if row['difficulty'] else "Medium",
-                        'num_questions': row['num_questions'] if row['num_questions'] else 1,
-                        'score': float(row['score']) if row['score'] is not None else 0.0,
-                        'created_at': created_at,
-                        'short_date': short_date
-                    }
-                    
-                    sessions.append(session_data)
-                    
+                    sessions.append(self._row_to_session(row))
                 except Exception as row_error:
                     print(f"Error processing row: {row_error}")
                     continue  # Skip this row and continue with others
@@ -140,17 +216,196 @@ class SimpleSessionManager:
             traceback.print_exc()
             return []
     
-    def get_complete_session(self, session_id) -> Optional[Dict]:
-        """Get complete session data for revision view"""
+    def _get_question_logger(self):
+        if self._question_logger is None:
+            from src.models.question_log import QuestionLogger
+            self._question_logger = QuestionLogger(self.db_path)
+        return self._question_logger
+    
+    def _row_to_session(self, row) -> Dict:
+        """Build the sidebar/dashboard session dict from a quiz_sessions row"""
+        # Safe access using row names
+        topic = row['topic'] if row['topic'] else "Quiz"
+        sub_topic = row['sub_topic'] if row['sub_topic'] else ""
+        
+        # Create display title
+        display_title = topic
+        if sub_topic:
+            display_title = f"{topic} - {sub_topic}"
+        
+        # Safe date formatting
+        created_at = row['created_at'] if row['created_at'] else ""
+        short_date = created_at[:10] if len(created_at) >= 10 else ""
+        
+        return {
+            'id': row['id'],
+            'display_title': display_title,
+            'topic': topic,
+            'sub_topic': sub_topic,
+            'question_type': row['question_type'] if row['question_type'] else "Multiple Choice",
+            'difficulty': row['difficulty'] if row['difficulty'] else "Medium",
+            'num_questions': row['num_questions'] if row['num_questions'] else 1,
+            'score': float(row['score']) if row['score'] is not None else 0.0,
+            'created_at': created_at,
+            'short_date': short_date
+        }
+    
+    def get_user_sessions_page(self, user_id: int, page_size: int = 15,
+                               cursor_key: Optional[Tuple[str, int]] = None,
+                               search_term: str = "") -> Dict:
+        """Get one page of a user's sessions, newest first.
+        
+        Pages are keyset-paginated on (created_at, id): pass the returned
+        ``next_cursor`` back as ``cursor_key`` to fetch the following page, so
+        every page costs one index range scan no matter how deep it is.
+        ``search_term`` filters by title or date in SQL.
+        """
+        if self.shards:
+            return self.shards.for_user(user_id).get_user_sessions_page(user_id, page_size, cursor_key, search_term)
+        
+        return session_list_cache.get_or_load(
+            (self.db_path, 'page', int(user_id), int(page_size),
+             tuple(cursor_key) if cursor_key else None, search_term),
+            lambda: self._query_user_sessions_page(user_id, page_size, cursor_key, search_term),
+            user_key=(self.db_path, int(user_id))
+        )
+    
+    def _query_user_sessions_page(self, user_id: int, page_size: int,
+                                  cursor_key: Optional[Tuple[str, int]], search_term: str) -> Dict:
+        try:
+            conn = self.storage.connect(named_rows=True)
+            cursor = conn.cursor()
+            
+            title_sql = "CASE WHEN sub_topic IS NOT NULL AND sub_topic != '' THEN topic || ' - ' || sub_topic ELSE topic END"
+            conditions = ["user_id = ?"]
+            params = [int(user_id)]
+            
+            if cursor_key:
+                conditions.append("(created_at, id) < (?, ?)")
+                params.extend([str(cursor_key[0]), int(cursor_key[1])])
+            
+            if search_term:
+                pattern = '%' + search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+                like = self.storage.like_operator
+                conditions.append(f"({title_sql} {like} ? ESCAPE '\\' OR created_at {like} ? ESCAPE '\\')")
+                params.extend([pattern, pattern])
+            
+            # Fetch one extra row to know whether another page exists
+            cursor.execute(f'''
+                SELECT id, topic, sub_topic, question_type, difficulty,
+                       num_questions, score, created_at
+                FROM quiz_sessions
+                WHERE {' AND '.join(conditions)}
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            ''', params + [int(page_size) + 1])
+            rows = cursor.fetchall()
+            conn.close()
+            
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            sessions = [self._row_to_session(row) for row in rows]
+            
+            next_cursor = None
+            if has_more and rows:
+                next_cursor = (rows[-1]['created_at'], rows[-1]['id'])
+            
+            return {'sessions': sessions, 'next_cursor': next_cursor}
+            
+        except Exception as e:
+            print(f"Get sessions page error: {e}")
+            return {'sessions': [], 'next_cursor': None}
+    
+    def search_sessions(self, user_id: int, search_term: str, limit: int = 30,
+                        only_missed: bool = False) -> List[Dict]:
+        """Ranked full-text search over a user's quiz titles, questions and explanations.
+        
+        Every word is matched as a prefix. With ``only_missed`` only questions the
+        user answered wrong are searched. Dates, and every search when SQLite
+        has no FTS5, go to the SQL LIKE filter of ``get_user_sessions_page``.
+        """
+        if self.shards:
+            return self.shards.for_user(user_id).search_sessions(user_id, search_term, limit, only_missed)
+        
+        if not self.search_index.available or is_date_term(search_term):
+            return self.get_user_sessions_page(user_id, limit, search_term=search_term)['sessions']
+        
+        match = self.search_index.match_expression(user_id, search_term, only_missed)
+        if not match:
+            return []
+        
+        return session_list_cache.get_or_load(
+            (self.db_path, 'search', int(user_id), match, int(limit), bool(only_missed)),
+            lambda: self._query_search_sessions(match, limit, only_missed),
+            user_key=(self.db_path, int(user_id))
+        )
+    
+    def _query_search_sessions(self, match: str, limit: int, only_missed: bool) -> List[Dict]:
         try:
-            conn = sqlite3.connect(self.db_path)
-            conn.row_factory = sqlite3.Row  # Use Row factory for safer access
+            conn = self.storage.connect(named_rows=True)
             cursor = conn.cursor()
             
-            # Handle session_id parameter properly
-            if isinstance(session_id, (tuple, list)):
-                session_id = session_id[0]
+            weights = ', '.join(str(w) for w in self.search_index.RANK_WEIGHTS)
+            snippet_column = 3 if only_missed else 1  # missed / questions
+            cursor.execute(f'''
+                SELECT s.id, s.topic, s.sub_topic, s.question_type, s.difficulty,
+                       s.num_questions, s.score, s.created_at,
+                       snippet(quiz_search, {snippet_column}, '**', '**', '…', 8) AS snippet
+                FROM quiz_search
+                JOIN quiz_sessions s ON s.id = quiz_search.rowid
+                WHERE quiz_search MATCH ?
+                ORDER BY bm25(quiz_search, {weights})
+                LIMIT ?
+            ''', [match, int(limit)])
+            
+            sessions = []
+            for row in cursor.fetchall():
+                session = self._row_to_session(row)
+                session['snippet'] = row['snippet']
+                sessions.append(session)
+            
+            conn.close()
+            return sessions
+            
+        except Exception as e:
+            print(f"Search sessions error: {e}")
+            return []
+    
+    def get_complete_session(self, session_id, user_id: Optional[int] = None) -> Optional[Dict]:
+        """Get complete session data for revision view, cached per session.
+        
+        When sharding, ``user_id`` picks the shard directly; without it the
+        session id is looked up on the shard that issued it, then on all shards.
+        """
+        # Handle session_id parameter properly
+        if isinstance(session_id, (tuple, list)):
+            session_id = session_id[0]
+        try:
             session_id = int(session_id)
+        except (TypeError, ValueError) as e:
+            print(f"Get complete session error: {e}")
+            return None
+        
+        if self.shards:
+            if user_id is not None:
+                return self.shards.for_user(user_id).get_complete_session(session_id)
+            shard = self.shards.for_session(session_id)
+            session = shard.get_complete_session(session_id) if shard else None
+            if session is None:
+                found = self.shards.fan_out(lambda shard: shard.get_complete_session(session_id))
+                session = next((s for s in found if s is not None), None)
+            return session
+        
+        return session_detail_cache.get_or_load(
+            (self.db_path, session_id),
+            lambda: self._query_complete_session(session_id),
+            user_key_of=lambda session: (self.db_path, session['user_id'])
+        )
+    
+    def _query_complete_session(self, session_id: int) -> Optional[Dict]:
+        try:
+            conn = self.storage.connect(named_rows=True)  # rows readable by column name
+            cursor = conn.cursor()
             
             cursor.execute('''
                 SELECT * FROM quiz_sessions WHERE id = ?
@@ -177,14 +432,17 @@ class SimpleSessionManager:
                 
                 # Try to get detailed data if columns exist
                 try:
-                    if 'questions_data' in row.keys() and row['questions_data']:
-                        result['questions_data'] = json.loads(row['questions_data'])
-                    if 'user_answers' in row.keys() and row['user_answers']:
-                        result['user_answers'] = json.loads(row['user_answers'])
-                    if 'results_data' in row.keys() and row['results_data']:
-                        result['results_data'] = json.loads(row['results_data'])
-                except (json.JSONDecodeError, KeyError):
-                    # Fallback to empty data if JSON parsing fails
+                    if 'question_ids' in row.keys() and row['question_ids']:
+                        self._load_normalised_data(cursor, row, result)
+                    else:
+                        if 'questions_data' in row.keys() and row['questions_data']:
+                            result['questions_data'] = decode_blob(row['questions_data'])
+                        if 'user_answers' in row.keys() and row['user_answers']:
+                            result['user_answers'] = decode_blob(row['user_answers'])
+                        if 'results_data' in row.keys() and row['results_data']:
+                            result['results_data'] = decode_blob(row['results_data'])
+                except (ValueError, KeyError):
+                    # Fallback to empty data if the blobs cannot be decoded
                     pass
                 
                 conn.close()
@@ -196,3 +454,133 @@ class SimpleSessionManager:
         except Exception as e:
             print(f"Get complete session error: {e}")
             return None
+    
+    def _load_normalised_data(self, cursor, row, result: Dict):
+        """Rebuild questions and results for a session stored as question ids"""
+        question_ids = decode_blob(row['question_ids'])
+        user_answers = decode_blob(row['user_answers']) if row['user_answers'] else []
+        outcomes = decode_blob(row['answer_outcomes']) if row['answer_outcomes'] else []
+        questions_by_id = self.question_store.get_questions(cursor, question_ids)
+        
+        questions_data = []
+        results_data = []
+        for i, question_id in enumerate(question_ids):
+            # A placeholder keeps the answers lined up with their questions
+            question = questions_by_id.get(question_id) or dict(MISSING_QUESTION, options=[])
+            questions_data.append(question)
+            
+            outcome = outcomes[i] if i < len(outcomes) else {}
+            results_data.append({
+                'question_number': i+1,
+                'question': question['question'],
+                'question_type': question['type'],
+                'user_answer': user_answers[i] if i < len(user_answers) else '',
+                'correct_answer': question['correct_answer'],
+                'explanation': question.get('explanation', ''),
+                'time_taken': outcome.get('time_taken', 0),
+                'is_correct': outcome.get('is_correct', False),
+                'options': question.get('options', [])
+            })
+        
+        result['questions_data'] = questions_data
+        result['user_answers'] = user_answers
+        result['results_data'] = results_data
+    
+    def reencode_blobs(self, batch_size: int = 200, codec_name: Optional[str] = None) -> int:
+        """Re-encode one batch of legacy JSON text blobs with the blob codec.
+        
+        Returns the number of sessions converted; 0 means nothing is left.
+        Each batch is its own short transaction so live writers are not held up.
+        Only SQLite databases can hold legacy text blobs. Blobs that cannot be
+        decoded are logged and left as they are.
+        """
+        if self.storage.dialect != 'sqlite':
+            return 0
+        
+        shard_converted = 0
+        if self.shards:
+            shard_converted = sum(self.shards.fan_out(lambda shard: shard.reencode_blobs(batch_size, codec_name)))
+        
+        text_check = ' OR '.join(f"typeof({column}) = 'text'" for column in BLOB_COLUMNS)
+        
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        try:
+            converted = 0
+            up_to = self._reencoded_up_to
+            # A batch of nothing but unreadable blobs moves on to the next one
+            while not converted:
+                cursor.execute(f'''
+                    SELECT id, {', '.join(BLOB_COLUMNS)}
+                    FROM quiz_sessions
+                    WHERE id > ? AND ({text_check})
+                    ORDER BY id
+                    LIMIT ?
+                ''', [up_to, int(batch_size)])
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                
+                for row in rows:
+                    updates = {}
+                    for column in BLOB_COLUMNS:
+                        value = row[column]
+                        if value is None or is_encoded(value):
+                            continue
+                        try:
+                            updates[column] = encode_blob(decode_blob(value), codec_name)
+                        except ValueError as e:
+                            print(f"Blob re-encoding skipped session {row['id']} {column}: {e}")
+                    
+                    if updates:
+                        assignments = ', '.join(f"{column} = ?" for column in updates)
+                        cursor.execute(
+                            f"UPDATE quiz_sessions SET {assignments} WHERE id = ?",
+                            list(updates.values()) + [row['id']]
+                        )
+                        converted += 1
+                up_to = rows[-1]['id']
+            
+            conn.commit()
+            self._reencoded_up_to = up_to
+            return converted + shard_converted
+        finally:
+            conn.close()
+
+def invalidate_user_sessions(db_path: str, user_id: int):
+    """Drop a user's cached history lists and sessions after a write"""
+    user_key = (db_path, int(user_id))
+    session_list_cache.invalidate_user(user_key)
+    session_detail_cache.invalidate_user(user_key)
+
+def session_cache_stats() -> List[Dict]:
+    """Hit/miss counters of the session caches in this process"""
+    return [session_list_cache.stats(), session_detail_cache.stats()]
+
+def start_blob_reencoding(db_path: Optional[str] = None, batch_size: int = 200, pause: float = 0.5) -> threading.Thread:
+    """Convert legacy JSON session blobs in a background thread, once per process"""
+    db_path = get_storage(db_path).location
+    if db_path in _reencoding_threads:
+        return _reencoding_threads[db_path]
+    
+    def run():
+        try:
+            session_manager = SimpleSessionManager(db_path)
+            total = 0
+            while True:
+                converted = session_manager.reencode_blobs(batch_size)
+                total += converted
+                if converted == 0:
+                    break
+                time.sleep(pause)
+            if total:
+                print(f"Re-encoded {total} quiz session blobs")
+        except Exception as e:
+            print(f"Blob re-encoding error: {e}")
+    
+    thread = threading.Thread(target=run, name="blob-reencoder", daemon=True)
+    _reencoding_threads[db_path] = thread
+    thread.start()
+    return thread
@@ -0,0 +1,219 @@
+import sqlite3
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from src.storage.base import get_storage
+from src.storage.sharding import ShardRouter
+from src.utils.cache import UserStateCache
+from src.config.settings import settings
+
+# Days of per-day quiz counts kept on the user row; "this week" looks back 7 days
+RECENT_DAYS = 8
+
+# Hot per-user dashboard state shared by every manager in the process, keyed by (db_path, user_id)
+user_state_cache = UserStateCache(
+    'user_state', settings.USER_STATE_CACHE_USERS, settings.USER_STATE_IDLE_SECONDS,
+    settings.USER_STATE_MAX_AGE_SECONDS
+)
+
+class UserStats:
+    """Per-user quiz counters kept on the ``users`` row.
+
+    ``record_quiz`` runs inside the quiz submission transaction, so the
+    dashboard headline numbers are one primary-key read instead of a scan
+    over the user's sessions. That row is then held in ``user_state_cache``
+    and updated by ``cache_quiz`` after each submit.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.storage = get_storage(db_path)
+        self.db_path = self.storage.location
+        self.shards = ShardRouter.for_manager(self.db_path, UserStats)
+        self.storage.init_once('user_stats', self.init_tables)
+
+    def init_tables(self):
+        """Add counter columns to users, backfilling them the first time"""
+        if self.storage.dialect != 'sqlite':
+            return  # part of the backend's schema
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+
+        if not self.storage.table_exists(cursor, 'users'):
+            conn.close()
+            return False  # AuthManager creates the users table; try again next time
+
+        added = self._add_column_safe(cursor, 'users', 'best_score', 'REAL DEFAULT 0.0')
+        self._add_column_safe(cursor, 'users', 'last_quiz_at', 'TIMESTAMP')
+        self._add_column_safe(cursor, 'users', 'recent_daily_counts', 'TEXT')  # JSON {date: count}
+
+        conn.commit()
+        conn.close()
+
+        if added:
+            self.rebuild()
+
+    def _add_column_safe(self, cursor, table_name: str, column_name: str, column_type: str) -> bool:
+        """Safely add column if it doesn't exist, returning True if it was added"""
+        try:
+            cursor.execute(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}')
+            return True
+        except sqlite3.OperationalError:
+            return False  # Column already exists
+
+    @staticmethod
+    def _trim_daily_counts(daily_counts: Dict[str, int], today: datetime) -> Dict[str, int]:
+        oldest = (today - timedelta(days=RECENT_DAYS - 1)).strftime('%Y-%m-%d')
+        return {day: count for day, count in daily_counts.items() if day >= oldest}
+
+    def record_quiz(self, cursor, user_id: int, score: float):
+        """Update the user's counters for one submitted quiz on the caller's transaction.
+
+        The user row stays locked until the submit commits, so the user's
+        concurrent submits also take turns on their per-topic rows.
+        """
+        cursor.execute(f'SELECT recent_daily_counts FROM users WHERE id = ?{self.storage.for_update}',
+                       [int(user_id)])
+        row = cursor.fetchone()
+        if row is None:
+            return
+
+        try:
+            daily_counts = json.loads(row[0]) if row[0] else {}
+        except json.JSONDecodeError:
+            daily_counts = {}
+
+        # Session timestamps are CURRENT_TIMESTAMP, i.e. UTC
+        now = datetime.utcnow()
+        today = now.strftime('%Y-%m-%d')
+        daily_counts[today] = daily_counts.get(today, 0) + 1
+        daily_counts = self._trim_daily_counts(daily_counts, now)
+
+        cursor.execute('''
+            UPDATE users
+            SET total_quizzes = COALESCE(total_quizzes, 0) + 1,
+                total_score = COALESCE(total_score, 0) + ?,
+                best_score = CASE WHEN COALESCE(best_score, 0) > ? THEN best_score ELSE ? END,
+                last_quiz_at = ?,
+                recent_daily_counts = ?
+            WHERE id = ?
+        ''', [float(score), float(score), float(score), now.strftime('%Y-%m-%d %H:%M:%S'),
+              json.dumps(daily_counts), int(user_id)])
+
+    def cache_quiz(self, user_id: int, score: float):
+        """Apply a committed ``record_quiz`` to the cached counters"""
+        now = datetime.utcnow()
+        today = now.strftime('%Y-%m-%d')
+
+        def apply(row: Dict) -> Dict:
+            daily_counts = dict(row['recent_daily_counts'])
+            daily_counts[today] = daily_counts.get(today, 0) + 1
+            return {
+                'total_quizzes': row['total_quizzes'] + 1,
+                'total_score': row['total_score'] + float(score),
+                'best_score': max(row['best_score'], float(score)),
+                'last_quiz_at': now.strftime('%Y-%m-%d %H:%M:%S'),
+                'recent_daily_counts': self._trim_daily_counts(daily_counts, now)
+            }
+
+        user_state_cache.update((self.db_path, int(user_id)), 'stats_row', apply)
+
+    def get_stats(self, user_id: int) -> Dict:
+        """Dashboard headline stats from the user row"""
+        stats = {
+            'total_quizzes': 0,
+            'avg_score': 0.0,
+            'best_score': 0.0,
+            'quizzes_this_week': 0,
+            'last_quiz_at': None
+        }
+
+        if self.shards:
+            return self.shards.for_user(user_id).get_stats(user_id)
+
+        row = user_state_cache.get((self.db_path, int(user_id)), 'stats_row',
+                                   lambda: self._load_stats_row(user_id))
+        if row is None:
+            return stats
+
+        total_quizzes = row['total_quizzes']
+        stats['total_quizzes'] = total_quizzes
+        stats['avg_score'] = row['total_score'] / total_quizzes if total_quizzes else 0.0
+        stats['best_score'] = row['best_score']
+        # Counted at read time so a cached row still rolls over at midnight
+        stats['quizzes_this_week'] = sum(
+            self._trim_daily_counts(row['recent_daily_counts'], datetime.utcnow()).values()
+        )
+        stats['last_quiz_at'] = row['last_quiz_at']
+        return stats
+
+    def _load_stats_row(self, user_id: int) -> Optional[Dict]:
+        """The user's counter columns, or None if the user is missing or the read failed"""
+        try:
+            conn = self.storage.connect(named_rows=True)
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT total_quizzes, total_score, best_score, last_quiz_at, recent_daily_counts
+                FROM users WHERE id = ?
+            ''', [int(user_id)])
+            row = cursor.fetchone()
+            conn.close()
+
+            if row is None:
+                return None
+
+            return {
+                'total_quizzes': row['total_quizzes'] or 0,
+                'total_score': row['total_score'] or 0.0,
+                'best_score': row['best_score'] or 0.0,
+                'last_quiz_at': row['last_quiz_at'],
+                'recent_daily_counts': json.loads(row['recent_daily_counts']) if row['recent_daily_counts'] else {}
+            }
+
+        except Exception as e:
+            print(f"Get user stats error: {e}")
+            return None
+
+    def rebuild(self):
+        """Recompute every user's counters from quiz_sessions"""
+        if self.shards:
+            self.shards.fan_out(lambda shard: shard.rebuild())
+
+        conn = self.storage.connect()
+        cursor = conn.cursor()
+
+        if not self.storage.table_exists(cursor, 'quiz_sessions'):
+            conn.close()
+            return
+
+        now = datetime.utcnow()
+        oldest = (now - timedelta(days=RECENT_DAYS - 1)).strftime('%Y-%m-%d')
+
+        cursor.execute('''
+            UPDATE users SET
+                total_quizzes = (SELECT COUNT(*) FROM quiz_sessions s WHERE s.user_id = users.id),
+                total_score = (SELECT COALESCE(SUM(score), 0) FROM quiz_sessions s WHERE s.user_id = users.id),
+                best_score = (SELECT COALESCE(MAX(score), 0) FROM quiz_sessions s WHERE s.user_id = users.id),
+                last_quiz_at = (SELECT MAX(created_at) FROM quiz_sessions s WHERE s.user_id = users.id),
+                recent_daily_counts = NULL
+        ''')
+
+        cursor.execute('''
+            SELECT user_id, substr(created_at, 1, 10) AS day, COUNT(*)
+            FROM quiz_sessions
+            WHERE created_at >= ?
+            GROUP BY user_id, substr(created_at, 1, 10)
+        ''', [oldest])
+        daily_counts = {}
+        for user_id, day, count in cursor.fetchall():
+            daily_counts.setdefault(user_id, {})[day] = count
+
+        cursor.executemany(
+            'UPDATE users SET recent_daily_counts = ? WHERE id = ?',
+            [(json.dumps(counts), user_id) for user_id, counts in daily_counts.items()]
+        )
+
+        conn.commit()
+        conn.close()
+        user_state_cache.clear()
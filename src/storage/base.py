@@ -0,0 +1,99 @@
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Sequence
+
+class Storage(ABC):
+    """Where the app's tables live.
+
+    Managers talk to a storage backend instead of opening SQLite files
+    themselves, so the same code runs against the local ``studyai.db`` or a
+    shared PostgreSQL database when several replicas serve the app.
+    Connections follow the DB-API with ``?`` placeholders on every backend.
+    """
+
+    dialect = None
+    supports_full_text_search = False
+    like_operator = 'LIKE'  # case-insensitive for ASCII text
+    # Appended to a SELECT whose rows the transaction goes on to rewrite
+    for_update = ''
+
+    def __init__(self, location: str):
+        self.location = location
+        self._initialized = set()
+        self._init_lock = threading.RLock()
+
+    def init_once(self, name: str, init) -> None:
+        """Run a manager's table setup the first time it is used in this process.
+
+        Streamlit builds managers on every rerun; after the first run their DDL
+        is skipped. If ``init`` returns False it is retried next time.
+        """
+        with self._init_lock:
+            if name in self._initialized:
+                return
+            if init() is not False:
+                self._initialized.add(name)
+
+    @abstractmethod
+    def connect(self, named_rows: bool = False):
+        """Open a connection; with ``named_rows`` rows can also be read by column name"""
+
+    @abstractmethod
+    def table_exists(self, cursor, table_name: str) -> bool:
+        """Whether ``table_name`` exists in the database"""
+
+    @abstractmethod
+    def insert_returning_id(self, cursor, sql: str, params: Sequence) -> Optional[int]:
+        """Run an INSERT and return the new row id, or None if no row was inserted"""
+
+    @abstractmethod
+    def lock_for_write(self, cursor, table: str):
+        """Start the caller's transaction holding off other writers of ``table`` until it commits"""
+
+    def bulk_insert(self, cursor, table: str, columns: List[str], rows: Iterable[Sequence]):
+        """Insert many rows on the caller's transaction using the backend's fastest path"""
+        placeholders = ', '.join('?' * len(columns))
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            list(rows)
+        )
+
+_round_trips = threading.local()
+
+def count_round_trip(*_):
+    """Record one statement sent to the database by the current thread"""
+    _round_trips.count = getattr(_round_trips, 'count', 0) + 1
+
+def round_trips() -> int:
+    """Statements the current thread has sent since the last reset (one Streamlit run per thread)"""
+    return getattr(_round_trips, 'count', 0)
+
+def reset_round_trips():
+    _round_trips.count = 0
+
+def is_postgres_url(location: str) -> bool:
+    return location.startswith(('postgres://', 'postgresql://'))
+
+_storages: Dict[str, Storage] = {}
+_storages_lock = threading.Lock()
+
+def get_storage(location: Optional[str] = None) -> Storage:
+    """The shared backend for a SQLite file path or PostgreSQL URL.
+
+    Defaults to ``settings.DATABASE_URL``. Backends are created once per
+    process, so a PostgreSQL connection pool is shared by every manager.
+    """
+    from src.config.settings import settings
+
+    location = location or settings.DATABASE_URL
+    with _storages_lock:
+        storage = _storages.get(location)
+        if storage is None:
+            if is_postgres_url(location):
+                from src.storage.postgres_storage import PostgresStorage
+                storage = PostgresStorage(location, settings.DATABASE_POOL_SIZE)
+            else:
+                from src.storage.sqlite_storage import SQLiteStorage
+                storage = SQLiteStorage(location)
+            _storages[location] = storage
+        return storage
@@ -0,0 +1,427 @@
+import io
+import threading
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence
+
+import psycopg2
+import psycopg2.extras
+import psycopg2.pool
+
+from src.storage.base import Storage, count_round_trip
+
+# Timestamps are stored as UTC text, the same format SQLite's CURRENT_TIMESTAMP uses
+UTC_NOW = "to_char(now() AT TIME ZONE 'UTC', 'YYYY-MM-DD HH24:MI:SS')"
+
+SCHEMA = [
+    f'''
+    CREATE TABLE IF NOT EXISTS users (
+        id BIGSERIAL PRIMARY KEY,
+        username TEXT UNIQUE NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL,
+        created_at TEXT DEFAULT {UTC_NOW},
+        last_login TEXT,
+        total_quizzes INTEGER DEFAULT 0,
+        total_score DOUBLE PRECISION DEFAULT 0.0,
+        best_score DOUBLE PRECISION DEFAULT 0.0,
+        last_quiz_at TEXT,
+        recent_daily_counts TEXT -- JSON {{date: count}}
+    )
+    ''',
+    f'''
+    CREATE TABLE IF NOT EXISTS questions (
+        id BIGSERIAL PRIMARY KEY,
+        question_hash TEXT UNIQUE NOT NULL,
+        question_type TEXT,
+        question_text TEXT NOT NULL,
+        options TEXT, -- JSON for MCQ options
+        correct_answer TEXT,
+        explanation TEXT,
+        created_at TEXT DEFAULT {UTC_NOW}
+    )
+    ''',
+    f'''
+    CREATE TABLE IF NOT EXISTS quiz_sessions (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT REFERENCES users (id),
+        topic TEXT NOT NULL,
+        sub_topic TEXT,
+        question_type TEXT NOT NULL,
+        difficulty TEXT NOT NULL,
+        num_questions INTEGER NOT NULL,
+        score DOUBLE PRECISION,
+        created_at TEXT DEFAULT {UTC_NOW},
+        questions_data BYTEA,
+        user_answers BYTEA,
+        results_data BYTEA,
+        question_ids BYTEA,
+        answer_outcomes BYTEA
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_quiz_sessions_user_created
+    ON quiz_sessions (user_id, created_at, id)
+    ''',
+    f'''
+    CREATE TABLE IF NOT EXISTS question_log (
+        id BIGSERIAL PRIMARY KEY,
+        user_id BIGINT REFERENCES users (id),
+        session_id BIGINT REFERENCES quiz_sessions (id),
+        topic TEXT NOT NULL,
+        sub_topic TEXT,
+        difficulty TEXT,
+        question_type TEXT,
+        question_text TEXT,
+        options TEXT,
+        correct_answer TEXT,
+        user_answer TEXT,
+        is_correct BOOLEAN,
+        time_taken INTEGER, -- seconds
+        explanation TEXT,
+        created_at TEXT DEFAULT {UTC_NOW},
+        question_id BIGINT REFERENCES questions (id)
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_question_log_session
+    ON question_log (session_id)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_question_log_user
+    ON question_log (user_id, id)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS topic_stats (
+        user_id BIGINT NOT NULL,
+        day TEXT NOT NULL, -- YYYY-MM-DD (UTC) of the answers
+        topic TEXT NOT NULL,
+        sub_topic TEXT NOT NULL DEFAULT '',
+        difficulty TEXT NOT NULL DEFAULT '',
+        correct INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        time_taken INTEGER NOT NULL DEFAULT 0, -- seconds, summed
+        PRIMARY KEY (user_id, day, topic, sub_topic, difficulty)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS topic_mastery (
+        user_id BIGINT NOT NULL,
+        topic TEXT NOT NULL,
+        sub_topic TEXT NOT NULL DEFAULT '',
+        difficulty TEXT NOT NULL DEFAULT '',
+        correct DOUBLE PRECISION NOT NULL DEFAULT 0, -- decayed to updated_at
+        total DOUBLE PRECISION NOT NULL DEFAULT 0,
+        updated_at DOUBLE PRECISION NOT NULL, -- Unix seconds
+        PRIMARY KEY (user_id, topic, sub_topic, difficulty)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS review_items (
+        user_id BIGINT NOT NULL,
+        question_id BIGINT NOT NULL REFERENCES questions (id),
+        topic TEXT NOT NULL,
+        sub_topic TEXT NOT NULL DEFAULT '',
+        difficulty TEXT NOT NULL DEFAULT '',
+        repetitions INTEGER NOT NULL DEFAULT 0,
+        ease DOUBLE PRECISION NOT NULL DEFAULT 2.5,
+        interval_days DOUBLE PRECISION NOT NULL DEFAULT 1,
+        lapses INTEGER NOT NULL DEFAULT 0,
+        next_due DOUBLE PRECISION NOT NULL, -- Unix seconds
+        last_reviewed DOUBLE PRECISION, -- Unix seconds
+        PRIMARY KEY (user_id, question_id)
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_review_items_due
+    ON review_items (user_id, next_due)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS recommendations (
+        user_id BIGINT PRIMARY KEY,
+        payload TEXT NOT NULL, -- JSON from get_personalized_recommendations
+        last_log_id BIGINT NOT NULL, -- the user's latest question_log id when computed
+        generated_at DOUBLE PRECISION NOT NULL -- Unix seconds
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS rollup_watermarks (
+        name TEXT PRIMARY KEY,
+        last_id BIGINT NOT NULL, -- highest question_log id folded in
+        updated_at DOUBLE PRECISION NOT NULL -- Unix seconds
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS question_stats (
+        question_hash TEXT PRIMARY KEY, -- questions.question_hash
+        topic TEXT NOT NULL, -- labels of the first answers folded in
+        sub_topic TEXT NOT NULL DEFAULT '',
+        difficulty TEXT NOT NULL DEFAULT '',
+        answered BIGINT NOT NULL DEFAULT 0,
+        correct BIGINT NOT NULL DEFAULT 0,
+        time_taken BIGINT NOT NULL DEFAULT 0 -- seconds, summed
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS topic_difficulty_stats (
+        topic TEXT NOT NULL,
+        sub_topic TEXT NOT NULL DEFAULT '',
+        difficulty TEXT NOT NULL DEFAULT '',
+        answered BIGINT NOT NULL DEFAULT 0,
+        correct BIGINT NOT NULL DEFAULT 0,
+        PRIMARY KEY (topic, sub_topic, difficulty)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS irt_items (
+        question_hash TEXT PRIMARY KEY, -- questions.question_hash
+        topic TEXT NOT NULL,
+        sub_topic TEXT NOT NULL DEFAULT '',
+        difficulty_label TEXT NOT NULL DEFAULT '', -- the Easy/Medium/Hard it was generated at
+        difficulty DOUBLE PRECISION NOT NULL, -- b, on the ability scale
+        discrimination DOUBLE PRECISION NOT NULL, -- a; 1 under the 1PL model
+        responses BIGINT NOT NULL,
+        updated_at DOUBLE PRECISION NOT NULL -- Unix seconds
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS irt_abilities (
+        user_id BIGINT PRIMARY KEY,
+        ability DOUBLE PRECISION NOT NULL, -- theta
+        responses BIGINT NOT NULL,
+        updated_at DOUBLE PRECISION NOT NULL -- Unix seconds
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS bkt_params (
+        topic TEXT NOT NULL,
+        sub_topic TEXT NOT NULL DEFAULT '',
+        p_init DOUBLE PRECISION NOT NULL,
+        p_transit DOUBLE PRECISION NOT NULL,
+        p_slip DOUBLE PRECISION NOT NULL,
+        p_guess DOUBLE PRECISION NOT NULL,
+        answers BIGINT NOT NULL, -- answers the fit saw
+        fitted_at DOUBLE PRECISION NOT NULL, -- Unix seconds
+        PRIMARY KEY (topic, sub_topic)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS bkt_state (
+        user_id BIGINT NOT NULL,
+        topic TEXT NOT NULL,
+        sub_topic TEXT NOT NULL DEFAULT '',
+        p_known DOUBLE PRECISION NOT NULL, -- before the next answer
+        answers BIGINT NOT NULL DEFAULT 0,
+        updated_at DOUBLE PRECISION NOT NULL, -- Unix seconds
+        PRIMARY KEY (user_id, topic, sub_topic)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS bandit_arms (
+        user_id BIGINT NOT NULL,
+        topic TEXT NOT NULL,
+        sub_topic TEXT NOT NULL DEFAULT '',
+        difficulty TEXT NOT NULL DEFAULT '',
+        question_type TEXT NOT NULL DEFAULT '', -- as offered in the quiz form
+        correct BIGINT NOT NULL DEFAULT 0,
+        wrong BIGINT NOT NULL DEFAULT 0,
+        updated_at DOUBLE PRECISION NOT NULL, -- Unix seconds
+        PRIMARY KEY (user_id, topic, sub_topic, difficulty, question_type)
+    )
+    '''
+]
+
+# Row counts at which bulk_insert switches from multi-row INSERTs to COPY
+COPY_THRESHOLD = 1000
+
+@lru_cache(maxsize=512)
+def translate_placeholders(sql: str) -> str:
+    """Rewrite ``?`` placeholders as psycopg2 ``%s``, escaping literal ``%``"""
+    out = []
+    in_quote = False
+    for char in sql:
+        if char == "'":
+            in_quote = not in_quote
+            out.append(char)
+        elif char == '?' and not in_quote:
+            out.append('%s')
+        elif char == '%':
+            out.append('%%')
+        else:
+            out.append(char)
+    return ''.join(out)
+
+def _copy_value(value) -> str:
+    """One field in COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\\\x' + bytes(value).hex()
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+class PostgresCursor:
+    """DB-API cursor that accepts the ``?`` placeholders the managers write"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql: str, params: Optional[Sequence] = None):
+        count_round_trip()
+        if params is None:
+            self._cursor.execute(sql)
+        else:
+            self._cursor.execute(translate_placeholders(sql), tuple(params))
+        return self
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence]):
+        count_round_trip()
+        psycopg2.extras.execute_batch(
+            self._cursor, translate_placeholders(sql), [tuple(p) for p in seq_of_params], page_size=500
+        )
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: int = 1):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def raw(self):
+        return self._cursor
+
+    def close(self):
+        self._cursor.close()
+
+class PostgresConnection:
+    """A pooled connection; ``close`` rolls back anything uncommitted and returns it to the pool"""
+
+    def __init__(self, storage: 'PostgresStorage', raw):
+        self._storage = storage
+        self._raw = raw
+
+    def cursor(self) -> PostgresCursor:
+        # DictCursor rows can be read by index and by column name
+        return PostgresCursor(self._raw.cursor(cursor_factory=psycopg2.extras.DictCursor))
+
+    def execute(self, sql: str, params: Optional[Sequence] = None) -> PostgresCursor:
+        return self.cursor().execute(sql, params)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        if self._raw is None:
+            return
+        raw, self._raw = self._raw, None
+        broken = bool(raw.closed)
+        if not broken:
+            try:
+                raw.rollback()
+            except psycopg2.Error:
+                broken = True
+        self._storage._release(raw, broken)
+
+    def __del__(self):
+        self.close()
+
+class PostgresStorage(Storage):
+    """A shared PostgreSQL database behind a thread-safe connection pool.
+
+    The schema is created on first use. SQLite-only features degrade: quiz
+    search falls back to ILIKE filtering and blob re-encoding is skipped.
+    """
+
+    dialect = 'postgres'
+    supports_full_text_search = False
+    like_operator = 'ILIKE'
+    # READ COMMITTED lets two submits read the same row; the second waits for the first
+    for_update = ' FOR UPDATE'
+
+    def __init__(self, location: str, pool_size: int = 10):
+        super().__init__(location)
+        self.pool_size = max(1, int(pool_size))
+        self._pool = psycopg2.pool.ThreadedConnectionPool(1, self.pool_size, dsn=location)
+        # The pool raises when exhausted; wait for a free connection instead
+        self._available = threading.BoundedSemaphore(self.pool_size)
+        self.ensure_schema()
+
+    def connect(self, named_rows: bool = False) -> PostgresConnection:
+        self._available.acquire()
+        try:
+            return PostgresConnection(self, self._pool.getconn())
+        except Exception:
+            self._available.release()
+            raise
+
+    def _release(self, raw, broken: bool = False):
+        try:
+            self._pool.putconn(raw, close=broken)
+        finally:
+            self._available.release()
+
+    def ensure_schema(self):
+        """Create any missing tables; replicas starting together take turns"""
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext('smartprep_schema'))")
+            for statement in SCHEMA:
+                cursor.execute(statement)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def table_exists(self, cursor, table_name: str) -> bool:
+        cursor.execute("SELECT to_regclass(?)", [table_name])
+        return cursor.fetchone()[0] is not None
+
+    def insert_returning_id(self, cursor, sql: str, params: Sequence) -> Optional[int]:
+        cursor.execute(f"{sql.rstrip()} RETURNING id", params)
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def lock_for_write(self, cursor, table: str):
+        # EXCLUSIVE still lets plain SELECTs through
+        cursor.execute(f'LOCK TABLE {table} IN EXCLUSIVE MODE')
+
+    def bulk_insert(self, cursor, table: str, columns: List[str], rows: Iterable[Sequence]):
+        rows = list(rows)
+        if not rows:
+            return
+        count_round_trip()
+
+        if len(rows) < COPY_THRESHOLD:
+            psycopg2.extras.execute_values(
+                cursor.raw, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s", rows, page_size=500
+            )
+            return
+
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(_copy_value(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        cursor.raw.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+    def close(self):
+        self._pool.closeall()
@@ -0,0 +1,334 @@
+"""Per-user write sharding of the SQLite database.
+
+With ``DATABASE_SHARDS`` above 1, each user's quiz data (sessions, logged
+questions, topic rollups, search index and counters) lives in one of N shard
+files next to the main database, chosen by a hash of the user id. The main
+database keeps the ``users`` table used to log in; each shard keeps a copy
+of its users' rows for their counters. Submissions from users on different
+shards take different write locks, so a classroom burst no longer queues
+behind a single writer.
+
+Shard k hands out session and question log ids from ``(k + 1) * SHARD_ID_SPAN``,
+so ids stay unique across shards and a new session id names its shard. Ids
+below the span were written before sharding and are moved by
+``migrate_to_shards``. The shard count is fixed once data has been written:
+changing it would move most users to a different shard.
+"""
+import os
+import re
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+SHARD_ID_SPAN = 2 ** 40
+
+_SHARD_SUFFIX = re.compile(r'\.shard(\d+)(\.[^./\\]*)?$')
+
+def shard_count(location: Optional[str] = None) -> int:
+    """Configured number of shards; PostgreSQL databases are never sharded"""
+    from src.config.settings import settings
+    from src.storage.base import is_postgres_url
+
+    location = location or settings.DATABASE_URL
+    if is_postgres_url(location):
+        return 1
+    return max(1, int(settings.DATABASE_SHARDS))
+
+def shard_location(location: str, index: int) -> str:
+    """``studyai.db`` -> ``studyai.shard{index}.db``"""
+    root, ext = os.path.splitext(location)
+    return f"{root}.shard{int(index)}{ext or '.db'}"
+
+def main_location(location: str) -> str:
+    """``studyai.shard{index}.db`` -> ``studyai.db``; other locations are returned as they are"""
+    return _SHARD_SUFFIX.sub(lambda match: match.group(2) or '', location)
+
+def data_locations(location: str) -> List[str]:
+    """Where quiz data lives: every shard of a sharded main database, else the database itself"""
+    shards = shard_count(location)
+    if shards <= 1 or shard_index_of(location) is not None:
+        return [location]
+    return [shard_location(location, index) for index in range(shards)]
+
+def shard_index_of(location: str) -> Optional[int]:
+    """The shard number of a shard file, or None for the main database"""
+    match = _SHARD_SUFFIX.search(location)
+    return int(match.group(1)) if match else None
+
+def user_shard(user_id: int, shards: int) -> int:
+    """Stable across processes and restarts, unlike ``hash()``"""
+    return zlib.crc32(str(int(user_id)).encode()) % shards
+
+def id_offset(location: str) -> int:
+    """First id the shard hands out, or 0 for an unsharded database"""
+    index = shard_index_of(location)
+    return (index + 1) * SHARD_ID_SPAN if index is not None else 0
+
+def location_for_user(user_id: int, location: Optional[str] = None) -> str:
+    """The database holding a user's quiz data"""
+    from src.storage.base import get_storage
+
+    location = get_storage(location).location
+    shards = shard_count(location)
+    if shards <= 1 or shard_index_of(location) is not None:
+        return location
+    return shard_location(location, user_shard(user_id, shards))
+
+class ShardRouter:
+    """Sends a manager's per-user calls to the same kind of manager on the user's shard.
+
+    Shard managers are created on first use; they are ordinary managers
+    bound to the shard file, so their tables and caches are per shard.
+    """
+
+    def __init__(self, location: str, factory: Callable, shards: int):
+        self.location = location
+        self.factory = factory
+        self.locations = [shard_location(location, index) for index in range(shards)]
+        self._managers = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_manager(cls, location: str, factory: Callable) -> Optional['ShardRouter']:
+        """A router for a manager on the main database, or None when not sharding"""
+        shards = shard_count(location)
+        if shards <= 1 or shard_index_of(location) is not None:
+            return None
+        return cls(location, factory, shards)
+
+    def manager(self, index: int):
+        with self._lock:
+            manager = self._managers.get(index)
+            if manager is None:
+                from src.models.auth import AuthManager
+                AuthManager(self.locations[index])  # the shard's copy of the users table
+                manager = self._managers[index] = self.factory(self.locations[index])
+            return manager
+
+    def for_user(self, user_id: int):
+        return self.manager(user_shard(user_id, len(self.locations)))
+
+    def for_session(self, session_id: int):
+        """The shard a session id was handed out by, or None for ids from before sharding"""
+        index = int(session_id) // SHARD_ID_SPAN - 1
+        if 0 <= index < len(self.locations):
+            return self.manager(index)
+        return None
+
+    def fan_out(self, call: Callable) -> List:
+        """Run ``call(manager)`` on every shard in parallel; results in shard order"""
+        managers = [self.manager(index) for index in range(len(self.locations))]
+        with ThreadPoolExecutor(max_workers=len(managers), thread_name_prefix='shard') as pool:
+            return list(pool.map(call, managers))
+
+def reserve_id_range(cursor, location: str, table: str):
+    """Start a new shard table's AUTOINCREMENT ids at the shard's offset"""
+    offset = id_offset(location)
+    if not offset:
+        return
+    cursor.execute('''
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT ?, ? WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)
+    ''', [table, offset, table])
+
+def migrate_to_shards(location: Optional[str] = None, pause: float = 0.05) -> Dict:
+    """Move quiz data written before sharding from the main database to each user's shard.
+
+    Runs one user at a time, each in its own transaction on the shard, and
+    keeps ids so links from the UI and the archive stay valid. Questions are
+    re-interned in the shard and session/question log references rewritten.
+    Users may already have quizzed on their shard since sharding was turned
+    on, so their counters and rollups are added to the shard's rather than
+    replacing them, and knowledge states are replayed afterwards. Safe to run
+    again after an interruption: a user whose rows already reached the shard
+    is only removed from the main database.
+    """
+    import time
+    from src.models.knowledge_tracing import TopicKnowledge
+    from src.models.simple_session import SimpleSessionManager
+    from src.models.question_log import QuestionLogger
+    from src.models.quiz_search import QuizSearchIndex
+    from src.models.user_stats import user_state_cache
+    from src.utils.blob_codec import encode_blob, decode_blob
+    from src.storage.base import get_storage
+
+    home = get_storage(location)
+    router = ShardRouter.for_manager(home.location, SimpleSessionManager)
+    if router is None:
+        return {'moved_users': 0, 'moved_sessions': 0, 'moved_question_logs': 0}
+
+    source_manager = SimpleSessionManager(home.location)
+    QuestionLogger(home.location)
+    source = home.connect(named_rows=True)
+    source_cursor = source.cursor()
+    source_cursor.execute('''
+        SELECT DISTINCT user_id FROM quiz_sessions WHERE id < ?
+        UNION SELECT DISTINCT user_id FROM question_log WHERE id < ?
+    ''', [SHARD_ID_SPAN, SHARD_ID_SPAN])
+    user_ids = [row[0] for row in source_cursor.fetchall() if row[0] is not None]
+
+    moved = {'moved_users': 0, 'moved_sessions': 0, 'moved_question_logs': 0}
+    touched_shards = set()
+
+    try:
+        for user_id in user_ids:
+            target_manager = router.for_user(user_id)
+            QuestionLogger(target_manager.db_path)
+            touched_shards.add(target_manager.db_path)
+
+            target = target_manager.storage.connect()
+            target_cursor = target.cursor()
+
+            # Pre-sharding ids only get to the shard with the rest of the user's rows
+            target_cursor.execute('''
+                SELECT 1 FROM quiz_sessions WHERE user_id = ? AND id < ?
+                UNION ALL SELECT 1 FROM question_log WHERE user_id = ? AND id < ?
+                LIMIT 1
+            ''', [user_id, SHARD_ID_SPAN, user_id, SHARD_ID_SPAN])
+            already_copied = target_cursor.fetchone() is not None
+
+            def copy_question_ids(question_ids):
+                questions = source_manager.question_store.get_questions(source_cursor, question_ids)
+                return [
+                    target_manager.question_store.intern_question(target_cursor, questions[qid])
+                    if qid in questions else None
+                    for qid in question_ids
+                ]
+
+            source_cursor.execute('SELECT * FROM quiz_sessions WHERE user_id = ? AND id < ?', [user_id, SHARD_ID_SPAN])
+            sessions = [] if already_copied else source_cursor.fetchall()
+            for row in sessions:
+                row = dict(row)
+                if row.get('question_ids'):
+                    row['question_ids'] = encode_blob(copy_question_ids(decode_blob(row['question_ids'])))
+                _copy_row(target_cursor, 'quiz_sessions', row)
+
+            source_cursor.execute('SELECT * FROM question_log WHERE user_id = ? AND id < ?', [user_id, SHARD_ID_SPAN])
+            logs = [] if already_copied else source_cursor.fetchall()
+            for row in logs:
+                row = dict(row)
+                if row.get('question_id') is not None:
+                    row['question_id'] = copy_question_ids([row['question_id']])[0]
+                _copy_row(target_cursor, 'question_log', row)
+
+            if not already_copied:
+                source_cursor.execute('SELECT * FROM users WHERE id = ?', [user_id])
+                user_row = source_cursor.fetchone()
+                if user_row is not None:
+                    _merge_row(target_cursor, 'users', user_row, ['id'], _add_user_counters)
+
+                for table, merge in _ROLLUP_MERGES.items():
+                    source_cursor.execute(f'SELECT * FROM {table} WHERE user_id = ?', [user_id])
+                    for row in source_cursor.fetchall():
+                        _merge_row(target_cursor, table, row, _ROLLUP_KEYS[table], merge)
+
+                source_cursor.execute('SELECT * FROM review_items WHERE user_id = ?', [user_id])
+                for row in source_cursor.fetchall():
+                    row = dict(row)
+                    row['question_id'] = copy_question_ids([row['question_id']])[0]
+                    if row['question_id'] is not None:
+                        _merge_row(target_cursor, 'review_items', row, ['user_id', 'question_id'], _keep_shard_row)
+
+            target.commit()
+            target.close()
+
+            # Only remove from the main database once the shard has committed
+            source_cursor.execute('DELETE FROM question_log WHERE user_id = ? AND id < ?', [user_id, SHARD_ID_SPAN])
+            source_cursor.execute('DELETE FROM quiz_sessions WHERE user_id = ? AND id < ?', [user_id, SHARD_ID_SPAN])
+            source_cursor.execute('DELETE FROM topic_stats WHERE user_id = ?', [user_id])
+            source_cursor.execute('DELETE FROM topic_mastery WHERE user_id = ?', [user_id])
+            source_cursor.execute('DELETE FROM bkt_state WHERE user_id = ?', [user_id])
+            source_cursor.execute('DELETE FROM bandit_arms WHERE user_id = ?', [user_id])
+            source_cursor.execute('DELETE FROM review_items WHERE user_id = ?', [user_id])
+            source.commit()
+
+            moved['moved_users'] += 1
+            moved['moved_sessions'] += len(sessions)
+            moved['moved_question_logs'] += len(logs)
+            time.sleep(pause)  # let live writers in between users
+    finally:
+        source.close()
+
+    # Search documents are rebuilt once per shard rather than per user
+    for shard_location_ in touched_shards:
+        QuizSearchIndex(shard_location_).rebuild()
+        TopicKnowledge(shard_location_).rebuild()
+    QuizSearchIndex(home.location).rebuild()
+    user_state_cache.clear()
+
+    return moved
+
+def _merge_row(cursor, table: str, row, key_columns: List[str], merge: Callable):
+    """Copy a row to another database, combining it as ``merge(existing, row)`` with a row already there"""
+    row = dict(row)
+    cursor.execute(f"SELECT * FROM {table} WHERE {' AND '.join(f'{column} = ?' for column in key_columns)}",
+                   [row[column] for column in key_columns])
+    existing = cursor.fetchone()
+    if existing is not None:
+        row = merge(dict(zip([column[0] for column in cursor.description], existing)), row)
+    _copy_row(cursor, table, row)
+
+def _add_user_counters(shard: Dict, main: Dict) -> Dict:
+    import json
+
+    def daily_counts(value) -> Dict:
+        try:
+            return json.loads(value) if value else {}
+        except json.JSONDecodeError:
+            return {}
+
+    counts = daily_counts(shard.get('recent_daily_counts'))
+    for day, count in daily_counts(main.get('recent_daily_counts')).items():
+        counts[day] = counts.get(day, 0) + count
+    last_quizzes = [value for value in (shard.get('last_quiz_at'), main.get('last_quiz_at')) if value]
+    return dict(main,
+                total_quizzes=(shard.get('total_quizzes') or 0) + (main.get('total_quizzes') or 0),
+                total_score=(shard.get('total_score') or 0.0) + (main.get('total_score') or 0.0),
+                best_score=max(shard.get('best_score') or 0.0, main.get('best_score') or 0.0),
+                last_quiz_at=max(last_quizzes) if last_quizzes else None,
+                recent_daily_counts=json.dumps(counts))
+
+def _add_counts(*columns: str) -> Callable:
+    def merge(shard: Dict, main: Dict) -> Dict:
+        merged = dict(shard, **{column: shard[column] + main[column] for column in columns})
+        if 'updated_at' in shard:
+            merged['updated_at'] = max(shard['updated_at'], main['updated_at'])
+        return merged
+    return merge
+
+def _add_decayed_mastery(shard: Dict, main: Dict) -> Dict:
+    from src.models.mastery import decay_factor
+    from src.config.settings import settings
+
+    now = max(shard['updated_at'], main['updated_at'])
+    half_life = float(settings.MASTERY_HALF_LIFE_DAYS)
+    return dict(shard, updated_at=now, **{
+        column: sum(row[column] * decay_factor(now - row['updated_at'], half_life) for row in (shard, main))
+        for column in ('correct', 'total')
+    })
+
+def _keep_shard_row(shard: Dict, main: Dict) -> Dict:
+    return shard
+
+# How rows of the per-user rollups already on a shard absorb the main database's
+_ROLLUP_MERGES = {
+    'topic_stats': _add_counts('correct', 'total', 'time_taken'),
+    'topic_mastery': _add_decayed_mastery,
+    'bkt_state': _keep_shard_row,  # replayed from the merged question_log afterwards
+    'bandit_arms': _add_counts('correct', 'wrong')
+}
+_ROLLUP_KEYS = {
+    'topic_stats': ['user_id', 'day', 'topic', 'sub_topic', 'difficulty'],
+    'topic_mastery': ['user_id', 'topic', 'sub_topic', 'difficulty'],
+    'bkt_state': ['user_id', 'topic', 'sub_topic'],
+    'bandit_arms': ['user_id', 'topic', 'sub_topic', 'difficulty', 'question_type']
+}
+
+def _copy_row(cursor, table: str, row):
+    """Insert a row into the same table of another database, replacing any earlier copy"""
+    columns = list(row.keys())
+    cursor.execute(
+        f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [row[column] for column in columns]
+    )
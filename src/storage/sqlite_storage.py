@@ -0,0 +1,32 @@
+import sqlite3
+from typing import Optional, Sequence
+from src.storage.base import Storage, count_round_trip
+
+class SQLiteStorage(Storage):
+    """A local SQLite database file; tables are created by each manager's ``init_tables``"""
+
+    dialect = 'sqlite'
+    supports_full_text_search = True  # FTS5, if SQLite was built with it
+
+    def __init__(self, location: str, timeout: float = 5.0):
+        super().__init__(location)
+        self.timeout = timeout
+
+    def connect(self, named_rows: bool = False):
+        conn = sqlite3.connect(self.location, timeout=self.timeout)
+        conn.set_trace_callback(count_round_trip)
+        if named_rows:
+            conn.row_factory = sqlite3.Row
+        return conn
+
+    def table_exists(self, cursor, table_name: str) -> bool:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [table_name])
+        return cursor.fetchone() is not None
+
+    def insert_returning_id(self, cursor, sql: str, params: Sequence) -> Optional[int]:
+        cursor.execute(sql, params)
+        return cursor.lastrowid if cursor.rowcount == 1 else None
+
+    def lock_for_write(self, cursor, table: str):
+        # SQLite has one writer per database file
+        cursor.execute('BEGIN IMMEDIATE')
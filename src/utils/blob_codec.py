@@ -0,0 +1,141 @@
+"""Compact encodings for the JSON blobs stored on quiz session rows.
+
+Encoded blobs start with a version byte that names the serializer (high
+nibble) and compressor (low nibble) used for the rest of the payload:
+
+    0x00 json     0x01 json + zlib     0x02 json + zstd
+    0x10 msgpack  0x11 msgpack + zlib  0x12 msgpack + zstd
+
+Rows written before codecs existed hold plain JSON text and still decode.
+"""
+import json
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON, MSGPACK = 0x00, 0x10
+NO_COMPRESSION, ZLIB, ZSTD = 0x00, 0x01, 0x02
+
+# Serializers: id -> (dumps, loads)
+_SERIALIZERS: Dict[int, Tuple[Callable[[Any], bytes], Callable[[bytes], Any]]] = {
+    JSON: (
+        lambda value: json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+        lambda data: json.loads(data.decode('utf-8'))
+    )
+}
+
+# Compressors: id -> (compress, decompress)
+_COMPRESSORS: Dict[int, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    NO_COMPRESSION: (lambda data: data, lambda data: data),
+    ZLIB: (lambda data: zlib.compress(data, 6), zlib.decompress)
+}
+
+if msgpack is not None:
+    _SERIALIZERS[MSGPACK] = (
+        lambda value: msgpack.packb(value, use_bin_type=True),
+        lambda data: msgpack.unpackb(data, raw=False)
+    )
+
+if zstandard is not None:
+    _COMPRESSORS[ZSTD] = (
+        lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data)
+    )
+
+# Codec names accepted by settings.BLOB_CODEC
+CODECS = {
+    'json': JSON | NO_COMPRESSION,
+    'zlib-json': JSON | ZLIB,
+    'zstd-json': JSON | ZSTD,
+    'msgpack': MSGPACK | NO_COMPRESSION,
+    'zlib-msgpack': MSGPACK | ZLIB,
+    'zstd-msgpack': MSGPACK | ZSTD
+}
+
+class BlobDecodeError(ValueError):
+    """Raised when a stored blob cannot be decoded"""
+
+def register_serializer(serializer_id: int, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]):
+    """Plug in an extra serializer under a free high-nibble id"""
+    _SERIALIZERS[serializer_id & 0xF0] = (dumps, loads)
+
+def register_compressor(compressor_id: int, compress: Callable[[bytes], bytes], decompress: Callable[[bytes], bytes]):
+    """Plug in an extra compressor under a free low-nibble id"""
+    _COMPRESSORS[compressor_id & 0x0F] = (compress, decompress)
+
+def is_available(codec_name: str) -> bool:
+    """Check that the libraries behind a codec are installed"""
+    version = CODECS.get(codec_name)
+    if version is None:
+        return False
+    return (version & 0xF0) in _SERIALIZERS and (version & 0x0F) in _COMPRESSORS
+
+def default_codec() -> str:
+    """Codec configured in settings, falling back to zlib-json when unavailable"""
+    from src.config.settings import settings
+
+    codec_name = getattr(settings, 'BLOB_CODEC', 'zlib-json')
+    if is_available(codec_name):
+        return codec_name
+
+    print(f"Blob codec '{codec_name}' not available, using zlib-json")
+    return 'zlib-json'
+
+def encode_blob(value: Any, codec_name: Optional[str] = None) -> bytes:
+    """Serialize and compress a value, prefixed with its version byte.
+
+    Compression is skipped when it would not make the payload smaller, which
+    is common for short lists like answer ids.
+    """
+    version = CODECS[codec_name or default_codec()]
+    dumps, _ = _SERIALIZERS[version & 0xF0]
+    compress, _ = _COMPRESSORS[version & 0x0F]
+
+    payload = dumps(value)
+    if version & 0x0F != NO_COMPRESSION:
+        compressed = compress(payload)
+        if len(compressed) < len(payload):
+            return bytes([version]) + compressed
+        version &= 0xF0
+
+    return bytes([version]) + payload
+
+def decode_blob(raw) -> Any:
+    """Decode a stored blob, accepting both versioned bytes and legacy JSON text"""
+    if raw is None:
+        return None
+
+    if isinstance(raw, str):
+        return json.loads(raw)
+
+    raw = bytes(raw)
+    if not raw:
+        raise BlobDecodeError("Empty blob")
+
+    version = raw[0]
+    serializer = _SERIALIZERS.get(version & 0xF0)
+    compressor = _COMPRESSORS.get(version & 0x0F)
+    if serializer is None or compressor is None:
+        # Legacy JSON that was written as bytes rather than text
+        try:
+            return json.loads(raw.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            raise BlobDecodeError(f"Unknown blob version byte 0x{version:02x}")
+
+    try:
+        return serializer[1](compressor[1](raw[1:]))
+    except Exception as e:
+        raise BlobDecodeError(f"Corrupt blob with version byte 0x{version:02x}: {e}")
+
+def is_encoded(raw) -> bool:
+    """True if a stored value already uses a versioned encoding"""
+    return isinstance(raw, (bytes, bytearray, memoryview))
@@ -0,0 +1,238 @@
+"""Process-wide caches: read-through with LRU eviction, TTL expiry and per-user
+invalidation, and per-user hot state kept current by write-through.
+
+Streamlit reruns the whole script on every widget interaction, so the same
+history and session reads repeat many times between writes. Entries are
+tagged with the user they belong to and dropped when that user writes;
+the TTL only bounds staleness from writes made by other processes.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+class ReadThroughCache:
+    """Bounded LRU cache of loader results, tagged by user.
+
+    Values are deep-copied on the way in and out, so callers may mutate what
+    they get back without corrupting the cached copy. ``None`` is never
+    cached, so missing rows and failed loads are retried on the next read.
+    """
+
+    def __init__(self, name: str, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.name = name
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._entries = OrderedDict()  # key -> (expires_at, user_key, value)
+        self._user_keys = {}  # user_key -> set of keys
+        self._generations = {}  # user_key -> invalidation count
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+
+    def get_or_load(self, key: Hashable, loader: Callable, user_key: Optional[Hashable] = None,
+                    user_key_of: Optional[Callable] = None):
+        """Return the cached value for ``key`` or call ``loader`` and cache its result.
+
+        The entry is tagged with ``user_key``, or with ``user_key_of(value)`` when
+        the owner is only known after loading.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return copy.deepcopy(entry[2])
+                self._remove(key)
+                self._counters['expirations'] += 1
+            self._counters['misses'] += 1
+            generation = self._generations.get(user_key, 0)
+
+        value = loader()
+        if value is None:
+            return None
+
+        if user_key is None and user_key_of is not None:
+            user_key = user_key_of(value)
+        stored = copy.deepcopy(value)
+
+        with self._lock:
+            # A write by the same user while we were loading makes the result stale
+            if user_key_of is None and self._generations.get(user_key, 0) != generation:
+                return value
+
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, user_key, stored)
+            self._user_keys.setdefault(user_key, set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self._counters['evictions'] += 1
+
+        return value
+
+    def invalidate_user(self, user_key: Hashable) -> int:
+        """Drop every entry tagged with ``user_key``; returns how many were dropped"""
+        with self._lock:
+            self._generations[user_key] = self._generations.get(user_key, 0) + 1
+            keys = self._user_keys.pop(user_key, set())
+            for key in keys:
+                self._entries.pop(key, None)
+            self._counters['invalidations'] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'name': self.name,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hit_rate': round(self._counters['hits'] / lookups, 3) if lookups else 0.0,
+                **self._counters
+            }
+
+    def _remove(self, key: Hashable):
+        """Remove one entry; the caller holds the lock"""
+        _, user_key, _ = self._entries.pop(key)
+        keys = self._user_keys.get(user_key)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_key]
+
+class UserStateCache:
+    """Hot per-user state, grouped by user and evicted when the user goes idle.
+
+    Each user has named parts (counters, topic buckets, recent answers) that
+    are loaded on first read and then kept current by ``update`` after the
+    user's own writes, so dashboard reruns need no queries. A part is reloaded
+    after ``max_age_seconds`` to pick up writes from other processes, and a
+    user untouched for ``idle_seconds`` is dropped; beyond ``max_users`` the
+    least recently used user goes first.
+
+    Values are shared, not copied: callers must treat them as read-only.
+    """
+
+    def __init__(self, name: str, max_users: int = 1000, idle_seconds: float = 900.0,
+                 max_age_seconds: float = 300.0):
+        self.name = name
+        self.max_users = max(1, int(max_users))
+        self.idle_seconds = float(idle_seconds)
+        self.max_age_seconds = float(max_age_seconds)
+        self._users = OrderedDict()  # user_key -> {part: (loaded_at, value)}, least recent first
+        self._last_access = {}  # user_key -> monotonic time
+        self._discards = 0  # bumped on every write, so loads racing one are not cached
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0, 'idle_evictions': 0}
+
+    def get(self, user_key: Hashable, part: str, loader: Callable):
+        """Return the cached part for a user, loading it on a miss or once it is too old"""
+        now = time.monotonic()
+        with self._lock:
+            self._sweep(now)
+            parts = self._touch(user_key, now)
+            entry = parts.get(part)
+            if entry is not None and now - entry[0] < self.max_age_seconds:
+                self._counters['hits'] += 1
+                return entry[1]
+            self._counters['misses'] += 1
+            discards = self._discards
+
+        value = loader()
+        if value is None:
+            return None
+
+        with self._lock:
+            # Something was written while we were loading; keep the result out of the cache
+            if self._discards == discards:
+                self._touch(user_key, now)[part] = (now, value)
+                self._evict_over_capacity()
+        return value
+
+    def update(self, user_key: Hashable, part: str, apply: Callable) -> bool:
+        """Write through: replace a cached part with ``apply(value)``.
+
+        Does nothing when the part is not cached, since the next read loads it
+        with the write included. The part's age is left as it was.
+        """
+        with self._lock:
+            self._discards += 1  # a load already in flight may predate the write
+            parts = self._users.get(user_key)
+            entry = parts.get(part) if parts is not None else None
+            if entry is None:
+                return False
+            try:
+                value = apply(entry[1])
+            except Exception:
+                del parts[part]
+                raise
+            parts[part] = (entry[0], value)
+            self._counters['writes'] += 1
+            return True
+
+    def discard(self, user_key: Hashable, part: Optional[str] = None):
+        """Forget one part of a user's state, or all of it"""
+        with self._lock:
+            parts = self._users.get(user_key)
+            self._discards += 1
+            if parts is None:
+                return
+            if part is None:
+                parts.clear()
+            else:
+                parts.pop(part, None)
+
+    def clear(self):
+        with self._lock:
+            self._discards += 1
+            self._users.clear()
+            self._last_access.clear()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                'name': self.name,
+                'users': len(self._users),
+                'max_users': self.max_users,
+                'hit_rate': round(self._counters['hits'] / lookups, 3) if lookups else 0.0,
+                **self._counters
+            }
+
+    def _touch(self, user_key: Hashable, now: float) -> Dict:
+        """The user's parts, marked as most recently used; the caller holds the lock"""
+        parts = self._users.get(user_key)
+        if parts is None:
+            parts = self._users[user_key] = {}
+        else:
+            self._users.move_to_end(user_key)
+        self._last_access[user_key] = now
+        return parts
+
+    def _sweep(self, now: float):
+        """Drop users idle for longer than ``idle_seconds``; the caller holds the lock"""
+        while self._users:
+            user_key = next(iter(self._users))
+            if now - self._last_access[user_key] < self.idle_seconds:
+                break
+            self._drop(user_key)
+            self._counters['idle_evictions'] += 1
+
+    def _evict_over_capacity(self):
+        while len(self._users) > self.max_users:
+            self._drop(next(iter(self._users)))
+            self._counters['evictions'] += 1
+
+    def _drop(self, user_key: Hashable):
+        del self._users[user_key]
+        del self._last_access[user_key]
@@ -0,0 +1,233 @@
+"""Streaming export of a user's quiz history.
+
+Rows are produced by generators reading the database in chunks and written
+straight to a temporary file, so memory use stays flat no matter how long
+the history is. Large histories are split into parts by session id range,
+each downloaded separately.
+"""
+import csv
+import io
+import json
+import os
+import sqlite3
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.utils.blob_codec import decode_blob
+from src.storage.base import get_storage
+from src.storage.sharding import location_for_user
+
+EXPORT_COLUMNS = [
+    'session_id', 'session_created_at', 'topic', 'sub_topic', 'difficulty',
+    'question_type', 'session_score', 'question_id', 'question', 'options',
+    'correct_answer', 'user_answer', 'is_correct', 'time_taken', 'explanation',
+    'answered_at', 'archived'
+]
+
+def plan_export_parts(user_id: int, db_path: Optional[str] = None,
+                      sessions_per_part: int = 2000) -> List[Tuple[int, int]]:
+    """Split a user's sessions into (first_id, last_id) ranges of bounded size"""
+    conn = get_storage(location_for_user(user_id, db_path)).connect()
+    cursor = conn.cursor()
+    cursor.execute('SELECT id FROM quiz_sessions WHERE user_id = ? ORDER BY id', [int(user_id)])
+
+    parts = []
+    first_id = last_id = None
+    count = 0
+    while True:
+        batch = cursor.fetchmany(1000)
+        if not batch:
+            break
+        for (session_id,) in batch:
+            if first_id is None:
+                first_id = session_id
+            last_id = session_id
+            count += 1
+            if count == sessions_per_part:
+                parts.append((first_id, last_id))
+                first_id, count = None, 0
+
+    # The last part is open-ended so sessions saved after planning are included
+    if first_id is not None:
+        parts.append((first_id, 2**63 - 1))
+    elif parts:
+        parts[-1] = (parts[-1][0], 2**63 - 1)
+
+    conn.close()
+    return parts
+
+def iter_user_history(user_id: int, db_path: Optional[str] = None,
+                      session_range: Optional[Tuple[int, int]] = None,
+                      archive_path: Optional[str] = None,
+                      chunk_size: int = 500) -> Iterator[Dict]:
+    """Yield one flat row per answered question of a user's sessions.
+
+    Rows archived by the retention job are included when ``archive_path``
+    exists. Sessions without logged questions yield a single row with the
+    question fields empty.
+    """
+    first_id, last_id = session_range or (0, 2**63 - 1)
+
+    db_path = location_for_user(user_id, db_path)
+    conn = get_storage(db_path).connect(named_rows=True)
+    cursor = conn.cursor()
+
+    try:
+        archived_sessions = set()
+        if archive_path and os.path.exists(archive_path):
+            for row in _iter_archived(cursor, db_path, user_id, first_id, last_id, archive_path, chunk_size):
+                archived_sessions.add(row['session_id'])
+                yield row
+
+        cursor.execute('''
+            SELECT s.id AS session_id, s.created_at AS session_created_at, s.topic, s.sub_topic,
+                   s.difficulty, s.question_type, s.score AS session_score,
+                   ql.id AS log_id, ql.question_id,
+                   COALESCE(q.question_text, ql.question_text) AS question,
+                   COALESCE(q.options, ql.options) AS options,
+                   ql.correct_answer, ql.user_answer, ql.is_correct, ql.time_taken,
+                   COALESCE(q.explanation, ql.explanation) AS explanation,
+                   ql.created_at AS answered_at
+            FROM quiz_sessions s
+            LEFT JOIN question_log ql ON ql.session_id = s.id
+            LEFT JOIN questions q ON q.id = ql.question_id
+            WHERE s.user_id = ? AND s.id BETWEEN ? AND ?
+            ORDER BY s.id, ql.id
+        ''', [int(user_id), int(first_id), int(last_id)])
+
+        while True:
+            batch = cursor.fetchmany(chunk_size)
+            if not batch:
+                break
+            for row in batch:
+                if row['log_id'] is None and row['session_id'] in archived_sessions:
+                    continue  # its questions were exported from the archive
+                yield _export_row(row, archived=False)
+    finally:
+        conn.close()
+
+def _iter_archived(cursor, db_path, user_id, first_id, last_id, archive_path, chunk_size):
+    """Archived question_log rows joined back to their sessions and questions"""
+    from src.models.question_store import QuestionStore
+
+    question_store = QuestionStore(db_path)
+    archive = sqlite3.connect(archive_path)
+    archive_cursor = archive.cursor()
+    archive_cursor.execute('''
+        SELECT payload FROM question_log_archive
+        WHERE user_id = ? AND session_id BETWEEN ? AND ?
+        ORDER BY session_id, id
+    ''', [int(user_id), int(first_id), int(last_id)])
+
+    try:
+        while True:
+            batch = [decode_blob(payload) for (payload,) in archive_cursor.fetchmany(chunk_size)]
+            if not batch:
+                break
+
+            questions = question_store.get_questions(cursor, [r.get('question_id') for r in batch])
+            session_ids = sorted({r['session_id'] for r in batch})
+            placeholders = ','.join('?' * len(session_ids))
+            cursor.execute(f'''
+                SELECT id, created_at, topic, sub_topic, difficulty, question_type, score
+                FROM quiz_sessions WHERE id IN ({placeholders})
+            ''', session_ids)
+            sessions = {row['id']: row for row in cursor.fetchall()}
+
+            for logged in batch:
+                session = sessions.get(logged['session_id'])
+                question = questions.get(logged.get('question_id')) or {}
+                yield _export_row({
+                    'session_id': logged['session_id'],
+                    'session_created_at': session['created_at'] if session else None,
+                    'topic': session['topic'] if session else logged.get('topic'),
+                    'sub_topic': session['sub_topic'] if session else logged.get('sub_topic'),
+                    'difficulty': session['difficulty'] if session else logged.get('difficulty'),
+                    'question_type': session['question_type'] if session else logged.get('question_type'),
+                    'session_score': session['score'] if session else None,
+                    'question_id': logged.get('question_id'),
+                    'question': question.get('question', logged.get('question_text')),
+                    'options': json.dumps(question['options']) if question.get('options') else logged.get('options'),
+                    'correct_answer': logged.get('correct_answer'),
+                    'user_answer': logged.get('user_answer'),
+                    'is_correct': logged.get('is_correct'),
+                    'time_taken': logged.get('time_taken'),
+                    'explanation': question.get('explanation', logged.get('explanation')),
+                    'answered_at': logged.get('created_at')
+                }, archived=True)
+    finally:
+        archive.close()
+
+def _export_row(row, archived: bool) -> Dict:
+    data = {column: row[column] for column in EXPORT_COLUMNS if column != 'archived'}
+    if data['is_correct'] is not None:
+        data['is_correct'] = bool(data['is_correct'])
+    data['archived'] = archived
+    return data
+
+def write_csv(rows: Iterable[Dict], fileobj):
+    """Write rows as CSV to a binary file object"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='', write_through=True)
+    writer = csv.DictWriter(text, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+    text.detach()
+
+def write_jsonl(rows: Iterable[Dict], fileobj):
+    """Write rows as JSON Lines to a binary file object"""
+    for row in rows:
+        fileobj.write(json.dumps(row, ensure_ascii=False).encode('utf-8'))
+        fileobj.write(b'\n')
+
+def write_parquet(rows: Iterable[Dict], fileobj, chunk_size: int = 5000):
+    """Write rows as Parquet, one row group per chunk (requires pyarrow)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('session_id', pa.int64()), ('session_created_at', pa.string()), ('topic', pa.string()),
+        ('sub_topic', pa.string()), ('difficulty', pa.string()), ('question_type', pa.string()),
+        ('session_score', pa.float64()), ('question_id', pa.int64()), ('question', pa.string()),
+        ('options', pa.string()), ('correct_answer', pa.string()), ('user_answer', pa.string()),
+        ('is_correct', pa.bool_()), ('time_taken', pa.int64()), ('explanation', pa.string()),
+        ('answered_at', pa.string()), ('archived', pa.bool_())
+    ])
+
+    with pq.ParquetWriter(fileobj, schema, compression='zstd') as writer:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                chunk = []
+        if chunk:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+
+# format -> (writer, mime type, file extension)
+EXPORT_FORMATS = {
+    'CSV': (write_csv, 'text/csv', 'csv'),
+    'JSONL': (write_jsonl, 'application/jsonl', 'jsonl'),
+    'Parquet': (write_parquet, 'application/vnd.apache.parquet', 'parquet')
+}
+
+def available_formats() -> List[str]:
+    """Export formats whose writers can run here"""
+    formats = ['CSV', 'JSONL']
+    try:
+        import pyarrow.parquet  # noqa: F401
+        formats.append('Parquet')
+    except ImportError:
+        pass
+    return formats
+
+def export_to_tempfile(rows: Iterable[Dict], export_format: str):
+    """Stream rows into a temporary file on disk and return it opened for reading.
+
+    The file is deleted when the returned object is closed.
+    """
+    writer, _, _ = EXPORT_FORMATS[export_format]
+    temp = tempfile.TemporaryFile()
+    writer(rows, temp)
+    temp.seek(0)
+    return temp
@@ -4,6 +4,7 @@ import pandas as pd
 from typing import Dict
 from src.generator.question_generator import QuestionGenerator
 from src.models.simple_session import SimpleSessionManager
+from src.models.review_queue import REVIEW_DIFFICULTY, REVIEW_TOPIC
 import urllib.parse
 import time
 
@@ -17,6 +18,7 @@ class QuizManager:
         self.results = []
         self.current_session_id = None
         self.question_start_times = []
+        self.review_meta = []  # per-question topic/sub_topic/difficulty in a review quiz
         
         # Initialize question logger and recommendation engine safely
         try:
@@ -37,6 +39,7 @@ class QuizManager:
         self.results = []
         self.question_start_times = []
         self.current_session_id = None
+        self.review_meta = []
 
         try:
             for i in range(num_questions):
@@ -66,6 +69,32 @@ class QuizManager:
         
         return True
 
+    def load_review_questions(self, items):
+        """Set up a quiz from ``ReviewQueue.due_questions`` output; nothing is generated"""
+        self.questions = []
+        self.user_answers = []
+        self.results = []
+        self.question_start_times = []
+        self.current_session_id = None
+        self.review_meta = []
+        
+        for item in items:
+            question = {key: item[key] for key in ('type', 'question', 'correct_answer', 'explanation')}
+            if 'options' in item:
+                question['options'] = item['options']
+            self.questions.append(question)
+            self.review_meta.append({
+                'topic': item.get('topic', ''),
+                'sub_topic': item.get('sub_topic', ''),
+                'difficulty': item.get('difficulty', '')
+            })
+        
+        return bool(self.questions)
+
+    @property
+    def is_review(self):
+        return bool(self.review_meta)
+
     def attempt_quiz(self):
         for i, q in enumerate(self.questions):
             st.markdown(f"**Question {i+1}: {q['question']}**")
@@ -125,12 +154,12 @@ class QuizManager:
             correct_count = sum(1 for result in self.results if result["is_correct"])
             score_percentage = (correct_count / len(self.results)) * 100
             
-            # Save quiz session
+            # Save quiz session; a review quiz mixes topics, so it is filed under "Review"
             quiz_data = {
-                'topic': st.session_state.get('current_topic', ''),
-                'sub_topic': st.session_state.get('current_sub_topic', ''),
+                'topic': REVIEW_TOPIC if self.is_review else st.session_state.get('current_topic', ''),
+                'sub_topic': '' if self.is_review else st.session_state.get('current_sub_topic', ''),
                 'question_type': self.questions[0]['type'] if self.questions else '',
-                'difficulty': st.session_state.get('current_difficulty', ''),
+                'difficulty': REVIEW_DIFFICULTY if self.is_review else st.session_state.get('current_difficulty', ''),
                 'num_questions': len(self.questions),
                 'score': score_percentage,
                 'questions_data': self.questions,
@@ -138,29 +167,32 @@ class QuizManager:
                 'results_data': self.results
             }
             
+            # Each question is logged for AI analysis (if available) in the
+            # same transaction as the session
+            question_logs = self._build_question_logs() if self.has_ai_features else None
+            
             self.current_session_id = session_manager.save_quiz_session(
-                st.session_state.user['id'], quiz_data
+                st.session_state.user['id'], quiz_data, question_logs
             )
             
-            # Log each question individually for AI analysis (if available)
-            if self.has_ai_features:
-                self._log_individual_questions()
+            # The history sidebar reloads from the newest quiz
+            if 'history_pages' in st.session_state:
+                del st.session_state.history_pages
     
-    def _log_individual_questions(self):
-        """Log each question with user performance for AI analysis"""
-        if not self.has_ai_features or not self.current_session_id or not self.results:
-            return
-        
-        user_id = st.session_state.user['id']
+    def _build_question_logs(self):
+        """Build the per-question log entries used for AI analysis"""
         main_topic = st.session_state.get('current_topic', '')
         sub_topic = st.session_state.get('current_sub_topic', '')
         difficulty = st.session_state.get('current_difficulty', '')
         
+        question_logs = []
         for i, (question, result) in enumerate(zip(self.questions, self.results)):
-            question_data = {
-                'topic': main_topic,
-                'sub_topic': sub_topic,
-                'difficulty': difficulty,
+            # Review questions keep the topic they were first asked under
+            meta = self.review_meta[i] if i < len(self.review_meta) else {}
+            question_logs.append({
+                'topic': meta.get('topic', main_topic),
+                'sub_topic': meta.get('sub_topic', sub_topic),
+                'difficulty': meta.get('difficulty', difficulty),
                 'question_type': question['type'],
                 'question_text': question['question'],
                 'options': question.get('options', []),
@@ -169,12 +201,9 @@ class QuizManager:
                 'is_correct': result['is_correct'],
                 'time_taken': result.get('time_taken', 0),
                 'explanation': question.get('explanation', '')
-            }
-            
-            try:
-                self.question_logger.log_question(user_id, self.current_session_id, question_data)
-            except Exception as e:
-                print(f"Error logging question: {e}")
+            })
+        
+        return question_logs
     
     def get_smart_recommendations(self, user_id: int) -> Dict:
         """Get AI-powered quiz recommendations based on user history"""
@@ -189,7 +218,11 @@ class QuizManager:
             }
         
         try:
-            return self.recommendation_engine.get_personalized_recommendations(user_id)
+            # Recomputed only after the user logs more answers
+            return self.question_logger.memoized(
+                user_id, 'recommendations',
+                lambda: self.recommendation_engine.get_recommendations(user_id)
+            )
         except Exception as e:
             print(f"Error getting recommendations: {e}")
             return {
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from src.models.irt import fit_irt
+
+def simulate(rng, responses, users, items, discrimination=None):
+    ability = rng.normal(0, 1, users)
+    difficulty = rng.normal(0, 1.2, items)
+    a = np.ones(items) if discrimination is None else discrimination
+    user_codes = rng.integers(0, users, responses)
+    item_codes = rng.integers(0, items, responses)
+    p = 1 / (1 + np.exp(-a[item_codes] * (ability[user_codes] - difficulty[item_codes])))
+    return ability, difficulty, user_codes, item_codes, (rng.random(responses) < p).astype(np.int8)
+
+def test_1pl_recovers_simulated_parameters():
+    rng = np.random.default_rng(5)
+    ability, difficulty, users, items, correct = simulate(rng, 100000, 2000, 500)
+
+    fit = fit_irt(users, items, correct, 2000, 500, '1pl')
+
+    assert np.corrcoef(ability, fit['ability'])[0, 1] > 0.9
+    assert np.corrcoef(difficulty, fit['difficulty'])[0, 1] > 0.97
+    assert np.all(fit['discrimination'] == 1.0)
+
+def test_2pl_recovers_discriminations():
+    rng = np.random.default_rng(5)
+    discrimination = np.exp(rng.normal(0, 0.3, 500))
+    _, difficulty, users, items, correct = simulate(rng, 100000, 2000, 500, discrimination)
+
+    fit = fit_irt(users, items, correct, 2000, 500, '2pl')
+
+    assert np.corrcoef(difficulty, fit['difficulty'])[0, 1] > 0.95
+    assert np.corrcoef(discrimination, fit['discrimination'])[0, 1] > 0.7
+
+def test_warm_start_converges_in_fewer_iterations():
+    rng = np.random.default_rng(5)
+    _, _, users, items, correct = simulate(rng, 50000, 1000, 250)
+
+    cold = fit_irt(users, items, correct, 1000, 250, '1pl')
+    warm = fit_irt(users, items, correct, 1000, 250, '1pl', cold['ability'], cold['difficulty'])
+
+    assert warm['iterations'] < cold['iterations']
+
+def test_unknown_model_is_rejected():
+    with pytest.raises(ValueError):
+        fit_irt(np.array([0]), np.array([0]), np.array([1]), 1, 1, '3pl')
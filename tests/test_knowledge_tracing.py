@@ -0,0 +1,39 @@
+import numpy as np
+
+from src.models.knowledge_tracing import DEFAULT_PARAMS, fit_bkt, update_known
+
+def simulate(rng, truth, sequences, length):
+    """Answers of ``sequences`` users, each on one skill, in answer order"""
+    sequence_skill = rng.integers(0, len(truth), sequences)
+    params = truth[sequence_skill]
+    known = rng.random(sequences) < params[:, 0]
+    skills, codes, correct = [], [], []
+    for _ in range(length):
+        right = np.where(known, rng.random(sequences) > params[:, 2], rng.random(sequences) < params[:, 3])
+        skills.append(sequence_skill)
+        codes.append(np.arange(sequences))
+        correct.append(right.astype(np.int8))
+        known |= rng.random(sequences) < params[:, 1]
+    return np.concatenate(skills), np.concatenate(codes), np.concatenate(correct)
+
+def test_fit_recovers_simulated_parameters():
+    rng = np.random.default_rng(3)
+    truth = np.array([[0.3, 0.15, 0.1, 0.2], [0.1, 0.05, 0.05, 0.3]])
+    skills, sequences, correct = simulate(rng, truth, 3000, 20)
+
+    fit = fit_bkt(skills, sequences, correct, 2, 3000, iterations=100)
+
+    np.testing.assert_allclose(fit['params'], truth, atol=0.03)
+
+def test_skills_without_answers_keep_the_defaults():
+    rng = np.random.default_rng(3)
+    skills, sequences, correct = simulate(rng, np.array([[0.3, 0.15, 0.1, 0.2]]), 500, 10)
+
+    fit = fit_bkt(skills, sequences, correct, 2, 500)
+
+    np.testing.assert_allclose(fit['params'][1], DEFAULT_PARAMS)
+
+def test_update_moves_towards_the_answer():
+    p_known = 0.4
+    assert update_known(p_known, True, DEFAULT_PARAMS) > p_known
+    assert update_known(p_known, False, DEFAULT_PARAMS) < p_known
@@ -0,0 +1,26 @@
+import numpy as np
+
+from src.models.progress import lttb
+
+def test_keeps_first_and_last_and_returns_threshold_indices():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 25)
+
+    selected = lttb(x, y, 50)
+
+    assert selected.size == 50
+    assert selected[0] == 0 and selected[-1] == 999
+    assert np.all(np.diff(selected) > 0)
+
+def test_keeps_a_spike():
+    x = np.arange(500, dtype=np.float64)
+    y = np.zeros(500)
+    y[317] = 10.0
+
+    assert 317 in lttb(x, y, 20)
+
+def test_short_series_are_returned_whole():
+    x = np.arange(10, dtype=np.float64)
+
+    np.testing.assert_array_equal(lttb(x, x, 10), np.arange(10))
+    np.testing.assert_array_equal(lttb(x, x, 2), np.arange(10))
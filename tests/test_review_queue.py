@@ -0,0 +1,20 @@
+from src.models.review_queue import INITIAL_EASE, MIN_EASE, schedule
+
+def test_intervals_go_one_six_then_scale_by_ease():
+    repetitions, ease, interval = schedule(0, INITIAL_EASE, 1.0, True)
+    assert (repetitions, interval) == (1, 1.0)
+    repetitions, ease, interval = schedule(repetitions, ease, interval, True)
+    assert (repetitions, interval) == (2, 6.0)
+    repetitions, ease, interval = schedule(repetitions, ease, interval, True)
+    assert (repetitions, interval) == (3, round(6.0 * ease))
+
+def test_lapse_resets_the_interval():
+    repetitions, ease, interval = schedule(3, INITIAL_EASE, 15.0, False)
+    assert (repetitions, interval) == (0, 1.0)
+    assert ease < INITIAL_EASE
+
+def test_ease_never_drops_below_the_minimum():
+    ease = INITIAL_EASE
+    for _ in range(20):
+        _, ease, _ = schedule(0, ease, 1.0, False)
+    assert ease == MIN_EASE